@@ -1,13 +1,17 @@
+import argparse
 import json
 import logging
 import os
 import sys
 import traceback
-import zipfile
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from psl_proof.proof import Proof
+from psl_proof.utils.input_reader import extract_inputs
+from psl_proof.utils.json_codec import get_json_codec
+from psl_proof.utils.metrics import collect_metrics, measure_phase
 INPUT_DIR, OUTPUT_DIR = '/input', '/output'
+METRICS_FILENAME, PROFILE_FILENAME = 'metrics.json', 'profile.pstats'
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
@@ -18,43 +22,177 @@ def load_config() -> Dict[str, Any]:
         'dlp_id': 4,
         'input_dir': INPUT_DIR,
         'salt': '5EkntCWI',
-        'validator_base_api_url': 'https://api.vana.genesis.dfusion.ai'
-        #'validator_base_api_url': 'https://9634-169-0-170-71.ngrok-free.app'
+        'streaming_input': True, # parse chats message by message instead of json.load
+        'json_backend': 'auto', # orjson, msgspec or json; auto: the first one installed
+        'typed_input_decoding': True, # without streaming_input, decode into msgspec structs when installed
+        'zip_streaming': True, # read zip inputs straight from the archive instead of extracting them
+        'input_max_uncompressed_bytes': 4 * 1024 ** 3, # per archive member and extracted archive, 0: unlimited
+        'input_max_compression_ratio': 200, # per archive member, 0: unlimited
+        'extract_workers': 4, # archives extracted in parallel when zip_streaming is off
+        'retain_chat_contents': False, # aggregate-only chats, message text is not kept
+        'batch_scoring_min_chats': 0, # score with NumPy (optional extra) from this many chats up, 0: disabled; ~40 pays off in a warm --daemon / --spool / batch process
+        'feature_extraction': False, # per chat sentiment and keywords in the proof's chat_data attribute, needs the keybert / transformers extras
+        'feature_backend': 'torch', # torch, int8 (dynamically quantized torch) or onnx (ONNX Runtime)
+        'feature_threads': 0, # CPU threads for model inference, 0: library default
+        'feature_batch_size': 32, # messages (of all chats) classified per sentiment model call
+        'feature_sentiment_model': 'cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual',
+        'feature_keyword_model': 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
+        'validator_base_api_url': 'https://api.vana.genesis.dfusion.ai',
+        #'validator_base_api_url': 'https://9634-169-0-170-71.ngrok-free.app',
+        'validator_pool_size': 8, # keep-alive connections per validator host, >= async_concurrency
+        'validator_connect_timeout': 10, # seconds
+        'validator_read_timeout': 60, # seconds
+        'validator_gzip_min_bytes': 0, # gzip request bodies from this size, 0: disabled
+        'validator_max_retries': 3, # retries of a failed call, submit-data only when it was not received
+        'validator_backoff_base': 0.5, # seconds, doubled per retry with full jitter
+        'validator_backoff_max': 8.0, # seconds
+        'validator_breaker_threshold': 5, # consecutive failed calls, however many retries each made, that open the circuit breaker
+        'validator_breaker_reset': 30.0, # seconds before a single probe call is let through
+        'validator_bulk_batch_size': 0, # > 1: group concurrent calls into bulk requests when the validator supports them
+        'validator_bulk_linger': 0.05, # seconds a bulk request waits for more items
+        'history_cache_path': None, # sqlite file caching submission history per user, None: disabled
+        'history_cache_ttl': 300, # seconds a cached history is revalidated with a conditional request instead of refetched
+        'history_cache_max_entries': 10000, # least recently used users beyond this are evicted
+        'async_concurrency': 8, # files in flight at once with --batch --async-pipeline
+        'daemon_host': '127.0.0.1', # --daemon listens here unless daemon_socket is set
+        'daemon_port': 8085,
+        'daemon_socket': None, # Unix socket path to listen on instead of host:port
+        'daemon_workers': 4, # proof jobs run at once by --daemon
+        'daemon_queue_size': 16, # jobs accepted (running or waiting) before new ones are refused with 503
+        'daemon_job_timeout': 300, # seconds a job may take before its request fails with 504
+        'spool_workers': 4, # proofs run at once by --spool
+        'spool_max_in_flight': 8, # inbox files claimed at once by --spool, the rest wait in the inbox
+        'spool_poll_interval': 2.0, # seconds between inbox scans without inotify
+        'spool_settle_seconds': 1.0, # inbox files modified more recently are left to their writer
+        'spool_retry_delay': 30.0, # seconds without claims after a validator outage returned a file to the inbox
+        'metrics': False, # write phase timings, validator call latencies and counters to metrics.json
+        'metrics_trace_memory': False # per phase memory peaks with tracemalloc, slower; otherwise only the growth of the process peak RSS
     }
     logging.info(f"Using config: {json.dumps(config, indent=2)}")
     return config
 
 
-def run() -> None:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="psl_proof")
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help=f"prove every input file, writing {OUTPUT_DIR}/results/<name>.json and results/index.json"
+    )
+    parser.add_argument(
+        '--manifest',
+        help="file listing the inputs to prove, one path per line (implies --batch)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="number of worker processes proving batch inputs in parallel (implies --batch when > 1)"
+    )
+    parser.add_argument(
+        '--async-pipeline',
+        action='store_true',
+        help="overlap validator calls with parsing and, in batch mode, across files"
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help="keep a warm proof engine running and prove the inputs posted to /proofs over local HTTP"
+    )
+    parser.add_argument(
+        '--spool',
+        metavar='SPOOL_DIR',
+        help="keep proving the files dropped into SPOOL_DIR/inbox, moving them to done/ or failed/ with results in results/"
+    )
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help=f"write phase timings and validator call metrics to {OUTPUT_DIR}/{METRICS_FILENAME}"
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help=f"write a cProfile dump of this process to {OUTPUT_DIR}/{PROFILE_FILENAME}"
+    )
+    args = parser.parse_args(argv)
+    if args.profile and (args.daemon or args.spool):
+        # their proofs run in worker threads, which cProfile does not see
+        parser.error("--profile cannot be combined with --daemon or --spool, use --metrics")
+    if args.workers > 1 and args.async_pipeline:
+        # worker processes prove their files one at a time, async_concurrency sets the files in flight
+        parser.error("--async-pipeline cannot be combined with --workers above 1")
+    return args
+
+
+def run(argv: Optional[List[str]] = None) -> None:
     """Generate proofs for all input files."""
+    args = parse_args(argv)
     config = load_config()
+    if args.metrics:
+        config['metrics'] = True
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with collect_metrics(config) as metrics:
+            generate_proofs(args, config)
+        if metrics:
+            with open(os.path.join(OUTPUT_DIR, METRICS_FILENAME), 'wb') as f:
+                get_json_codec(config).dump(metrics.to_dict(), f, indent=True)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(OUTPUT_DIR, PROFILE_FILENAME))
+
+
+def generate_proofs(args: argparse.Namespace, config: Dict[str, Any]) -> None:
+    if args.daemon:
+        from psl_proof.daemon import run_daemon
+        run_daemon(config)
+        return
+    if args.spool:
+        from psl_proof.spool import run_spool
+        run_spool(config, args.spool)
+        return
+
     input_files_exist = os.path.isdir(INPUT_DIR) and bool(os.listdir(INPUT_DIR))
 
     if not input_files_exist:
         raise FileNotFoundError(f"No input files found in {INPUT_DIR}")
-    extract_input()
+    zip_streaming = config.get('zip_streaming', False)
+    if not zip_streaming:
+        extract_input(config)
+
+    if args.batch or args.manifest or args.workers > 1:
+        from psl_proof.batch import run_batch, get_batch_input_files
+        input_files = get_batch_input_files(INPUT_DIR, args.manifest, include_zips=zip_streaming)
+        run_batch(config, input_files, OUTPUT_DIR, args.workers, args.async_pipeline)
+        return
 
     proof = Proof(config)
-    proof_response = proof.generate()
+    if args.async_pipeline:
+        import asyncio
+        proof_response = asyncio.run(proof.generate_async())
+    else:
+        proof_response = proof.generate()
 
     output_path = os.path.join(OUTPUT_DIR, "results.json")
-    with open(output_path, 'w') as f:
+    with measure_phase('write_output'), open(output_path, 'wb') as f:
         #json.dump(proof_response.dict(), f, indent=2)
-        json.dump(proof_response.model_dump(), f, indent=2)
+        get_json_codec(config).dump(proof_response.model_dump(), f, indent=True)
     #logging.info(f"Proof generation complete: {proof_response}")
 
 
-def extract_input() -> None:
+@measure_phase('extract_input')
+def extract_input(config: Dict[str, Any]) -> None:
     """
     If the input directory contains any zip files, extract them
     :return:
     """
-    for input_filename in os.listdir(INPUT_DIR):
-        input_file = os.path.join(INPUT_DIR, input_filename)
-
-        if zipfile.is_zipfile(input_file):
-            with zipfile.ZipFile(input_file, 'r') as zip_ref:
-                zip_ref.extractall(INPUT_DIR)
+    extract_inputs(INPUT_DIR, config)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+import logging
+import os
+import time
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+
+from psl_proof.proof import Proof
+from psl_proof.models.proof_response import ProofResponse
+from psl_proof.utils.json_codec import get_json_codec
+from psl_proof.utils.metrics import collect_metrics, measure_phase
+
+if TYPE_CHECKING:
+    import asyncio
+
+RESULTS_DIR_NAME = "results"
+INDEX_FILENAME = "index.json"
+
+
+def get_batch_input_files(
+    input_dir: str,
+    manifest: Optional[str] = None,
+    include_zips: bool = False
+) -> List[str]:
+    """
+    Lists the files to prove in one batch run.
+    A manifest holds one input path per line (relative paths resolve against input_dir);
+    without one, every file in input_dir is used, in name order. Zip files are
+    skipped unless include_zips, as they have been extracted already.
+    """
+    if manifest:
+        with open(manifest, 'r') as f:
+            entries = [line.strip() for line in f]
+        return [
+            os.path.join(input_dir, entry)
+            for entry in entries
+            if entry and not entry.startswith('#')
+        ]
+
+    input_files = []
+    for input_filename in sorted(os.listdir(input_dir)):
+        input_file = os.path.join(input_dir, input_filename)
+        if os.path.isfile(input_file) and (include_zips or not zipfile.is_zipfile(input_file)):
+            input_files.append(input_file)
+    return input_files
+
+
+def get_result_name(input_file: str, used_names: set) -> str:
+    name = os.path.basename(input_file)
+    for extension in ('.zip', '.gz', '.zst', '.lz4', '.json'):
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    result_name = name
+    suffix = 1
+    while result_name in used_names:
+        suffix += 1
+        result_name = f"{name}-{suffix}"
+    used_names.add(result_name)
+    return result_name
+
+
+# Proof engine of the current (worker) process, see init_batch_worker
+batch_proof: Optional[Proof] = None
+
+
+def init_batch_worker(config: Dict[str, Any]) -> None:
+    global batch_proof
+    batch_proof = Proof(config)
+
+
+def get_batch_entry(input_file: str) -> Dict[str, Any]:
+    return {
+        'input': input_file,
+        'output': None,
+        'valid': False,
+        'score': 0.0,
+        'error': None,
+        'elapsed_seconds': 0.0
+    }
+
+
+@measure_phase('write_output')
+def write_batch_result(
+    config: Dict[str, Any],
+    entry: Dict[str, Any],
+    proof_response: ProofResponse,
+    output_path: str
+) -> None:
+    with open(output_path, 'wb') as f:
+        get_json_codec(config).dump(proof_response.model_dump(), f, indent=True)
+    entry.update({
+        'output': os.path.join(RESULTS_DIR_NAME, os.path.basename(output_path)),
+        'valid': proof_response.valid,
+        'score': proof_response.score
+    })
+
+
+def prove_batch_file(input_file: str, output_path: str) -> Dict[str, Any]:
+    """Proves one input with this process' Proof engine and writes its result to output_path."""
+    entry = get_batch_entry(input_file)
+    started = time.perf_counter()
+    with collect_metrics(batch_proof.config) as metrics:
+        try:
+            proof_response = batch_proof.generate_for_file(input_file)
+            write_batch_result(batch_proof.config, entry, proof_response, output_path)
+        except Exception as e:
+            logging.error(f"Error during proof generation of {input_file}: {e}")
+            traceback.print_exc()
+            entry['error'] = str(e)
+    if metrics:
+        entry['metrics'] = metrics.to_dict()
+    entry['elapsed_seconds'] = time.perf_counter() - started
+    logging.info(f"Proved {input_file} in {entry['elapsed_seconds']:.3f}s")
+    return entry
+
+
+async def prove_batch_file_async(
+    proof: Proof,
+    input_file: str,
+    output_path: str,
+    semaphore: 'asyncio.Semaphore'
+) -> Dict[str, Any]:
+    async with semaphore:
+        entry = get_batch_entry(input_file)
+        started = time.perf_counter()
+        with collect_metrics(proof.config) as metrics:
+            try:
+                proof_response = await proof.generate_for_file_async(input_file)
+                write_batch_result(proof.config, entry, proof_response, output_path)
+            except Exception as e:
+                logging.error(f"Error during proof generation of {input_file}: {e}")
+                traceback.print_exc()
+                entry['error'] = str(e)
+        if metrics:
+            entry['metrics'] = metrics.to_dict()
+        entry['elapsed_seconds'] = time.perf_counter() - started
+        logging.info(f"Proved {input_file} in {entry['elapsed_seconds']:.3f}s")
+        return entry
+
+
+async def run_batch_async(
+    config: Dict[str, Any],
+    input_files: List[str],
+    output_paths: List[str],
+    concurrency: int
+) -> List[Dict[str, Any]]:
+    """Proves up to `concurrency` files at once so their validator calls overlap."""
+    import asyncio
+
+    proof = Proof(config)
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*[
+        prove_batch_file_async(proof, input_file, output_path, semaphore)
+        for input_file, output_path in zip(input_files, output_paths)
+    ])
+
+
+def run_batch(
+    config: Dict[str, Any],
+    input_files: List[str],
+    output_dir: str,
+    workers: int = 1,
+    async_pipeline: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Generates one proof per input file, writing results/<name>.json for each
+    and results/index.json summarising the run in input order.
+    With workers > 1 the files are spread over a process pool, each worker
+    keeping its own Proof engine; with async_pipeline up to
+    'async_concurrency' files are in flight at once in this process.
+    A failing file is recorded in the index and does not stop the batch.
+    """
+    results_dir = os.path.join(output_dir, RESULTS_DIR_NAME)
+    os.makedirs(results_dir, exist_ok=True)
+
+    # an input named index.* must not overwrite the batch index
+    used_names = {os.path.splitext(INDEX_FILENAME)[0]}
+    output_paths = [
+        os.path.join(results_dir, f"{get_result_name(input_file, used_names)}.json")
+        for input_file in input_files
+    ]
+
+    started = time.perf_counter()
+    if workers > 1 and len(input_files) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_batch_worker,
+            initargs=(config,)
+        ) as executor:
+            # map keeps the input order regardless of completion order
+            index = list(executor.map(prove_batch_file, input_files, output_paths))
+    elif async_pipeline:
+        import asyncio
+        index = asyncio.run(run_batch_async(
+            config,
+            input_files,
+            output_paths,
+            config.get('async_concurrency', 8)
+        ))
+    else:
+        init_batch_worker(config)
+        index = [
+            prove_batch_file(input_file, output_path)
+            for input_file, output_path in zip(input_files, output_paths)
+        ]
+    elapsed_seconds = time.perf_counter() - started
+
+    with open(os.path.join(results_dir, INDEX_FILENAME), 'wb') as f:
+        get_json_codec(config).dump({
+            'workers': workers,
+            'elapsed_seconds': elapsed_seconds,
+            'results': index
+        }, f, indent=True)
+    logging.info(f"Batch proof complete: {sum(1 for entry in index if not entry['error'])}/{len(index)} files in {elapsed_seconds:.3f}s")
+    return index
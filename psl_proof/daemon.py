@@ -0,0 +1,249 @@
+import contextvars
+import logging
+import os
+import signal
+import socketserver
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+from psl_proof.proof import Proof
+from psl_proof.models.proof_response import ProofResponse
+from psl_proof.utils.deadline import ProofDeadline
+from psl_proof.utils.json_codec import get_json_codec
+from psl_proof.utils.validation_api import get_validator_client
+from psl_proof.utils.metrics import current_metrics, get_current_metrics
+
+PROOFS_PATH = '/proofs'
+HEALTH_PATH = '/health'
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class DaemonRequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ProofDaemon:
+    """
+    Warm proof engine serving proof jobs: one Proof and validator session for
+    the life of the process, at most 'daemon_workers' jobs proved at once and
+    'daemon_queue_size' accepted (running or waiting), beyond which a job is
+    refused instead of queued.
+    Each job runs generate_for_file in a worker thread, which builds the
+    job's SourceData, CargoData and ProofResponse from scratch, so nothing of
+    one submission is visible to another.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.proof = Proof(config)
+        self.json_codec = get_json_codec(config)
+        self.input_root = os.path.realpath(config['input_dir'])
+        self.job_timeout = config.get('daemon_job_timeout', 300)
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.get('daemon_workers', 4),
+            thread_name_prefix='proof-job'
+        )
+        self.queue_size = config.get('daemon_queue_size', 16)
+        self.job_slots = threading.BoundedSemaphore(self.queue_size)
+        self.lock = threading.Lock()
+        self.active_jobs = 0
+        self.completed_jobs = 0
+        self.failed_jobs = 0
+        # metrics of this run when collected (--metrics), shared by all jobs
+        self.metrics = get_current_metrics()
+
+    def warm_up(self) -> None:
+        """Builds what the first job would otherwise pay for: the validator session and feature models."""
+        get_validator_client(self.config)
+        if self.config.get('feature_extraction', False):
+            from psl_proof.utils.feature_extraction import preload_feature_models
+            preload_feature_models(self.config)
+        logging.info(f"Proof daemon ready, input root {self.input_root}")
+
+    def resolve_input(self, input_path: Any) -> str:
+        """Input file of a job; relative paths resolve against input_dir, which it may not leave."""
+        if not isinstance(input_path, str) or not input_path:
+            raise DaemonRequestError(400, "'input' must be a file path")
+        input_file = os.path.realpath(os.path.join(self.input_root, input_path))
+        if os.path.commonpath([self.input_root, input_file]) != self.input_root:
+            raise DaemonRequestError(403, f"{input_path} is outside {self.input_root}")
+        if not os.path.isfile(input_file):
+            raise DaemonRequestError(404, f"No input file {input_path}")
+        return input_file
+
+    def prove(self, input_file: str) -> ProofResponse:
+        """
+        Runs a proof job, raising DaemonRequestError when it cannot be accepted or
+        times out. A job timing out before it submits its data stops at its next
+        step; one submitting already is waited for, so its result is not lost.
+        """
+        if not self.job_slots.acquire(blocking=False):
+            raise DaemonRequestError(503, f"Proof queue is full ({self.queue_size} jobs)")
+        with self.lock:
+            self.active_jobs += 1
+        try:
+            deadline = ProofDeadline(self.job_timeout)
+            future = self.executor.submit(contextvars.copy_context().run, self.run_job, input_file, deadline)
+        except RuntimeError:
+            self.release_job(failed=True)
+            raise DaemonRequestError(503, "Proof daemon is shutting down")
+        future.add_done_callback(lambda done: self.release_job(failed=done.cancelled() or done.exception() is not None))
+        try:
+            return future.result(timeout=self.job_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            if deadline.expire():
+                raise DaemonRequestError(504, f"Proof of {input_file} timed out after {self.job_timeout}s, nothing was submitted")
+            logging.warning(f"Proof of {input_file} is past {self.job_timeout}s but submitting, waiting for its result")
+            return future.result()
+
+    def run_job(self, input_file: str, deadline: ProofDeadline) -> ProofResponse:
+        if self.metrics is not None:
+            # request threads do not inherit the context the run's metrics were set in
+            current_metrics.set(self.metrics)
+        # the job may have waited for a worker past its deadline
+        deadline.check('parse')
+        return self.proof.generate_for_file(input_file, deadline)
+
+    def release_job(self, failed: bool) -> None:
+        with self.lock:
+            self.active_jobs -= 1
+            if failed:
+                self.failed_jobs += 1
+            else:
+                self.completed_jobs += 1
+        self.job_slots.release()
+
+    def get_health(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'status': 'ok',
+                'active_jobs': self.active_jobs,
+                'queue_size': self.queue_size,
+                'completed_jobs': self.completed_jobs,
+                'failed_jobs': self.failed_jobs
+            }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ProofRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /proofs with {"input": "<path>"} answers the job's ProofResponse JSON;
+    GET /health answers the daemon's job counters.
+    """
+    server_version = 'psl-proof'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def daemon(self) -> ProofDaemon:
+        return self.server.proof_daemon
+
+    def do_GET(self) -> None:
+        if self.path != HEALTH_PATH:
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        self.send_json(200, self.daemon.get_health())
+
+    def do_POST(self) -> None:
+        if self.path != PROOFS_PATH:
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        started = time.perf_counter()
+        try:
+            input_file = self.daemon.resolve_input(self.read_request().get('input'))
+            proof_response = self.daemon.prove(input_file)
+        except DaemonRequestError as e:
+            self.send_error_json(e.status, str(e))
+            return
+        except Exception as e:
+            logging.error(f"Error during proof generation: {e}")
+            traceback.print_exc()
+            self.send_error_json(500, str(e))
+            return
+        logging.info(f"Proved {input_file} in {time.perf_counter() - started:.3f}s")
+        self.send_json(200, proof_response.model_dump())
+
+    def read_request(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            raise DaemonRequestError(400, f"Request body must be 1 to {MAX_REQUEST_BYTES} bytes of JSON")
+        try:
+            request = self.daemon.json_codec.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise DaemonRequestError(400, f"Invalid JSON request: {e}")
+        if not isinstance(request, dict):
+            raise DaemonRequestError(400, "Request must be a JSON object")
+        return request
+
+    def send_json(self, status: int, value: Any) -> None:
+        body = self.daemon.json_codec.dumps(value)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str) -> None:
+        # the request body may be left unread, so the connection is not reused
+        self.close_connection = True
+        self.send_json(status, {'error': message})
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+class UnixProofServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(config: Dict[str, Any], daemon: ProofDaemon) -> socketserver.BaseServer:
+    """HTTP server on the 'daemon_socket' Unix socket when set, else on daemon_host:daemon_port."""
+    socket_path = config.get('daemon_socket')
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # left over by a previous daemon
+        server = UnixProofServer(socket_path, ProofRequestHandler)
+        logging.info(f"Proof daemon listening on {socket_path}")
+    else:
+        address: Tuple[str, int] = (config.get('daemon_host', '127.0.0.1'), config.get('daemon_port', 8085))
+        server = ThreadingHTTPServer(address, ProofRequestHandler)
+        server.daemon_threads = True
+        logging.info(f"Proof daemon listening on http://{address[0]}:{server.server_address[1]}")
+    server.proof_daemon = daemon
+    return server
+
+
+def run_daemon(config: Dict[str, Any]) -> None:
+    """Serves proof jobs until SIGTERM / SIGINT, then lets the running jobs finish."""
+    daemon = ProofDaemon(config)
+    daemon.warm_up()
+    server = create_server(config, daemon)
+
+    def stop(signum: int, frame: Any) -> None:
+        logging.info(f"Proof daemon stopping on signal {signum}")
+        # shutdown waits for serve_forever, which runs in this thread
+        threading.Thread(target=server.shutdown).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        daemon.close()
+        socket_path = config.get('daemon_socket')
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,112 @@
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Cold start budget of `import psl_proof.__main__`, relative to the baseline of
+# importing pydantic (ProofResponse) and requests (validator calls) on the same
+# machine. Both are needed by every proof and make up most of the import, so
+# the ratio does not depend on the speed of the machine; everything else is
+# imported on the code path using it. The entry point measures about 1.1 times
+# the baseline, with runs on a busy machine spreading up to about 1.35.
+IMPORT_BUDGET_RATIO = 1.5
+# measurements over budget are repeated, the check fails when all of them are
+IMPORT_BUDGET_ATTEMPTS = 3
+ENTRY_MODULE = 'psl_proof.__main__'
+BASELINE_CODE = """
+import pydantic, requests
+class Baseline(pydantic.BaseModel):
+    value: int = 0
+"""
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure_import_times(module: str) -> List[Tuple[str, int, int]]:
+    """(module, cumulative microseconds, depth) of one cold `-X importtime` import, in import order."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            _, cumulative_us, indent, name = match.groups()
+            times.append((name, int(cumulative_us), len(indent) // 2))
+    return times
+
+
+def measure_cpu_time(code: str) -> float:
+    """CPU milliseconds a fresh interpreter takes to run code, interpreter start up left out."""
+    timed_code = f"import time\nstarted = time.process_time()\n{code}\nprint(time.process_time() - started)"
+    completed = subprocess.run(
+        [sys.executable, '-c', timed_code],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(completed.stdout) * 1000
+
+
+def get_module_time(times: List[Tuple[str, int, int]], module: str) -> int:
+    return next(cumulative_us for name, cumulative_us, depth in times if name == module and depth == 0)
+
+
+def get_top_imports(times: List[Tuple[str, int, int]], module: str, count: int) -> List[Tuple[str, int]]:
+    """Slowest top level packages imported by module, other than psl_proof itself."""
+    # importtime lists a module after everything it imports, nested one level deeper
+    end = next(index for index, (name, _, depth) in enumerate(times) if name == module and depth == 0)
+    start = end
+    while start > 0 and times[start - 1][2] > 0:
+        start -= 1
+    packages: Dict[str, int] = {}
+    for name, cumulative_us, _ in times[start:end]:
+        if '.' not in name and name != 'psl_proof':
+            packages[name] = max(packages.get(name, 0), cumulative_us)
+    return sorted(packages.items(), key=lambda entry: entry[1], reverse=True)[:count]
+
+
+def measure_ratio(runs: int) -> float:
+    """Import time of the entry point as a multiple of the baseline, the fastest of runs each."""
+    # entry and baseline alternate, so a slow spell of the machine affects both
+    entry_ms, baseline_ms = [], []
+    for _ in range(runs):
+        entry_ms.append(measure_cpu_time(f'import {ENTRY_MODULE}'))
+        baseline_ms.append(measure_cpu_time(BASELINE_CODE))
+    ratio = min(entry_ms) / min(baseline_ms)
+    print(
+        f"import {ENTRY_MODULE}: {min(entry_ms):.1f} ms CPU, pydantic + requests baseline: {min(baseline_ms):.1f} ms CPU, "
+        f"ratio {ratio:.2f}"
+    )
+    return ratio
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Checks the import time of the proof entry point against its budget.')
+    parser.add_argument('--runs', type=int, default=7, help='cold imports to measure, the fastest is kept')
+    parser.add_argument('--max-ratio', type=float, default=IMPORT_BUDGET_RATIO,
+                        help='import time allowed, as a multiple of the pydantic + requests baseline')
+    parser.add_argument('--attempts', type=int, default=IMPORT_BUDGET_ATTEMPTS,
+                        help='measurements to make before failing, while they are over budget')
+    parser.add_argument('--report-only', action='store_true', help='report the import times without failing')
+    args = parser.parse_args()
+
+    for attempt in range(1, args.attempts + 1):
+        ratio = measure_ratio(args.runs)
+        if ratio <= args.max_ratio or args.report_only:
+            break
+        print(f"Attempt {attempt} of {args.attempts} over the {args.max_ratio:.2f} budget", file=sys.stderr)
+    times = measure_import_times(ENTRY_MODULE)
+    for name, cumulative_us in get_top_imports(times, ENTRY_MODULE, 10):
+        print(f"  {name}: {cumulative_us / 1000:.1f} ms")
+    if ratio > args.max_ratio and not args.report_only:
+        print(f"Import time is over budget: {ratio:.2f} times the baseline, at most {args.max_ratio:.2f}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,31 @@ from typing import Union
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 
-from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat
+from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat, index_chat_histories
+from psl_proof.utils.epoch import to_epoch, from_epoch
 
 # Enum for DataSource
 class DataSource(Enum):
     telegram = 0
     telegramMiner = 1
 
+# Lazy text view over a chat's contents
+class ChatContentText:
+    """Joined chat text whose length is known up front; the string is only built when asked for."""
+    __slots__ = ('source_chat',)
+
+    def __init__(self, source_chat: 'SourceChatData'):
+        self.source_chat = source_chat
+
+    def __len__(self) -> int:
+        return self.source_chat.content_text_length()
+
+    def __str__(self) -> str:
+        return self.source_chat.content_as_text()
+
+
 # Source Chat Data
-@dataclass
+@dataclass(slots=True)
 class SourceChatData:
     chat_id: int
     participants: list[str] = field(default_factory=list)
@@ -23,8 +39,32 @@ class SourceChatData:
     total_content_length: int = 0
     total_content_value: int = 0
     chat_count : int = 0
-    chat_start_on: datetime = None
-    chat_ended_on: datetime = None
+    # first / last message time in epoch seconds, see chat_start_on / chat_ended_on
+    chat_start_epoch: Optional[float] = None
+    chat_ended_epoch: Optional[float] = None
+    # False: aggregate-only, message bodies are counted but not kept
+    retain_contents: bool = True
+    # set mirror of participants for O(1) membership checks
+    participant_keys: set = field(default_factory=set, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.participant_keys = set(self.participants)
+
+    @property
+    def chat_start_on(self) -> Optional[datetime]:
+        return from_epoch(self.chat_start_epoch) if self.chat_start_epoch is not None else None
+
+    @chat_start_on.setter
+    def chat_start_on(self, value: Optional[datetime]) -> None:
+        self.chat_start_epoch = to_epoch(value) if value is not None else None
+
+    @property
+    def chat_ended_on(self) -> Optional[datetime]:
+        return from_epoch(self.chat_ended_epoch) if self.chat_ended_epoch is not None else None
+
+    @chat_ended_on.setter
+    def chat_ended_on(self, value: Optional[datetime]) -> None:
+        self.chat_ended_epoch = to_epoch(value) if value is not None else None
 
     def chat_id_as_key(self) -> str :
         return str(self.chat_id)
@@ -33,45 +73,49 @@ class SourceChatData:
         """Converts contents to a single string with each entry on a new line."""
         return "\r".join(self.contents)
 
+    def content_text_length(self) -> int:
+        """Length of content_as_text() without building it: message lengths plus one separator between each."""
+        if self.chat_count == 0:
+            return 0
+        return self.total_content_length + self.chat_count - 1
+
+    def content_text(self) -> ChatContentText:
+        return ChatContentText(self)
+
     def add_content(
         self,
         content: str,
-        chat_timestamp: datetime,
-        submission_timestamp: datetime
+        chat_epoch: float,
+        submission_epoch: float
     ) -> None:
-        """Adds a new content string to the contents list if it's not empty."""
+        """
+        Adds a new content string to the contents list if it's not empty.
+        chat_epoch / submission_epoch are the message and submission times in epoch seconds.
+        """
         if content:
             self.chat_count += 1
             content_len = len(content)
 
             # Calculate the difference in minutes
-            # Convert current_timestamp to datetime if it's a Unix timestamp
-            #if isinstance(submission_timestamp, int):
-            #    submission_timestamp = datetime.utcfromtimestamp(submission_timestamp)
-            time_in_seconds = (submission_timestamp - chat_timestamp).total_seconds()
-            time_in_minutes = int(time_in_seconds // 60)
-
-            if (self.chat_start_on):
-               if (self.chat_start_on > chat_timestamp):
-                  self.chat_start_on = chat_timestamp
-            else :
-               self.chat_start_on = chat_timestamp
-
-            if (self.chat_ended_on):
-               if (self.chat_ended_on < chat_timestamp):
-                  self.chat_ended_on = chat_timestamp
-            else :
-               self.chat_ended_on = chat_timestamp
+            time_in_minutes = int((submission_epoch - chat_epoch) // 60)
+
+            if self.chat_start_epoch is None or self.chat_start_epoch > chat_epoch:
+               self.chat_start_epoch = chat_epoch
+
+            if self.chat_ended_epoch is None or self.chat_ended_epoch < chat_epoch:
+               self.chat_ended_epoch = chat_epoch
 
             self.total_content_length += content_len
             content_value = time_in_minutes * content_len
             self.total_content_value += content_value
 
-            self.contents.append(content)
+            if self.retain_contents:
+                self.contents.append(content)
 
     def add_participant(self, participant: str) -> None:
         """Adds a new participant to the participants list if it's not already present."""
-        if participant and participant not in self.participants:
+        if participant and participant not in self.participant_keys:
+            self.participant_keys.add(participant)
             self.participants.append(participant)
 
     def to_dict(self) -> dict:
@@ -97,7 +141,7 @@ class SourceChatData:
 
 
 # SourceData with enum and chat data
-@dataclass
+@dataclass(slots=True)
 class SourceData:
     source: DataSource         # "telegram"
     user: str
@@ -111,7 +155,7 @@ class SourceData:
         self.user = user
         self.submission_token = submission_token
         self.submission_date = submission_date
-        proof_token = proof_token
+        self.proof_token = proof_token
         self.source_chats = source_chats or []
 
     def to_dict(self):
@@ -147,7 +191,7 @@ class SourceData:
         }
 
 # ChatData for Source (final destination data structure)
-@dataclass
+@dataclass(slots=True)
 class ChatData:
     chat_length: int
     chat_start_on: datetime = None
@@ -165,25 +209,32 @@ class ChatData:
         }
 
 # CargoData for Source
-@dataclass
+@dataclass(slots=True)
 class CargoData:
     source_data: SourceData
     source_id: str
     current_timestamp: datetime = None
     last_submission: datetime = None
     chat_histories: List[ChatHistory] = field(default_factory=list)
+    chat_history_index: Dict[str, float] = field(default_factory=dict)
     chat_list: List[SubmissionChat] = field(default_factory=list)
     # chat_list: List[ChatData] = field(default_factory=list)
-    total_quality = 0.0
-    total_uniqueness = 0.0
+    total_quality: float = 0.0
+    total_uniqueness: float = 0.0
 
     def submission_time_elapsed(self) -> float :
         if not self.last_submission:
             return 0.0
-        time_in_seconds = (self.current_timestamp - self.last_submission).total_seconds()
+        time_in_seconds = to_epoch(self.current_timestamp) - to_epoch(self.last_submission)
         time_in_hours = int(time_in_seconds // 3600)
         return time_in_hours
 
+    def get_chat_history_index(self) -> Dict[str, float]:
+        """Index of chat_histories by source_chat_id, built on first use if not provided."""
+        if not self.chat_history_index and self.chat_histories:
+            self.chat_history_index = index_chat_histories(self.chat_histories)
+        return self.chat_history_index
+
     def to_dict(self):
         # Return a dictionary representation of the CargoData object
         return {
@@ -207,7 +258,7 @@ class CargoData:
 
 
 # MetaData for Source
-@dataclass
+@dataclass(slots=True)
 class MetaData:
     source_id: str
     dlp_id: str
@@ -0,0 +1,57 @@
+from typing import List, Optional, Union
+
+import msgspec
+
+# Typed message schemas of the export formats, decoded straight from the JSON
+# document with msgspec. Fields not listed here are skipped by the decoder.
+
+# Telegram (TDLib) export
+class TelegramSender(msgspec.Struct):
+    user_id: Union[int, str, None] = None
+
+
+class TelegramFormattedText(msgspec.Struct):
+    text: str = ""
+
+
+class TelegramContent(msgspec.Struct):
+    type: str = msgspec.field(name="@type", default="")
+    text: Optional[TelegramFormattedText] = None
+
+
+class TelegramMessage(msgspec.Struct):
+    type: str = msgspec.field(name="@type", default="")
+    sender_id: Optional[TelegramSender] = None
+    date: Union[int, float, None] = None
+    content: Optional[TelegramContent] = None
+
+
+class TelegramChat(msgspec.Struct):
+    chat_id: Union[int, str, None] = None
+    contents: List[TelegramMessage] = []
+
+
+# Telegram miner (GramJS) export
+class TelegramMinerPeer(msgspec.Struct):
+    userId: Union[int, str, None] = None
+
+
+class TelegramMinerMessage(msgspec.Struct):
+    className: str = ""
+    peerId: Optional[TelegramMinerPeer] = None
+    date: Union[int, float, None] = None
+    message: Optional[str] = None
+
+
+class TelegramMinerChat(msgspec.Struct):
+    chat_id: Union[int, str, None] = None
+    contents: List[TelegramMinerMessage] = []
+
+
+class SourceExport(msgspec.Struct):
+    revision: str = ""
+    source: str = ""
+    user: Union[int, str, None] = None
+    submission_token: str = ""
+    # decoded once the source, and so the message schema, is known
+    chats: msgspec.Raw = msgspec.Raw(b"[]")
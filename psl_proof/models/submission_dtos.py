@@ -2,8 +2,10 @@ from typing import List, Dict, Any
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from psl_proof.utils.epoch import to_epoch
 
-@dataclass
+
+@dataclass(slots=True)
 class SubmissionChat:
     participant_count: int
     chat_count: int
@@ -11,24 +13,39 @@ class SubmissionChat:
     chat_start_on: datetime
     chat_ended_on: datetime
 
-@dataclass
+@dataclass(slots=True)
 class ChatHistory:
     source_chat_id : str
     chat_list: List[SubmissionChat] = field(default_factory=list)
 
-@dataclass
+def index_chat_histories(chat_histories: List[ChatHistory]) -> Dict[str, float]:
+    """
+    Maps source_chat_id to the chat_ended_on, in epoch seconds, of its most recent
+    submitted chat, i.e. the first chat of the first history found for that id.
+    """
+    chat_history_index = {}
+    for chat_history in chat_histories:
+        if chat_history.chat_list and chat_history.source_chat_id not in chat_history_index:
+            chat_history_index[chat_history.source_chat_id] = to_epoch(chat_history.chat_list[0].chat_ended_on)
+    return chat_history_index
+
+@dataclass(slots=True)
 class SubmitDataResult:
     is_valid: bool
     error_text: str
 
-@dataclass
+@dataclass(slots=True)
 class SubmissionHistory:
     is_valid: bool
     error_text: str
     last_submission: datetime 
     chat_histories: List[ChatHistory] = field(default_factory=list)
+    # source_chat_id -> chat_ended_on epoch seconds, see index_chat_histories
+    chat_history_index: Dict[str, float] = field(default_factory=dict)
+    service_error: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class SubmitDataResponse:
     is_valid: bool
-    error_text: str
\ No newline at end of file
+    error_text: str
+    service_error: bool = False
\ No newline at end of file
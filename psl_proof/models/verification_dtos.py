@@ -2,8 +2,10 @@ from typing import List, Dict, Any
 from dataclasses import dataclass, field
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class VerifyTokenResult:
     is_valid: bool
     error_text: str
     proof_token: str
+    # True when the validator could not be reached, not a verdict on the token
+    service_error: bool = False
@@ -1,18 +1,34 @@
 import json
 import logging
 import os
-from typing import Dict, Any
-import requests
+from typing import Callable, Dict, Any, List, Optional, TextIO, Union
 
 from datetime import datetime, timezone
 from psl_proof.models.proof_response import ProofResponse
-from psl_proof.utils.hashing_utils import salted_data, serialize_bloom_filter_base64, deserialize_bloom_filter_base64
+from psl_proof.utils.hashing_utils import salted_data
 from psl_proof.models.cargo_data import SourceChatData, CargoData, SourceData, DataSource, MetaData, DataSource
 from psl_proof.utils.validate_data import validate_data, get_total_score
 from psl_proof.utils.submission import submit_data
 from psl_proof.utils.verification import verify_token, VerifyTokenResult
 from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat, SubmissionHistory
 from psl_proof.utils.submission import get_submission_historical_data
+from psl_proof.utils.validation_api import ValidatorCallError
+from psl_proof.utils.json_stream import JsonStreamReader
+from psl_proof.utils.input_reader import open_input
+from psl_proof.utils.json_codec import get_json_codec
+from psl_proof.utils.epoch import to_epoch
+from psl_proof.utils.deadline import ProofDeadline
+from psl_proof.utils.metrics import measure_phase, add_metric_counts
+from psl_proof.utils.source_schema import (
+    SourceSchema,
+    SchemaDiagnostics,
+    get_source_schema,
+    decode_messages,
+    decode_typed_messages,
+    add_message_record,
+    get_typed_export_decoder,
+    get_typed_chats_decoder
+)
 
 
 class Proof:
@@ -23,21 +39,123 @@ class Proof:
 
     def generate(self) -> ProofResponse:
         """Generate proofs for all input files."""
-        logging.info("Starting proof data")
+        self.proof_response = self.generate_for_file(self.get_input_file())
+        return self.proof_response
 
-        data_revision = "01.01"
-        current_timestamp = datetime.now(timezone.utc)
+    async def generate_async(self) -> ProofResponse:
+        """Same as generate, through the asynchronous pipeline."""
+        self.proof_response = await self.generate_for_file_async(self.get_input_file())
+        return self.proof_response
 
-        source_data = None
+    def get_input_file(self) -> Optional[str]:
         for input_filename in os.listdir(self.config['input_dir']):
-            input_file = os.path.join(self.config['input_dir'], input_filename)
-            with open(input_file, 'r') as f:
-                input_data = json.load(f)
-                source_data = get_source_data(
-                    input_data,
-                    current_timestamp
+            return os.path.join(self.config['input_dir'], input_filename)
+        return None
+
+    @measure_phase('parse')
+    def load_source_data(
+        self,
+        input_file: str,
+        current_timestamp: datetime,
+        on_header: Optional[Callable[[SourceData], None]] = None
+    ) -> SourceData:
+        # feature extraction reads the message text
+        retain_contents = self.config.get('retain_chat_contents', True) or self.config.get('feature_extraction', False)
+        add_metric_counts(input_bytes=os.path.getsize(input_file))
+        with open_input(input_file, self.config) as f:
+            if self.config.get('streaming_input', False):
+                return get_source_data_stream(
+                    f,
+                    current_timestamp,
+                    retain_contents,
+                    on_header
                 )
-                break
+            document = f.read()
+            if self.config.get('typed_input_decoding', False):
+                source_data = get_source_data_typed(
+                    document,
+                    current_timestamp,
+                    retain_contents
+                )
+                if source_data is not None:
+                    return source_data
+            input_data = get_json_codec(self.config).loads(document)
+            return get_source_data(
+                input_data,
+                current_timestamp,
+                retain_contents
+            )
+
+    def generate_for_file(self, input_file: str, deadline: Optional[ProofDeadline] = None) -> ProofResponse:
+        """
+        Generate the proof of a single input file. With a deadline, the proof
+        stops with ProofDeadlineExceeded when it passes before the data is submitted.
+        """
+        logging.info("Starting proof data")
+        current_timestamp = datetime.now(timezone.utc)
+
+        source_data = self.load_source_data(input_file, current_timestamp)
+        if deadline:
+            deadline.check('verify_token')
+        verify_result = verify_token(
+            self.config,
+            source_data
+        )
+        return self.complete_proof(source_data, verify_result, current_timestamp, deadline)
+
+    async def generate_for_file_async(self, input_file: str) -> ProofResponse:
+        """
+        Generate the proof of a single input file, verifying the submission token
+        while the chats are still being parsed. Blocking parse, scoring and
+        validator calls run in worker threads so several files can be in flight.
+        """
+        import asyncio
+
+        logging.info("Starting proof data")
+        loop = asyncio.get_running_loop()
+        current_timestamp = datetime.now(timezone.utc)
+
+        early_verification = None
+        def on_header(header_source_data: SourceData) -> None:
+            nonlocal early_verification
+            early_verification = asyncio.run_coroutine_threadsafe(
+                asyncio.to_thread(verify_token, self.config, header_source_data),
+                loop
+            )
+
+        try:
+            source_data = await asyncio.to_thread(
+                self.load_source_data,
+                input_file,
+                current_timestamp,
+                on_header
+            )
+        except BaseException:
+            # the input is refused, its verification is not waited for
+            if early_verification:
+                early_verification.cancel()
+            raise
+        if early_verification:
+            verify_result = await asyncio.wrap_future(early_verification)
+        else:
+            verify_result = await asyncio.to_thread(verify_token, self.config, source_data)
+        return await asyncio.to_thread(
+            self.complete_proof,
+            source_data,
+            verify_result,
+            current_timestamp
+        )
+
+    def complete_proof(
+        self,
+        source_data: SourceData,
+        verify_result: Optional[VerifyTokenResult],
+        current_timestamp: datetime,
+        deadline: Optional[ProofDeadline] = None
+    ) -> ProofResponse:
+        """Runs the history, scoring and submission steps once the token is verified."""
+        proof_response = ProofResponse(dlp_id=self.config['dlp_id'])
+        data_revision = "01.01"
 
         salt = self.config['salt']
         source_user_hash_64 = salted_data(
@@ -45,10 +163,7 @@ class Proof:
             salt
         )
         proof_failed_reason = ""
-        verify_result = verify_token(
-            self.config,
-            source_data
-        )
+        raise_on_service_error(verify_result)
         is_data_authentic = verify_result
         if is_data_authentic:
             #print(f"verify_result: {verify_result}")
@@ -63,14 +178,18 @@ class Proof:
         )
 
         if is_data_authentic:
+            if deadline:
+                deadline.check('history_fetch')
             #Validate source data via validator.api & obtain uniqueness
             submission_history_data : SubmissionHistory = get_submission_historical_data(
                 self.config,
                 source_data
             )
+            raise_on_service_error(submission_history_data)
             is_data_authentic = submission_history_data.is_valid
             proof_failed_reason = submission_history_data.error_text
             cargo_data.chat_histories = submission_history_data.chat_histories
+            cargo_data.chat_history_index = submission_history_data.chat_history_index
             cargo_data.last_submission = submission_history_data.last_submission
 
         cool_down_period = 4 # hours
@@ -84,13 +203,13 @@ class Proof:
           dlp_id = self.config['dlp_id']
         )
 
-        self.proof_response.ownership = 1.0 if is_data_authentic else 0.0
-        self.proof_response.authenticity = 1.0 if is_data_authentic else 0.0
+        proof_response.ownership = 1.0 if is_data_authentic else 0.0
+        proof_response.authenticity = 1.0 if is_data_authentic else 0.0
 
         if not is_data_authentic: #short circuit so we don't waste analysis
             print(f"Validation proof failed: {proof_failed_reason}")
-            self.proof_response.set_proof_is_invalid()
-            self.proof_response.attributes = {
+            proof_response.set_proof_is_invalid()
+            proof_response.attributes = {
                 'proof_valid': False,
                 'proof_failed_reason': proof_failed_reason,
                 'did_score_content': False,
@@ -98,155 +217,114 @@ class Proof:
                 'revision': data_revision,
                 'submitted_on': current_timestamp.isoformat()
             }
-            self.proof_response.metadata = metadata
-            logging.info(f"ProofResponseAttributes: {json.dumps(self.proof_response.attributes, indent=2)}")
-            return self.proof_response
+            proof_response.metadata = metadata
+            logging.info(f"ProofResponseAttributes: {json.dumps(proof_response.attributes, indent=2)}")
+            return proof_response
 
         #validate/proof data ...
         validate_data(
             self.config,
             cargo_data,
-            self.proof_response
+            proof_response
         )
 
         maximum_score = 1
         reward_factor = 100 # Maximium VFSN, Max. reward per chat --> 1 VFSN.
-        self.proof_response.quality = cargo_data.total_quality / reward_factor
-        if (self.proof_response.quality > maximum_score):
-            self.proof_response.quality = maximum_score
+        proof_response.quality = cargo_data.total_quality / reward_factor
+        if (proof_response.quality > maximum_score):
+            proof_response.quality = maximum_score
 
-        self.proof_response.uniqueness = cargo_data.total_uniqueness / reward_factor
-        if (self.proof_response.uniqueness > maximum_score):
-            self.proof_response.uniqueness = maximum_score
+        proof_response.uniqueness = cargo_data.total_uniqueness / reward_factor
+        if (proof_response.uniqueness > maximum_score):
+            proof_response.uniqueness = maximum_score
         #score data
         total_score = get_total_score(
-            self.proof_response.quality,
-            self.proof_response.uniqueness
+            proof_response.quality,
+            proof_response.uniqueness
         )
-        print(f"Scores >> Quality: {self.proof_response.quality} | Uniqueness: {self.proof_response.uniqueness} | Total: {total_score}")
+        print(f"Scores >> Quality: {proof_response.quality} | Uniqueness: {proof_response.uniqueness} | Total: {total_score}")
 
         minimum_score = 0.05 / reward_factor
-        self.proof_response.valid = True # might other factor affect it
-        self.proof_response.score = total_score
+        proof_response.valid = True # might other factor affect it
+        proof_response.score = total_score
         if total_score < minimum_score:
-            self.proof_response.score = minimum_score
+            proof_response.score = minimum_score
         if total_score > maximum_score:
-            self.proof_response.score = maximum_score
+            proof_response.score = maximum_score
 
-        print(f"Proof score: {self.proof_response.score }")
-        self.proof_response.attributes = {
-            'score': self.proof_response.score,
+        print(f"Proof score: {proof_response.score }")
+        proof_response.attributes = {
+            'score': proof_response.score,
             'did_score_content': True,
             'source': source_data.source.name,
             'revision': data_revision,
             'submitted_on': current_timestamp.isoformat() #,
             #'chat_data': cargo_data.get_chat_list_data()
         }
-        self.proof_response.metadata = metadata
+        if self.config.get('feature_extraction', False):
+            # sentiment and keywords of each chat with message text, see add_chat_features
+            proof_response.attributes['chat_data'] = cargo_data.get_chat_list_data()
+        proof_response.metadata = metadata
 
         #Submit Source data to server
+        if deadline:
+            # the validator records the submission, so the proof completes from here on
+            deadline.commit('submit_data')
         submit_data_result = submit_data(
             self.config,
             source_data
         )
+        raise_on_service_error(submit_data_result)
         if submit_data_result and not submit_data_result.is_valid :
             logging.info(f"submit data failed: {submit_data_result.error_text}")
-            self.proof_response.set_proof_is_invalid()
-            self.proof_response.attributes.pop('score', None)
-            self.proof_response.attributes.pop('did_score_content', None)
-            self.proof_response.attributes.update({
+            proof_response.set_proof_is_invalid()
+            proof_response.attributes.pop('score', None)
+            proof_response.attributes.pop('did_score_content', None)
+            proof_response.attributes.update({
                 'proof_valid': False,
                 'proof_failed_reason': submit_data_result.error_text
             })
 
-        logging.info(f"ProofResponseAttributes: {json.dumps(self.proof_response.attributes, indent=2)}")
-        return self.proof_response
+        logging.info(f"ProofResponseAttributes: {json.dumps(proof_response.attributes, indent=2)}")
+        return proof_response
 
-def get_telegram_data(
-    submission_timestamp : datetime,
-    input_content: dict,
-    source_chat_data: 'SourceChatData'
-):
-    chat_type = input_content.get('@type')
-    if chat_type == "message":
-        # Extract user ID
-        chat_user_id = input_content.get("sender_id", {}).get("user_id", "")
-        #print(f"chat_user_id: {chat_user_id}")
-        source_chat_data.add_participant(chat_user_id)
-
-        message_date = submission_timestamp
-        # Extract and convert the Unix timestamp to a datetime object
-        date_value = input_content.get("date", None)
-        if date_value:
-            message_date = datetime.utcfromtimestamp(date_value)  # Convert Unix timestamp to datetime
-            message_date = message_date.astimezone(timezone.utc)
-
-        #print(f"message_date: {message_date}")
-
-        # Extract the message content
-        message = input_content.get('content', {})
-        if isinstance(message, dict) and message.get("@type") == "messageText":
-            content = message.get("text", {}).get("text", "")
-            #print(f"Extracted content: {content}")
-            source_chat_data.add_content(
-                content,
-                message_date,
-                submission_timestamp
-            )
+def raise_on_service_error(result: Any) -> None:
+    """
+    A validator outage is not a verdict on the data: fail the proof instead of
+    writing an invalid one, after the validator client has used up its retries.
+    """
+    if result and result.service_error:
+        raise ValidatorCallError(result.error_text)
 
 
-def get_telegram_miner(
-    submission_timestamp : datetime,
-    input_content: dict,
-    source_chat_data: 'SourceChatData'
-):
-    #print(f"get_telegram_miner - input_content: {input_content}")
-    chat_type = input_content.get('className')
-    #print(f"chat_type: {chat_type}")
-    if chat_type == "Message":
-        # Extract user ID
-        chat_user_id = input_content.get("peerId", {}).get("userId", "")
-        #print(f"chat_user_id: {chat_user_id}")
-        source_chat_data.add_participant(chat_user_id)
-
-        message_date = submission_timestamp
-        # Extract and convert the Unix timestamp to a datetime object
-        date_value = input_content.get("date", None)
-        if date_value:
-            message_date = datetime.utcfromtimestamp(date_value)  # Convert Unix timestamp to datetime
-            message_date = message_date.astimezone(timezone.utc)
-
-        #print(f"message_date: {message_date}")
-
-        # Extract the message content
-        content = input_content.get('message', '')
-        #print(f"content: {content}")
-        if content :
-            source_chat_data.add_content(
-                content,
-                message_date,
-                submission_timestamp
-            )
+def get_input_source(input_source_value: str) -> DataSource:
+    input_source_value = (input_source_value or '').upper()
+    if input_source_value == 'TELEGRAM':
+        return DataSource.telegram
+    elif input_source_value == 'TELEGRAMMINER':
+        return DataSource.telegramMiner
+    raise RuntimeError(f"Unmapped data source: {input_source_value}")
+
+
+def check_revision(revision: str) -> None:
+    if (revision and revision != "01.01"):
+       raise RuntimeError(f"Invalid Revision: {revision}")
+
 
 def get_source_data(
     input_data: Dict[str, Any],
     submission_timestamp: datetime,
+    retain_contents: bool = True
  ) -> SourceData:
 
     revision = input_data.get('revision', '')
-    if (revision and revision != "01.01"):
-       raise RuntimeError(f"Invalid Revision: {revision}")
+    check_revision(revision)
 
-    input_source_value = input_data.get('source', '').upper()
-    input_source = None
-
-    if input_source_value == 'TELEGRAM':
-        input_source = DataSource.telegram
-    elif input_source_value == 'TELEGRAMMINER':
-        input_source = DataSource.telegramMiner
-    else:
-        raise RuntimeError(f"Unmapped data source: {input_source_value}")
+    input_source = get_input_source(input_data.get('source', ''))
     print(f"input_source: {input_source}")
+    schema = get_source_schema(input_source)
+    diagnostics = SchemaDiagnostics()
+    submission_epoch = to_epoch(submission_timestamp)
 
     submission_token = input_data.get('submission_token', '')
     #print("submission_token: {submission_token}")
@@ -265,28 +343,233 @@ def get_source_data(
     source_chats = source_data.source_chats
 
     for input_chat in input_chats:
-        chat_id = input_chat.get('chat_id')
-        input_contents = input_chat.get('contents', [])
-        if chat_id and input_contents:
-            source_chat = SourceChatData(
-                chat_id=chat_id
-            )
-            for input_content in input_contents:
-                if input_source == DataSource.telegram:
-                    get_telegram_data(
-                        submission_timestamp,
-                        input_content,
-                        source_chat
-                    )
-                elif input_source == DataSource.telegramMiner:
-                    get_telegram_miner(
-                        submission_timestamp,
-                        input_content,
-                        source_chat
-                    )
-                else:
-                    raise RuntimeError(f"Unhandled data source: {input_source}")
+        source_chat = get_source_chat(
+            schema,
+            submission_epoch,
+            input_chat.get('chat_id'),
+            input_chat.get('contents', []),
+            diagnostics,
+            retain_contents
+        )
+        if source_chat:
             source_chats.append(
                 source_chat
             )
+    diagnostics.report(input_source)
+    return source_data
+
+
+def get_source_data_typed(
+    document: Union[bytes, str],
+    submission_timestamp: datetime,
+    retain_contents: bool = True
+) -> Optional[SourceData]:
+    """
+    Counterpart of get_source_data decoding the export straight into the typed
+    message structs of psl_proof.models.source_messages.
+    Returns None when msgspec is not installed or the export does not match
+    the typed schema, so the caller can fall back to the per message checks.
+    """
+    export_decoder = get_typed_export_decoder()
+    if export_decoder is None:
+        return None
+    import msgspec
+    try:
+        export = export_decoder.decode(document)
+        check_revision(export.revision)
+        input_source = get_input_source(export.source)
+        schema = get_source_schema(input_source)
+        input_chats = get_typed_chats_decoder(schema).decode(export.chats)
+    except msgspec.DecodeError as e:
+        # ValidationError included, msgspec errors are not ValueErrors in every release
+        logging.info(f"Typed decoding not possible, checking messages one by one: {e}")
+        return None
+    print(f"input_source: {input_source}")
+
+    diagnostics = SchemaDiagnostics()
+    submission_epoch = to_epoch(submission_timestamp)
+    source_data = SourceData(
+        source=input_source,
+        user = export.user,
+        submission_token = export.submission_token,
+        submission_date = submission_timestamp
+    )
+    for input_chat in input_chats:
+        if not (input_chat.chat_id and input_chat.contents):
+            continue
+        source_chat = SourceChatData(
+            chat_id=input_chat.chat_id,
+            retain_contents=retain_contents
+        )
+        for record in decode_typed_messages(schema, input_chat.contents, diagnostics):
+            add_message_record(source_chat, record, submission_epoch)
+        source_data.source_chats.append(source_chat)
+    diagnostics.report(input_source)
+    return source_data
+
+
+def get_source_chat(
+    schema: SourceSchema,
+    submission_epoch: float,
+    chat_id: Any,
+    input_contents: List[dict],
+    diagnostics: SchemaDiagnostics,
+    retain_contents: bool = True
+) -> Optional[SourceChatData]:
+    if not (chat_id and input_contents):
+        return None
+    source_chat = SourceChatData(
+        chat_id=chat_id,
+        retain_contents=retain_contents
+    )
+    for record in decode_messages(schema, input_contents, diagnostics):
+        add_message_record(source_chat, record, submission_epoch)
+    return source_chat
+
+
+def get_stream_source_chat(
+    reader: JsonStreamReader,
+    schema: SourceSchema,
+    submission_epoch: float,
+    diagnostics: SchemaDiagnostics,
+    retain_contents: bool = True
+) -> Optional[SourceChatData]:
+    """
+    Reads one `chats[*]` entry from the stream, feeding its messages to the
+    source schema one at a time when `chat_id` precedes `contents`.
+    """
+    chat_id = None
+    has_chat_id = False
+    source_chat = None
+    pending_contents = None
+    for key in reader.iter_object():
+        if key == 'chat_id':
+            chat_id = reader.read_value()
+            has_chat_id = True
+        elif key == 'contents' and reader.peek() == '[':
+            if not has_chat_id:
+                # chat_id comes later in this chat, hold its contents until then
+                pending_contents = reader.read_value()
+            elif not chat_id:
+                reader.skip_value()
+            else:
+                source_chat = SourceChatData(
+                    chat_id=chat_id,
+                    retain_contents=retain_contents
+                )
+                entries_before = diagnostics.entries()
+                for record in decode_messages(schema, reader.iter_array_values(), diagnostics):
+                    add_message_record(source_chat, record, submission_epoch)
+                if diagnostics.entries() == entries_before:
+                    # empty contents, same as get_source_chat
+                    source_chat = None
+        else:
+            reader.skip_value()
+
+    if pending_contents is not None:
+        source_chat = get_source_chat(
+            schema,
+            submission_epoch,
+            chat_id,
+            pending_contents,
+            diagnostics,
+            retain_contents
+        )
+    return source_chat
+
+
+def get_source_data_stream(
+    input_stream: TextIO,
+    submission_timestamp: datetime,
+    retain_contents: bool = True,
+    on_header: Optional[Callable[[SourceData], None]] = None
+) -> SourceData:
+    """
+    Streaming counterpart of get_source_data: walks `chats[*].contents[*]`
+    message by message instead of loading the whole export first.
+    on_header is called with the SourceData as soon as source, user and
+    submission_token are known, while its chats are still being read.
+    """
+    reader = JsonStreamReader(input_stream)
+    header = {}
+    input_source = None
+    source_data = None
+    source_chats = []
+    pending_chats = None
+    schema = None
+    diagnostics = SchemaDiagnostics()
+    submission_epoch = to_epoch(submission_timestamp)
+
+    for key in reader.iter_object():
+        if key == 'revision':
+            header[key] = reader.read_value()
+            check_revision(header[key])
+        elif key == 'source':
+            header[key] = reader.read_value()
+            input_source = get_input_source(header[key])
+            print(f"input_source: {input_source}")
+            schema = get_source_schema(input_source)
+        elif key in ('submission_token', 'user'):
+            header[key] = reader.read_value()
+        elif key == 'chats' and reader.peek() == '[':
+            if input_source is None:
+                # source is declared after the chats, they can only be mapped afterwards
+                pending_chats = reader.read_value()
+                continue
+            for _ in reader.iter_array():
+                if reader.peek() != '{':
+                    reader.skip_value()
+                    continue
+                source_chat = get_stream_source_chat(
+                    reader,
+                    schema,
+                    submission_epoch,
+                    diagnostics,
+                    retain_contents
+                )
+                if source_chat:
+                    source_chats.append(source_chat)
+            continue
+        else:
+            reader.skip_value()
+            continue
+
+        if source_data is None and input_source is not None and 'user' in header and 'submission_token' in header:
+            source_data = SourceData(
+                source=input_source,
+                user = header['user'],
+                submission_token = header['submission_token'],
+                submission_date = submission_timestamp
+            )
+            source_data.source_chats = source_chats
+            if on_header:
+                on_header(source_data)
+    if reader.peek():
+        # json.load refuses it as well
+        raise ValueError(f"Invalid JSON: unexpected '{reader.peek()}' after the export")
+
+    if source_data is None:
+        if input_source is None:
+            input_source = get_input_source(header.get('source', ''))
+            schema = get_source_schema(input_source)
+        source_data = SourceData(
+            source=input_source,
+            user = header.get('user'),
+            submission_token = header.get('submission_token', ''),
+            submission_date = submission_timestamp
+        )
+        source_data.source_chats = source_chats
+
+    for input_chat in pending_chats or []:
+        source_chat = get_source_chat(
+            schema,
+            submission_epoch,
+            input_chat.get('chat_id'),
+            input_chat.get('contents', []),
+            diagnostics,
+            retain_contents
+        )
+        if source_chat:
+            source_data.source_chats.append(source_chat)
+    diagnostics.report(input_source)
     return source_data
@@ -0,0 +1,375 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import signal
+import string
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Set
+
+from psl_proof.proof import Proof
+from psl_proof.batch import INDEX_FILENAME, RESULTS_DIR_NAME, get_batch_entry, get_result_name, write_batch_result
+from psl_proof.utils.hashing_utils import file_sha256
+from psl_proof.utils.json_codec import get_json_codec
+from psl_proof.utils.metrics import collect_metrics
+from psl_proof.utils.validation_api import ValidatorCallError
+
+INBOX_DIR_NAME, PROCESSING_DIR_NAME = 'inbox', 'processing'
+DONE_DIR_NAME, FAILED_DIR_NAME = 'done', 'failed'
+PARTIAL_DIR_NAME = '.partial'  # results being written, inside results/
+LOCK_FILENAME = '.lock'
+SPOOL_INDEX_FILENAME = 'spool-index.jsonl'
+# result name given to each input file, inside results/
+RESULT_NAMES_FILENAME = '.result-names.jsonl'
+# names of files still being written into the inbox
+PARTIAL_SUFFIXES = ('.tmp', '.part', '.partial')
+# hex uuid4 prefixed to the names of claimed files
+CLAIM_ID_LENGTH = 32
+
+# inotify(7)
+IN_CLOSE_WRITE, IN_MOVED_TO = 0x00000008, 0x00000080
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+
+
+class PollingWatcher:
+    """Wakes the spool loop every poll interval to rescan the inbox."""
+    name = 'polling'
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Wakes the spool loop as soon as a file is written or moved into the inbox (Linux)."""
+    name = 'inotify'
+
+    def __init__(self, inbox_dir: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(inbox_dir), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f'inotify_add_watch failed on {inbox_dir}')
+
+    def wait(self, timeout: float) -> None:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            # the events only wake the loop, which rescans the inbox
+            try:
+                while os.read(self.fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def get_inbox_watcher(inbox_dir: str) -> Any:
+    try:
+        return InotifyWatcher(inbox_dir)
+    except (AttributeError, OSError) as e:
+        # no inotify outside Linux, or out of watches
+        logging.warning(f"inotify is unavailable ({e}), polling {inbox_dir}")
+        return PollingWatcher()
+
+
+def get_claimed_filename(claimed_name: str) -> str:
+    """Inbox name of a file in processing/, which is prefixed with its claim id."""
+    claim_id, separator, filename = claimed_name.partition('-')
+    if separator and len(claim_id) == CLAIM_ID_LENGTH and all(c in string.hexdigits for c in claim_id):
+        return filename
+    return claimed_name  # claimed before claim ids
+
+
+class Spool:
+    """
+    Proves the files dropped into <spool_dir>/inbox. A file is claimed by
+    renaming it into processing/ under a unique claim id, its result is
+    written to results/ and it then moves to done/, or to failed/ when the
+    proof raises. Completion is keyed on the SHA-256 of the file's content:
+    the result name given to each content is recorded before it is proved,
+    and results are written atomically, so a content whose result exists is
+    complete. A file whose content was proved already is reported as a
+    duplicate and moved to done/ without proving it again; files that merely
+    share a name are different inputs. After a crash or restart, claimed
+    files with a result move to done/ and the others return to the inbox.
+    Files never replace one another in done/, failed/ or the inbox.
+    A file whose proof hits a validator outage goes back to the inbox, and no
+    file is claimed for 'spool_retry_delay' seconds.
+    At most 'spool_max_in_flight' files are claimed at a time; the rest wait
+    in the inbox until a slot frees up.
+    """
+
+    def __init__(self, config: Dict[str, Any], spool_dir: str):
+        self.config = config
+        self.spool_dir = spool_dir
+        self.inbox_dir = os.path.join(spool_dir, INBOX_DIR_NAME)
+        self.processing_dir = os.path.join(spool_dir, PROCESSING_DIR_NAME)
+        self.done_dir = os.path.join(spool_dir, DONE_DIR_NAME)
+        self.failed_dir = os.path.join(spool_dir, FAILED_DIR_NAME)
+        self.results_dir = os.path.join(spool_dir, RESULTS_DIR_NAME)
+        self.partial_dir = os.path.join(self.results_dir, PARTIAL_DIR_NAME)
+        for directory in (
+            self.inbox_dir,
+            self.processing_dir,
+            self.done_dir,
+            self.failed_dir,
+            self.partial_dir
+        ):
+            os.makedirs(directory, exist_ok=True)
+
+        self.max_in_flight = config.get('spool_max_in_flight', 8)
+        self.poll_interval = config.get('spool_poll_interval', 2.0)
+        self.settle_seconds = config.get('spool_settle_seconds', 1.0)
+        self.retry_delay = config.get('spool_retry_delay', 30.0)
+        self.proof = Proof(config)
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.get('spool_workers', 4),
+            thread_name_prefix='spool-job'
+        )
+        self.in_flight: Set[Future] = set()
+        self.index_lock = threading.Lock()
+        self.move_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.claims_paused_until = 0.0
+        self.lock_file = None
+        # result name by content digest, and the digests being proved
+        self.result_names: Dict[str, str] = {}
+        self.used_names = {os.path.splitext(INDEX_FILENAME)[0]}
+        self.proving: Set[str] = set()
+        self.names_condition = threading.Condition()
+
+    def load_result_names(self) -> None:
+        names_path = os.path.join(self.results_dir, RESULT_NAMES_FILENAME)
+        if not os.path.exists(names_path):
+            return
+        codec = get_json_codec(self.config)
+        with open(names_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = codec.loads(line)
+                except ValueError:
+                    continue  # line cut short by a crash, its file was not proved
+                self.used_names.add(record['result'])
+                if 'sha256' in record:
+                    self.result_names[record['sha256']] = record['result']
+
+    def get_result_name(self, filename: str, digest: str) -> str:
+        """Result name of a file content, given on first sight and kept across restarts."""
+        result_name = self.result_names.get(digest)
+        if result_name is None:
+            result_name = get_result_name(filename, self.used_names)
+            record = {'input': filename, 'sha256': digest, 'result': result_name}
+            line = get_json_codec(self.config).dumps(record) + b'\n'
+            with open(os.path.join(self.results_dir, RESULT_NAMES_FILENAME), 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.result_names[digest] = result_name
+        return result_name
+
+    def get_result_path(self, result_name: str) -> str:
+        return os.path.join(self.results_dir, f"{result_name}.json")
+
+    def has_result(self, digest: str) -> bool:
+        result_name = self.result_names.get(digest)
+        return result_name is not None and os.path.exists(self.get_result_path(result_name))
+
+    def move_file(self, path: str, target_dir: str, filename: str) -> str:
+        """
+        Moves path into target_dir as filename, or as <name>-<n>.<extensions>
+        when that name is taken. Returns the new path.
+        """
+        name, dot, extensions = filename.partition('.')
+        with self.move_lock:
+            target_path = os.path.join(target_dir, filename)
+            suffix = 1
+            while os.path.lexists(target_path):
+                suffix += 1
+                target_path = os.path.join(target_dir, f"{name}-{suffix}{dot}{extensions}")
+            os.rename(path, target_path)
+        return target_path
+
+    def acquire_lock(self) -> None:
+        """Only one spool process may own the directory, as it takes over processing/ on start."""
+        import fcntl
+        self.lock_file = open(os.path.join(self.spool_dir, LOCK_FILENAME), 'w')
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+            raise RuntimeError(f"{self.spool_dir} is in use by another spool process")
+
+    def recover(self) -> None:
+        """Finishes or returns the files a previous run had claimed."""
+        for claimed_name in sorted(os.listdir(self.processing_dir)):
+            processing_path = os.path.join(self.processing_dir, claimed_name)
+            filename = get_claimed_filename(claimed_name)
+            if self.has_result(file_sha256(processing_path)):
+                logging.info(f"Spool: {filename} was proved before the restart, moving it to {DONE_DIR_NAME}")
+                self.move_file(processing_path, self.done_dir, filename)
+            else:
+                logging.info(f"Spool: returning {filename} to {INBOX_DIR_NAME}")
+                self.move_file(processing_path, self.inbox_dir, filename)
+
+    def list_ready_files(self) -> List[str]:
+        """Inbox files in name order, leaving out partial names and files modified too recently."""
+        ready = []
+        settled_before = time.time() - self.settle_seconds
+        with os.scandir(self.inbox_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name.endswith(PARTIAL_SUFFIXES):
+                    continue
+                try:
+                    if entry.is_file() and entry.stat().st_mtime <= settled_before:
+                        ready.append(entry.name)
+                except FileNotFoundError:
+                    continue
+        return sorted(ready)
+
+    def claim(self, filename: str) -> Optional[str]:
+        """Moves an inbox file into processing/ under a new claim id, None when it is gone."""
+        inbox_path = os.path.join(self.inbox_dir, filename)
+        processing_path = os.path.join(self.processing_dir, f"{uuid.uuid4().hex}-{filename}")
+        try:
+            os.rename(inbox_path, processing_path)
+        except FileNotFoundError:
+            return None
+        return processing_path
+
+    def start_proving(self, filename: str, digest: str) -> Optional[str]:
+        """
+        Result name to prove a content under, None when it has a result already.
+        Waits while the same content is being proved from another file.
+        """
+        with self.names_condition:
+            self.names_condition.wait_for(lambda: digest not in self.proving)
+            if self.has_result(digest):
+                return None
+            self.proving.add(digest)
+            return self.get_result_name(filename, digest)
+
+    def finish_proving(self, digest: str) -> None:
+        with self.names_condition:
+            self.proving.discard(digest)
+            self.names_condition.notify_all()
+
+    def prove_file(self, filename: str, processing_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Proves a claimed file and moves it on. Returns its index entry, or None
+        when a validator outage sent the file back to the inbox.
+        """
+        entry = get_batch_entry(os.path.join(self.inbox_dir, filename))
+        started = time.perf_counter()
+        digest = file_sha256(processing_path)
+        entry['sha256'] = digest
+        result_name = self.start_proving(filename, digest)
+        if result_name is None:
+            entry['duplicate_of'] = os.path.join(RESULTS_DIR_NAME, f"{self.result_names[digest]}.json")
+            entry['elapsed_seconds'] = time.perf_counter() - started
+            target_path = self.move_file(processing_path, self.done_dir, filename)
+            self.append_index(entry)
+            logging.warning(f"Spool: {filename} is a duplicate of {entry['duplicate_of']}, moved to {target_path}")
+            return entry
+
+        try:
+            with collect_metrics(self.config) as metrics:
+                try:
+                    proof_response = self.proof.generate_for_file(processing_path)
+                    # written aside and renamed, so a result on disk is always complete
+                    partial_path = os.path.join(self.partial_dir, f"{result_name}.json")
+                    write_batch_result(self.config, entry, proof_response, partial_path)
+                    os.replace(partial_path, self.get_result_path(result_name))
+                except ValidatorCallError as e:
+                    # an outage is not a verdict on the file, leave it for a later try
+                    self.claims_paused_until = time.monotonic() + self.retry_delay
+                    inbox_path = self.move_file(processing_path, self.inbox_dir, filename)
+                    logging.warning(
+                        f"Spool: validator unavailable proving {filename} ({e}), "
+                        f"returned it to {inbox_path}, pausing claims for {self.retry_delay}s"
+                    )
+                    return None
+                except Exception as e:
+                    logging.error(f"Error during proof generation of {filename}: {e}")
+                    traceback.print_exc()
+                    entry['error'] = str(e)
+        finally:
+            self.finish_proving(digest)
+        if metrics:
+            entry['metrics'] = metrics.to_dict()
+        entry['elapsed_seconds'] = time.perf_counter() - started
+
+        target_dir = self.failed_dir if entry['error'] else self.done_dir
+        self.move_file(processing_path, target_dir, filename)
+        self.append_index(entry)
+        logging.info(f"Spool: proved {filename} in {entry['elapsed_seconds']:.3f}s -> {os.path.basename(target_dir)}")
+        return entry
+
+    def append_index(self, entry: Dict[str, Any]) -> None:
+        line = get_json_codec(self.config).dumps(entry) + b'\n'
+        with self.index_lock, open(os.path.join(self.results_dir, SPOOL_INDEX_FILENAME), 'ab') as f:
+            f.write(line)
+
+    def fill_window(self) -> None:
+        if time.monotonic() < self.claims_paused_until:
+            return
+        for filename in self.list_ready_files():
+            if len(self.in_flight) >= self.max_in_flight or self.stopping.is_set():
+                return
+            processing_path = self.claim(filename)
+            if processing_path:
+                self.in_flight.add(self.executor.submit(
+                    self.prove_file,
+                    filename,
+                    processing_path
+                ))
+
+    def run(self) -> None:
+        """Proves inbox files until stop() is called, then lets the claimed ones finish."""
+        self.acquire_lock()
+        self.load_result_names()
+        self.recover()
+        watcher = get_inbox_watcher(self.inbox_dir)
+        logging.info(f"Spool: watching {self.inbox_dir} ({watcher.name}), {self.max_in_flight} files in flight at most")
+        try:
+            while not self.stopping.is_set():
+                self.in_flight = {future for future in self.in_flight if not future.done()}
+                self.fill_window()
+                if len(self.in_flight) >= self.max_in_flight:
+                    # new files cannot be claimed until a proof completes
+                    wait(self.in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    watcher.wait(self.poll_interval)
+        finally:
+            watcher.close()
+            self.executor.shutdown(wait=True)
+            self.lock_file.close()
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+
+def run_spool(config: Dict[str, Any], spool_dir: str) -> None:
+    """Runs the spool of spool_dir until SIGTERM / SIGINT."""
+    spool = Spool(config, spool_dir)
+
+    def stop(signum: int, frame: Any) -> None:
+        logging.info(f"Spool stopping on signal {signum}, finishing the claimed files")
+        spool.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    spool.run()
@@ -0,0 +1,123 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from psl_proof.models.cargo_data import SourceChatData
+
+# Vectorized counterparts of get_quality_score / get_uniqueness_score in
+# psl_proof.utils.validate_data, used when a submission has many chats.
+
+SECONDS_PER_HOUR = 3600
+
+
+@dataclass
+class ChatAggregates:
+    chat_ids: List[str]
+    content_length: np.ndarray     # total_content_length per chat
+    content_value: np.ndarray      # total_content_value per chat
+    participant_count: np.ndarray  # len(participants) per chat
+    chat_ended_epoch: np.ndarray   # chat_ended_epoch per chat
+
+
+def get_chat_aggregates(source_chats: List[SourceChatData]) -> ChatAggregates:
+    now = time.time()
+    return ChatAggregates(
+        chat_ids=[source_chat.chat_id_as_key() for source_chat in source_chats],
+        content_length=np.fromiter(
+            (source_chat.total_content_length for source_chat in source_chats),
+            dtype=np.float64,
+            count=len(source_chats)
+        ),
+        content_value=np.fromiter(
+            (source_chat.total_content_value for source_chat in source_chats),
+            dtype=np.float64,
+            count=len(source_chats)
+        ),
+        participant_count=np.fromiter(
+            (len(source_chat.participants) for source_chat in source_chats),
+            dtype=np.int64,
+            count=len(source_chats)
+        ),
+        chat_ended_epoch=np.fromiter(
+            (
+                source_chat.chat_ended_epoch if source_chat.chat_ended_epoch is not None else now
+                for source_chat in source_chats
+            ),
+            dtype=np.float64,
+            count=len(source_chats)
+        )
+    )
+
+
+def get_quality_scores(aggregates: ChatAggregates) -> np.ndarray:
+    content_length = aggregates.content_length
+    has_content = content_length > 0
+
+    #timeliness_value: t = exp(-a * tav), a = ln(2) / thl, tav = (𝛴 litsi) / (𝛴 li)
+    half_life = 600.0  # 600 minutes
+    time_decay = np.log(2) / half_life
+    time_avg = np.divide(
+        aggregates.content_value,
+        content_length,
+        out=np.zeros_like(content_length),
+        where=has_content
+    )
+    timeliness_value = np.where(has_content, np.exp(-time_decay * time_avg), 0.0)
+
+    # thoughtfulness (participant_count) is not weighted in the quality formula yet
+
+    #contextualness_of_conversation: l = 1 / (1 + exp(-k(c - m)))
+    m = 2.0 #midpoint
+    k = 1.0 #key parameters.
+    contextualness_of_conversation = 1.0 / (1.0 + np.exp(-k * (content_length - m)))
+
+    a = 1 # factor
+    b = 1 # factor
+    c = 1 # factor
+    t = timeliness_value
+    l = contextualness_of_conversation
+    return (a*t + b*t + c*l)/(a+b+c)
+
+
+def get_uniqueness_scores(
+    aggregates: ChatAggregates,
+    chat_history_index: Dict[str, float]
+) -> np.ndarray:
+    chat_count = len(aggregates.chat_ids)
+    if not chat_history_index:
+        return np.ones(chat_count)
+
+    has_history = np.fromiter(
+        (chat_id in chat_history_index for chat_id in aggregates.chat_ids),
+        dtype=bool,
+        count=chat_count
+    )
+    history_ended_epoch = np.fromiter(
+        (chat_history_index.get(chat_id, 0.0) for chat_id in aggregates.chat_ids),
+        dtype=np.float64,
+        count=chat_count
+    )
+    time_in_hours = (aggregates.chat_ended_epoch - history_ended_epoch) // SECONDS_PER_HOUR
+    # within 1 hour of the last submitted entry is not unique
+    return np.where(has_history & (time_in_hours <= 1), 0.0, 1.0)
+
+
+def get_batch_scores(
+    source_chats: List[SourceChatData],
+    chat_history_index: Dict[str, float]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Scores every chat of a submission in one pass.
+    Returns (has_content, quality, uniqueness) arrays aligned with source_chats.
+    """
+    aggregates = get_chat_aggregates(source_chats)
+    has_content = np.fromiter(
+        (source_chat.content_text_length() > 0 for source_chat in source_chats),
+        dtype=bool,
+        count=len(source_chats)
+    )
+    quality = get_quality_scores(aggregates)
+    uniqueness = get_uniqueness_scores(aggregates, chat_history_index)
+    return has_content, quality, uniqueness
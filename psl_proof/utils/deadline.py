@@ -0,0 +1,41 @@
+import threading
+import time
+
+
+class ProofDeadlineExceeded(Exception):
+    """A proof job ran past its deadline before submitting its data."""
+
+
+class ProofDeadline:
+    """
+    Deadline of a proof job, checked between its steps. Once the job commits
+    to submitting its data it runs to the end, as the validator records the
+    submission: the waiting side calls expire, which fails when the job has
+    committed already so it can wait for the result instead of dropping it.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.expired = False
+        self.committed = False
+        self.lock = threading.Lock()
+
+    def check(self, step: str) -> None:
+        """Raises ProofDeadlineExceeded when the deadline has passed before step."""
+        if self.expired or time.monotonic() >= self.expires_at:
+            self.expired = True
+            raise ProofDeadlineExceeded(f"Proof deadline passed before {step}")
+
+    def commit(self, step: str) -> None:
+        """Checks the deadline one last time before step, which then always runs."""
+        with self.lock:
+            self.check(step)
+            self.committed = True
+
+    def expire(self) -> bool:
+        """Ends the job at its next check, False when it has committed already."""
+        with self.lock:
+            if self.committed:
+                return False
+            self.expired = True
+            return True
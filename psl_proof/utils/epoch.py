@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+
+# Chat times are aggregated as epoch seconds and only turned into datetimes
+# for output, see SourceChatData.
+
+
+def to_epoch(value: datetime) -> float:
+    """Seconds since the Unix epoch; a naive datetime is taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def from_epoch(epoch: float) -> datetime:
+    """Timezone aware UTC datetime of epoch seconds."""
+    return datetime.fromtimestamp(epoch, timezone.utc)
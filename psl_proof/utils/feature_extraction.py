@@ -1,26 +1,242 @@
-from keybert import KeyBERT
-from transformers import pipeline
-
-def get_keywords_keybert(chats):
-    kw_model = KeyBERT(model="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-    keywords = kw_model.extract_keywords(chats)
-    return keywords
-
-def get_sentiment_data(chats):
-    #Patrick_ToCheck this model do not work...
-    #sentiment_analyzer = pipeline("sentiment-analysis", model="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
-    sentiment_analyzer = pipeline("sentiment-analysis", model="cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual")
-
-    messages = chats.split(">") #TODO use real way to split out different messages
-    #TODO: make sure no single message is too long for classification, can break it up if length too long
-    sentiments = sentiment_analyzer(messages)
-    category_scores = {"positive": 0, "neutral": 0, "negative": 0}
-    category_counts = {"positive": 0, "neutral": 0, "negative": 0}
-    for result in sentiments:
-        label = result['label'].lower()
-        category_scores[label] += result['score']
-        category_counts[label] += 1
-    # Normalize scores by dividing by the total number of messages
-    total_messages = len(messages)
-    normalized_scores = {key: (category_scores[key] / total_messages) for key in category_scores}
-    return normalized_scores
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# keybert, sentence-transformers, transformers and torch (or onnxruntime) are
+# optional and only imported once feature extraction loads its first model.
+DEFAULT_SENTIMENT_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment-multilingual"
+DEFAULT_KEYWORD_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+FEATURE_BACKENDS = ('torch', 'int8', 'onnx')
+DEFAULT_MAX_TOKENS = 512
+
+# models loaded by this process, keyed by kind, name and backend, see get_feature_model
+feature_models: Dict[Tuple[str, str, str], Any] = {}
+feature_models_lock = threading.Lock()
+
+
+def get_feature_settings(config: Optional[Dict[str, Any]]) -> Tuple[str, int]:
+    config = config or {}
+    backend = config.get('feature_backend', 'torch')
+    if backend not in FEATURE_BACKENDS:
+        raise ValueError(f"Unknown feature_backend: {backend}")
+    return backend, config.get('feature_threads', 0)
+
+
+def set_torch_threads(threads: int) -> None:
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def quantize_int8(model: Any) -> Any:
+    """Dynamic int8 quantization of the Linear layers, for CPU inference."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_sentiment_model(name: str, backend: str, threads: int) -> Any:
+    from transformers import AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    if backend == 'onnx':
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        session_options = onnxruntime.SessionOptions()
+        if threads:
+            session_options.intra_op_num_threads = threads
+        model = ORTModelForSequenceClassification.from_pretrained(
+            name,
+            export=True,
+            session_options=session_options
+        )
+    else:
+        from transformers import AutoModelForSequenceClassification
+        set_torch_threads(threads)
+        model = AutoModelForSequenceClassification.from_pretrained(name).eval()
+        if backend == 'int8':
+            model = quantize_int8(model)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+
+
+def load_keyword_model(name: str, backend: str, threads: int) -> Any:
+    from keybert import KeyBERT
+    from sentence_transformers import SentenceTransformer
+
+    if backend == 'onnx':
+        model_kwargs = {'provider': 'CPUExecutionProvider'}
+        if threads:
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = threads
+            model_kwargs['session_options'] = session_options
+        model = SentenceTransformer(name, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+    else:
+        set_torch_threads(threads)
+        model = SentenceTransformer(name, device='cpu')
+        if backend == 'int8':
+            model = quantize_int8(model)
+    return KeyBERT(model=model)
+
+
+FEATURE_MODEL_LOADERS: Dict[str, Tuple[str, str, Callable[[str, str, int], Any]]] = {
+    # kind: (config entry of the model name, default model, loader)
+    'sentiment': ('feature_sentiment_model', DEFAULT_SENTIMENT_MODEL, load_sentiment_model),
+    'keywords': ('feature_keyword_model', DEFAULT_KEYWORD_MODEL, load_keyword_model)
+}
+
+
+def get_feature_model(kind: str, config: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    The sentiment pipeline or KeyBERT model of the config, loaded on first use
+    and kept for the life of the process. 'feature_backend' selects plain
+    torch, int8 dynamically quantized torch or ONNX Runtime, and
+    'feature_threads' the CPU threads used for inference (0: library default).
+    """
+    name_key, default_name, loader = FEATURE_MODEL_LOADERS[kind]
+    name = (config or {}).get(name_key, default_name)
+    backend, threads = get_feature_settings(config)
+    key = (kind, name, backend)
+    model = feature_models.get(key)
+    if model is None:
+        with feature_models_lock:
+            model = feature_models.get(key)
+            if model is None:
+                logging.info(f"Loading {kind} model {name} ({backend})")
+                model = loader(name, backend, threads)
+                feature_models[key] = model
+    return model
+
+
+def preload_feature_models(config: Dict[str, Any]) -> None:
+    for kind in FEATURE_MODEL_LOADERS:
+        get_feature_model(kind, config)
+
+
+def get_keywords_keybert(chats, config: Optional[Dict[str, Any]] = None):
+    return get_chats_keywords([chats], config)[0]
+
+
+def get_chats_keywords(chat_texts: List[str], config: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """Keywords of each chat, the chats' embeddings computed together."""
+    kw_model = get_feature_model('keywords', config)
+    keywords = kw_model.extract_keywords(chat_texts)
+    # KeyBERT unwraps the result of a single document
+    return [keywords] if len(chat_texts) == 1 else keywords
+
+
+def get_sentiment_data(messages: List[str], config: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    return get_chats_sentiment([messages], config)[0]
+
+
+def get_token_window(sentiment_analyzer: Any) -> int:
+    """Tokens of one message chunk: the model's input length less its special tokens."""
+    tokenizer = sentiment_analyzer.tokenizer
+    # model_max_length is a huge placeholder on tokenizers that do not set it
+    max_length = min(
+        tokenizer.model_max_length,
+        getattr(sentiment_analyzer.model.config, 'max_position_embeddings', DEFAULT_MAX_TOKENS)
+    )
+    return max_length - tokenizer.num_special_tokens_to_add(pair=False)
+
+
+def get_pad_token_id(tokenizer: Any) -> int:
+    """
+    Id filling the padded positions of a batch, which the attention mask hides:
+    the pad token, else the end of sequence token (tokenizers of decoder models
+    often have no pad token), else 0.
+    """
+    for token_id in (tokenizer.pad_token_id, tokenizer.eos_token_id):
+        if token_id is not None:
+            return token_id
+    return 0
+
+
+def classify_batch(
+    model: Any,
+    input_ids: List[List[int]],
+    attention_mask: List[List[int]],
+    backend: str
+) -> List[List[float]]:
+    """Label probabilities of each row; ONNX Runtime models take NumPy arrays, so torch is not needed."""
+    if backend == 'onnx':
+        import numpy as np
+        logits = model(
+            input_ids=np.array(input_ids, dtype=np.int64),
+            attention_mask=np.array(attention_mask, dtype=np.int64)
+        ).logits
+        logits = np.asarray(logits, dtype=np.float64)
+        exponentials = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return (exponentials / exponentials.sum(axis=-1, keepdims=True)).tolist()
+
+    import torch
+    with torch.inference_mode():
+        logits = model(
+            input_ids=torch.tensor(input_ids, dtype=torch.long),
+            attention_mask=torch.tensor(attention_mask, dtype=torch.long)
+        ).logits
+        return torch.softmax(logits.float(), dim=-1).tolist()
+
+
+def get_chats_sentiment(
+    chat_messages: List[List[str]],
+    config: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, float]]:
+    """
+    Sentiment of each chat: the share of its messages per label, weighted by
+    the classifier's confidence. The messages of all chats are classified
+    together in 'feature_batch_size' batches of similar token length, so
+    little of a batch is padding; a message longer than the model's window is
+    split into window sized chunks whose label probabilities are averaged,
+    weighted by their token counts.
+    """
+    sentiment_analyzer = get_feature_model('sentiment', config)
+    tokenizer, model = sentiment_analyzer.tokenizer, sentiment_analyzer.model
+    backend, _ = get_feature_settings(config)
+    batch_size = (config or {}).get('feature_batch_size', 32)
+    window = get_token_window(sentiment_analyzer)
+    pad_token_id = get_pad_token_id(tokenizer)
+
+    # one unit per message chunk: (chat, message of the chat, token ids)
+    units = []
+    for chat_index, messages in enumerate(chat_messages):
+        if not messages:
+            continue
+        token_ids = tokenizer(messages, add_special_tokens=False)['input_ids']
+        for message_index, ids in enumerate(token_ids):
+            for offset in range(0, max(len(ids), 1), window):
+                units.append((chat_index, message_index, ids[offset:offset + window]))
+    units.sort(key=lambda unit: len(unit[2]))
+
+    # label probabilities of each message, summed over its chunks weighted by length
+    message_probabilities: Dict[Tuple[int, int], List[float]] = {}
+    for start in range(0, len(units), batch_size):
+        batch = units[start:start + batch_size]
+        inputs = [tokenizer.build_inputs_with_special_tokens(ids) for _, _, ids in batch]
+        # padded to the longest unit of the batch, units being sorted by length
+        width = max(len(unit_ids) for unit_ids in inputs)
+        input_ids = [unit_ids + [pad_token_id] * (width - len(unit_ids)) for unit_ids in inputs]
+        attention_mask = [[1] * len(unit_ids) + [0] * (width - len(unit_ids)) for unit_ids in inputs]
+        probabilities = classify_batch(model, input_ids, attention_mask, backend)
+        for (chat_index, message_index, ids), unit_probabilities in zip(batch, probabilities):
+            key = (chat_index, message_index)
+            weight = max(len(ids), 1)
+            summed = message_probabilities.setdefault(key, [0.0] * len(unit_probabilities))
+            for label_id, probability in enumerate(unit_probabilities):
+                summed[label_id] += probability * weight
+
+    id2label = model.config.id2label
+    sentiments = []
+    for chat_index, messages in enumerate(chat_messages):
+        category_scores = {"positive": 0.0, "neutral": 0.0, "negative": 0.0}
+        for message_index in range(len(messages)):
+            summed = message_probabilities[(chat_index, message_index)]
+            label_id = max(range(len(summed)), key=summed.__getitem__)
+            label = id2label[label_id].lower()
+            category_scores[label] = category_scores.get(label, 0.0) + summed[label_id] / sum(summed)
+        # Normalize scores by dividing by the total number of messages
+        total_messages = len(messages)
+        sentiments.append({
+            key: (score / total_messages if total_messages else 0.0)
+            for key, score in category_scores.items()
+        })
+    return sentiments
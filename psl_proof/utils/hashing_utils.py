@@ -1,7 +1,6 @@
 import pickle
 import base64
 import hashlib
-from pybloom_live import BloomFilter
 
 def salted_data(value, salt):
     """
@@ -33,7 +32,18 @@ def deserialize_bloom_filter_base64(base64_bloom):
     pickled_bloom = base64.b64decode(base64_bloom.encode('utf-8'))  # Decode Base64 to bytes
     return pickle.loads(pickled_bloom)  # Deserialize with pickle
 
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Hex SHA-256 digest of a file's content, read chunk by chunk.
+    """
+    sha256_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
 ## EXAMPLE USAGE OF BLOOM FILTER
+# from pybloom_live import BloomFilter
 # # Configuration
 # capacity = 150  # Set the capacity based on expected number of items
 # error_rate = 0.001  # Low false positive rate
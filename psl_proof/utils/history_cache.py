@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+from psl_proof.models.cargo_data import SourceData
+from psl_proof.utils.metrics import add_metric_counts
+
+# parts of a historical-data response that do not depend on the submission being proved
+CACHED_HISTORY_KEYS = ("lastSubmission", "chatHistories")
+
+
+@dataclass
+class CachedHistory:
+    result_json: Dict[str, Any]   # chat histories and last submission of a historical-data response
+    etag: Optional[str]
+    fetched_at: float
+    is_fresh: bool
+
+
+class HistoryCache:
+    """
+    On-disk (SQLite) cache of the chat histories in the validator's
+    historical-data responses, keyed by SourceData.submission_by(). The verdict
+    on a submission (isValid / errorText) is never cached: every proof asks the
+    validator, a fresh entry (younger than `ttl_seconds`) only letting it
+    answer 304 or a delta instead of the full history. The least recently used
+    entries beyond `max_entries` are evicted.
+    Fetches are counted as revalidations (conditional requests for a fresh
+    entry), of which not_modified and delta_updates avoided the full history,
+    and full fetches; each is also added to the proof's metrics counters.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        import sqlite3  # only loaded when the cache is configured
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " cache_key TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " result_json TEXT NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS history_accessed_at ON history (accessed_at)")
+        self.connection.commit()
+        self.stats = {
+            'revalidations': 0,
+            'not_modified': 0,
+            'delta_updates': 0,
+            'full_fetches': 0,
+            'evictions': 0,
+            'revalidation_seconds': 0.0,
+            'full_fetch_seconds': 0.0
+        }
+
+    def get(self, cache_key: str) -> Optional[CachedHistory]:
+        cached = self.peek(cache_key)
+        if cached is None:
+            return None
+        with self.lock:
+            self.connection.execute(
+                "UPDATE history SET accessed_at = ? WHERE cache_key = ?",
+                (time.time(), cache_key)
+            )
+            self.connection.commit()
+        return cached
+
+    def peek(self, cache_key: str) -> Optional[CachedHistory]:
+        """Reads an entry without counting the lookup or touching its LRU position."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT result_json, etag, fetched_at FROM history WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        result_json, etag, fetched_at = row
+        return CachedHistory(
+            result_json=json.loads(result_json),
+            etag=etag,
+            fetched_at=fetched_at,
+            is_fresh=time.time() - fetched_at < self.ttl_seconds
+        )
+
+    def put(
+        self,
+        cache_key: str,
+        result_json: Dict[str, Any],
+        etag: Optional[str] = None,
+        is_delta: bool = False,
+        fetched_at: Optional[float] = None
+    ) -> None:
+        """Stores a history, as fetched now unless fetched_at says otherwise."""
+        now = time.time()
+        history_json = {key: result_json[key] for key in CACHED_HISTORY_KEYS if key in result_json}
+        if is_delta:
+            add_metric_counts(history_delta_updates=1)
+        with self.lock:
+            if is_delta:
+                self.stats['delta_updates'] += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO history (cache_key, etag, fetched_at, accessed_at, result_json)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (cache_key, etag, now if fetched_at is None else fetched_at, now, json.dumps(history_json))
+            )
+            self.evict()
+            self.connection.commit()
+
+    def refresh(self, cache_key: str) -> None:
+        """Marks an entry fresh again after the validator confirmed it unchanged."""
+        now = time.time()
+        add_metric_counts(history_not_modified=1)
+        with self.lock:
+            self.connection.execute(
+                "UPDATE history SET fetched_at = ?, accessed_at = ? WHERE cache_key = ?",
+                (now, now, cache_key)
+            )
+            self.connection.commit()
+            self.stats['not_modified'] += 1
+
+    def evict(self) -> None:
+        count = self.connection.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM history WHERE cache_key IN"
+                " (SELECT cache_key FROM history ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            self.stats['evictions'] += excess
+
+    def record_fetch(self, revalidation: bool, seconds: float) -> None:
+        """Counts a historical-data call: a conditional one for a fresh entry, or a full fetch."""
+        count_key, seconds_key = ('revalidations', 'revalidation_seconds') if revalidation \
+            else ('full_fetches', 'full_fetch_seconds')
+        add_metric_counts(**{f'history_{count_key}': 1})
+        with self.lock:
+            self.stats[count_key] += 1
+            self.stats[seconds_key] += seconds
+
+    def record_submission(self, cache_key: str, source_data: SourceData) -> None:
+        """
+        Folds an accepted submission into its cached history, so the next proof of
+        the same user sees it (cool down, uniqueness) without refetching. The
+        result is no longer the validator's version: its ETag is dropped, so the
+        validator cannot answer 304 for it, and it keeps the time of the actual
+        fetch, so the next delta covers everything since.
+        """
+        cached = self.peek(cache_key)
+        if cached is None:
+            return
+        previous_chats = {
+            chat_history.get("sourceChatId"): chat_history.get("chats", [])
+            for chat_history in cached.result_json.get("chatHistories", [])
+        }
+        delta_json = get_submission_history_json(source_data)
+        for chat_history in delta_json["chatHistories"]:
+            # the new record goes first, uniqueness scoring reads the most recent one
+            chat_history["chats"] += previous_chats.get(chat_history["sourceChatId"], [])
+        self.put(
+            cache_key,
+            merge_history_delta(cached.result_json, delta_json),
+            fetched_at=cached.fetched_at
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.stats)
+        fetches = stats['revalidations'] + stats['full_fetches']
+        # share of the fetches answered without the full history
+        stats['hit_rate'] = (stats['not_modified'] + stats['delta_updates']) / fetches if fetches else 0.0
+        stats['avg_revalidation_seconds'] = (
+            stats['revalidation_seconds'] / stats['revalidations'] if stats['revalidations'] else 0.0
+        )
+        stats['avg_full_fetch_seconds'] = (
+            stats['full_fetch_seconds'] / stats['full_fetches'] if stats['full_fetches'] else 0.0
+        )
+        return stats
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logging.info(
+            f"History cache: {stats['hit_rate']:.0%} of {stats['revalidations'] + stats['full_fetches']} fetches"
+            f" answered without the full history ({stats['not_modified']} not modified,"
+            f" {stats['delta_updates']} deltas), {stats['full_fetches']} full fetches,"
+            f" avg {stats['avg_revalidation_seconds']:.3f}s revalidating / {stats['avg_full_fetch_seconds']:.3f}s fetching"
+        )
+
+
+def get_submission_history_json(source_data: SourceData) -> Dict[str, Any]:
+    """A submission in the shape of a historical-data delta response."""
+    submission_json = source_data.to_submission_json()
+    return {
+        "lastSubmission": submission_json["SubmittedOn"],
+        "chatHistories": [
+            {
+                "sourceChatId": chat["SourceChatId"],
+                "chats": [{
+                    "participantCount": chat["ParticipantCount"],
+                    "chatCount": chat["ChatCount"],
+                    "chatLength": chat["ChatLength"],
+                    "chatStartOn": chat["ChatStartOn"],
+                    "chatEndedOn": chat["ChatEndedOn"]
+                }]
+            }
+            for chat in submission_json["Chats"]
+        ]
+    }
+
+
+def merge_history_delta(result_json: Dict[str, Any], delta_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Applies a delta response, holding only the chats that changed with their full
+    records, to a cached historical-data response.
+    """
+    chat_histories = {
+        chat_history.get("sourceChatId"): chat_history
+        for chat_history in result_json.get("chatHistories", [])
+    }
+    for chat_history in delta_json.get("chatHistories", []):
+        chat_histories[chat_history.get("sourceChatId")] = chat_history
+    merged_json = dict(result_json)
+    merged_json["chatHistories"] = list(chat_histories.values())
+    for key in ("lastSubmission", "isValid", "errorText"):
+        if key in delta_json:
+            merged_json[key] = delta_json[key]
+    return merged_json
+
+
+# one cache connection per process and path
+history_caches: Dict[Any, HistoryCache] = {}
+
+def get_history_cache(config: Dict[str, Any]) -> Optional[HistoryCache]:
+    """The configured history cache, None when 'history_cache_path' is not set."""
+    path = config.get('history_cache_path')
+    if not path:
+        return None
+    key = (os.getpid(), path)
+    cache = history_caches.get(key)
+    if cache is None:
+        cache = HistoryCache(
+            path,
+            config.get('history_cache_ttl', 300),
+            config.get('history_cache_max_entries', 10000)
+        )
+        history_caches[key] = cache
+    return cache
@@ -0,0 +1,223 @@
+import io
+import logging
+import os
+import zipfile
+from contextlib import ExitStack, contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, TextIO
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class InputLimitError(ValueError):
+    """Compressed input decompresses beyond the configured size or ratio limits."""
+
+
+class LimitedReader(io.RawIOBase):
+    """
+    Binary stream wrapper counting the bytes actually decompressed, so a zip
+    member lying about its size in the header still cannot exceed the limits.
+    """
+
+    def __init__(
+        self,
+        raw: BinaryIO,
+        name: str,
+        compressed_size: int,
+        max_bytes: int,
+        max_ratio: float
+    ):
+        self.raw = raw
+        self.name = name
+        self.compressed_size = compressed_size
+        self.max_bytes = max_bytes
+        self.max_ratio = max_ratio
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        check_input_limits(self.name, self.bytes_read, self.compressed_size, self.max_bytes, self.max_ratio)
+        return size
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+
+def check_input_limits(
+    name: str,
+    uncompressed_size: int,
+    compressed_size: int,
+    max_bytes: int,
+    max_ratio: float
+) -> None:
+    if max_bytes and uncompressed_size > max_bytes:
+        raise InputLimitError(f"{name} decompresses to more than {max_bytes} bytes")
+    if max_ratio and uncompressed_size > max(compressed_size, 1) * max_ratio:
+        raise InputLimitError(f"{name} exceeds the compression ratio limit of {max_ratio}")
+
+
+def get_input_limits(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'max_bytes': config.get('input_max_uncompressed_bytes', 0),
+        'max_ratio': config.get('input_max_compression_ratio', 0)
+    }
+
+
+def open_zip_member(zip_ref: zipfile.ZipFile, member: zipfile.ZipInfo, config: Dict[str, Any]) -> LimitedReader:
+    limits = get_input_limits(config)
+    # reject on the declared size first, the reader enforces the actual one
+    check_input_limits(member.filename, member.file_size, member.compress_size, **limits)
+    return LimitedReader(zip_ref.open(member), member.filename, member.compress_size, **limits)
+
+
+def get_zip_json_member(zip_ref: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """The export inside an input archive: its first .json file, else its first file."""
+    members = [member for member in zip_ref.infolist() if not member.is_dir()]
+    if not members:
+        raise ValueError(f"{zip_ref.filename} holds no files")
+    for member in members:
+        if member.filename.lower().endswith('.json'):
+            return member
+    return members[0]
+
+
+def open_gzip(raw: BinaryIO) -> BinaryIO:
+    import gzip
+    return gzip.GzipFile(fileobj=raw, mode='rb')
+
+
+def open_zstd(raw: BinaryIO) -> BinaryIO:
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compressed input requires the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+
+
+def open_lz4(raw: BinaryIO) -> BinaryIO:
+    try:
+        import lz4.frame
+    except ImportError:
+        raise ValueError("lz4 compressed input requires the lz4 package")
+    return lz4.frame.LZ4FrameFile(raw, mode='rb')
+
+
+# magic bytes -> (codec name, opener returning the decompressed binary stream)
+INPUT_CODECS: Dict[bytes, Any] = {
+    b'\x1f\x8b': ('gzip', open_gzip),
+    b'\x28\xb5\x2f\xfd': ('zstd', open_zstd),
+    b'\x04\x22\x4d\x18': ('lz4', open_lz4)
+}
+MAGIC_SIZE = max(len(magic) for magic in INPUT_CODECS)
+
+
+def register_input_codec(magic: bytes, name: str, opener: Callable[[BinaryIO], BinaryIO]) -> None:
+    global MAGIC_SIZE
+    INPUT_CODECS[magic] = (name, opener)
+    MAGIC_SIZE = max(MAGIC_SIZE, len(magic))
+
+
+def get_input_codec(header: bytes) -> Optional[Any]:
+    for magic, codec in INPUT_CODECS.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+@contextmanager
+def open_input(input_file: str, config: Dict[str, Any]) -> Iterator[TextIO]:
+    """
+    Opens an input file as JSON text. A zip input is read straight from the
+    archive, and gzip / zstd / lz4 data (a file or the archive's member) is
+    recognised by its magic bytes; either way it is decompressed as the
+    parser consumes it, within the configured size and ratio limits.
+    """
+    with ExitStack() as stack:
+        if zipfile.is_zipfile(input_file):
+            zip_ref = stack.enter_context(zipfile.ZipFile(input_file, 'r'))
+            member = get_zip_json_member(zip_ref)
+            raw = stack.enter_context(open_zip_member(zip_ref, member, config))
+            raw = stack.enter_context(io.BufferedReader(raw, COPY_CHUNK_SIZE))
+            name, compressed_size = member.filename, member.compress_size
+        else:
+            raw = stack.enter_context(open(input_file, 'rb'))
+            name, compressed_size = input_file, os.path.getsize(input_file)
+
+        codec = get_input_codec(raw.peek(MAGIC_SIZE)[:MAGIC_SIZE])
+        if codec:
+            codec_name, opener = codec
+            logging.info(f"Reading {codec_name} compressed input {name}")
+            decompressed = stack.enter_context(opener(raw))
+            limited = LimitedReader(decompressed, name, compressed_size, **get_input_limits(config))
+            raw = stack.enter_context(io.BufferedReader(limited, COPY_CHUNK_SIZE))
+        yield stack.enter_context(io.TextIOWrapper(raw, encoding='utf-8'))
+
+
+def extract_zip(input_file: str, output_dir: str, config: Dict[str, Any]) -> List[str]:
+    """
+    Extracts an archive into output_dir within the configured limits, returns
+    the files written. The size limit also applies to the members together;
+    when a limit trips, the files written from the archive are removed.
+    """
+    import shutil
+    output_root = os.path.realpath(output_dir)
+    max_bytes = get_input_limits(config)['max_bytes']
+    extracted = []
+    extracted_bytes = 0
+    try:
+        with zipfile.ZipFile(input_file, 'r') as zip_ref:
+            for member in zip_ref.infolist():
+                output_path = os.path.realpath(os.path.join(output_root, member.filename))
+                if os.path.commonpath([output_root, output_path]) != output_root:
+                    raise ValueError(f"{input_file}: member {member.filename} escapes {output_dir}")
+                if member.is_dir():
+                    os.makedirs(output_path, exist_ok=True)
+                    continue
+                check_input_limits(input_file, extracted_bytes + member.file_size, 0, max_bytes, 0)
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open_zip_member(zip_ref, member, config) as source, open(output_path, 'wb') as target:
+                    extracted.append(output_path)
+                    shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+                extracted_bytes += source.bytes_read
+                check_input_limits(input_file, extracted_bytes, 0, max_bytes, 0)
+    except BaseException:
+        for path in extracted:
+            if os.path.isfile(path):
+                os.remove(path)
+        raise
+    return extracted
+
+
+def extract_inputs(input_dir: str, config: Dict[str, Any], workers: Optional[int] = None) -> List[str]:
+    """
+    Extracts every zip in input_dir into input_dir. Archives are extracted in
+    parallel threads, zlib releases the GIL while inflating.
+    """
+    zip_files = [
+        os.path.join(input_dir, input_filename)
+        for input_filename in sorted(os.listdir(input_dir))
+        if zipfile.is_zipfile(os.path.join(input_dir, input_filename))
+    ]
+    if not zip_files:
+        return []
+    from concurrent.futures import ThreadPoolExecutor
+
+    def extract(zip_file: str) -> List[str]:
+        # a refused archive is left out, the others are still proved
+        try:
+            return extract_zip(zip_file, input_dir, config)
+        except (ValueError, zipfile.BadZipFile) as e:
+            logging.error(f"Skipping archive {zip_file}: {e}")
+            return []
+
+    workers = min(workers or config.get('extract_workers', 4), len(zip_files))
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        extracted = list(executor.map(extract, zip_files))
+    logging.info(f"Extracted {len(zip_files)} archives with {workers} workers")
+    return [output_path for output_paths in extracted for output_path in output_paths]
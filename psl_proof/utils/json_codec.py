@@ -0,0 +1,110 @@
+import json
+import logging
+from typing import Any, BinaryIO, Callable, Dict, Optional, TextIO, Union
+
+JSON_BACKENDS = ('orjson', 'msgspec', 'json')
+
+
+class JsonCodec:
+    """
+    JSON encode / decode through the fastest backend available: orjson, then
+    msgspec, then the standard library. Encoding returns UTF-8 bytes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loads: Callable[[Union[bytes, str]], Any],
+        dumps: Callable[[Any, bool], bytes]
+    ):
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """Decodes a document, raising ValueError when it is not valid JSON."""
+        return self._loads(data)
+
+    def dumps(self, value: Any, indent: bool = False) -> bytes:
+        return self._dumps(value, indent)
+
+    def load(self, f: Union[BinaryIO, TextIO]) -> Any:
+        return self.loads(f.read())
+
+    def dump(self, value: Any, f: BinaryIO, indent: bool = False) -> None:
+        f.write(self.dumps(value, indent))
+
+
+def get_orjson_codec() -> JsonCodec:
+    import orjson
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(value: Any, indent: bool) -> bytes:
+        return orjson.dumps(value, option=options | orjson.OPT_INDENT_2 if indent else options)
+
+    # orjson.JSONDecodeError is a ValueError already
+    return JsonCodec('orjson', orjson.loads, dumps)
+
+
+def get_msgspec_codec() -> JsonCodec:
+    import msgspec
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def loads(data: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    def dumps(value: Any, indent: bool) -> bytes:
+        data = encoder.encode(value)
+        return msgspec.json.format(data, indent=2) if indent else data
+
+    return JsonCodec('msgspec', loads, dumps)
+
+
+def get_stdlib_codec() -> JsonCodec:
+    def dumps(value: Any, indent: bool) -> bytes:
+        return json.dumps(value, indent=2 if indent else None).encode('utf-8')
+
+    return JsonCodec('json', json.loads, dumps)
+
+
+JSON_CODEC_FACTORIES = {
+    'orjson': get_orjson_codec,
+    'msgspec': get_msgspec_codec,
+    'json': get_stdlib_codec
+}
+
+# one codec per requested backend, see get_json_codec
+json_codecs: Dict[str, JsonCodec] = {}
+
+
+def get_json_codec(config: Optional[Dict[str, Any]] = None) -> JsonCodec:
+    """
+    The codec of the 'json_backend' config entry: 'auto' (default) picks the
+    first installed of orjson, msgspec and the standard library json module.
+    """
+    backend = (config or {}).get('json_backend', 'auto')
+    codec = json_codecs.get(backend)
+    if codec is not None:
+        return codec
+
+    if backend == 'auto':
+        candidates = JSON_BACKENDS
+    elif backend in JSON_CODEC_FACTORIES:
+        candidates = (backend, 'json')
+    else:
+        raise ValueError(f"Unknown json_backend: {backend}")
+
+    for candidate in candidates:
+        try:
+            codec = JSON_CODEC_FACTORIES[candidate]()
+            break
+        except ImportError:
+            if backend != 'auto':
+                logging.warning(f"json_backend {backend} is not installed, using the json module")
+    logging.info(f"Using JSON backend: {codec.name}")
+    json_codecs[backend] = codec
+    return codec
@@ -0,0 +1,129 @@
+import json
+from typing import Any, Iterator, TextIO
+
+WHITESPACE = " \t\n\r"
+NUMBER_START = "-0123456789"
+NUMBER_CHARS = "+-.eE0123456789"
+
+
+class JsonStreamReader:
+    """
+    Incremental reader over a JSON text stream.
+    Containers are walked key by key / element by element, and only the
+    values the caller asks for are decoded, so memory is bounded by the
+    largest single value read rather than by the whole document.
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int = 64 * 1024):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Reads more text into the buffer, dropping what was consumed already."""
+        if self._eof:
+            return False
+        chunk = self._stream.read(max(self._chunk_size, min_size))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it, '' at end of input."""
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' but found '{found or 'end of input'}'")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Decodes the next complete JSON value."""
+        first = self.peek()
+        if not first:
+            raise ValueError("Invalid JSON: unexpected end of input")
+        if first in NUMBER_START:
+            # A number touching the end of the buffer may be cut short, e.g. "12" of "12.5".
+            while self._number_end() == len(self._buffer) and self._fill():
+                pass
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                self._pos = end
+                return value
+            except json.JSONDecodeError:
+                # Grow geometrically so a large value is not re-scanned once per chunk.
+                if not self._fill(len(self._buffer) - self._pos):
+                    raise
+
+    def _number_end(self) -> int:
+        buffer = self._buffer
+        end = self._pos
+        while end < len(buffer) and buffer[end] in NUMBER_CHARS:
+            end += 1
+        return end
+
+    def skip_value(self) -> None:
+        self.read_value()
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Yields the keys of the next JSON object.
+        After each key the caller must consume its value (read_value, skip_value,
+        iter_object or iter_array) before resuming the iteration.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Invalid JSON: object key must be a string, found {key!r}")
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Invalid JSON: expected ',' or '}}' but found '{separator or 'end of input'}'")
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Steps through the elements of the next JSON array.
+        Each time it yields, the caller must consume exactly one element.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            separator = self.peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Invalid JSON: expected ',' or ']' but found '{separator or 'end of input'}'")
+
+    def iter_array_values(self) -> Iterator[Any]:
+        """Yields the decoded elements of the next JSON array, one at a time."""
+        for _ in self.iter_array():
+            yield self.read_value()
@@ -0,0 +1,180 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class ProofMetrics:
+    """
+    Timings and sizes of one proof, or of one run in batch mode: wall / CPU time
+    and memory per phase, latency and payload sizes per validator call and
+    a few counters. Only sizes and counts are kept, never chat content.
+    CPU time is process wide, so phases of concurrent proofs overlap in it.
+    The peak of Python allocations in a phase (peak_bytes) is only known with
+    trace_memory; without it, a phase records how far it raised the peak RSS
+    of the process (rss_peak_growth_bytes), as ru_maxrss never goes down.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.http_calls: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.lock = threading.Lock()
+
+    def add_phase(
+        self,
+        name: str,
+        wall_seconds: float,
+        cpu_seconds: float,
+        peak_bytes: Optional[int],
+        rss_peak_growth_bytes: Optional[int] = None
+    ) -> None:
+        with self.lock:
+            phase = self.phases.setdefault(name, {
+                'calls': 0,
+                'wall_seconds': 0.0,
+                'cpu_seconds': 0.0,
+                'peak_bytes': None,
+                'rss_peak_growth_bytes': None
+            })
+            phase['calls'] += 1
+            phase['wall_seconds'] += wall_seconds
+            phase['cpu_seconds'] += cpu_seconds
+            if peak_bytes is not None:
+                phase['peak_bytes'] = max(phase['peak_bytes'] or 0, peak_bytes)
+            if rss_peak_growth_bytes is not None:
+                phase['rss_peak_growth_bytes'] = (phase['rss_peak_growth_bytes'] or 0) + rss_peak_growth_bytes
+
+    def add_http_call(
+        self,
+        api_path: str,
+        status_code: Optional[int],
+        seconds: float,
+        request_bytes: int,
+        response_bytes: int
+    ) -> None:
+        with self.lock:
+            self.http_calls.append({
+                'api_path': api_path,
+                'status_code': status_code,
+                'seconds': seconds,
+                'request_bytes': request_bytes,
+                'response_bytes': response_bytes
+            })
+
+    def add_counts(self, **counts: int) -> None:
+        with self.lock:
+            for name, count in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            phases = {name: dict(phase) for name, phase in self.phases.items()}
+            http_calls = list(self.http_calls)
+            counters = dict(self.counters)
+        parse = phases.get('parse')
+        if parse and parse['wall_seconds'] > 0 and 'messages' in counters:
+            counters['messages_per_second'] = counters['messages'] / parse['wall_seconds']
+        return {
+            'wall_seconds': time.perf_counter() - self.started,
+            'cpu_seconds': time.process_time() - self.cpu_started,
+            'peak_rss_bytes': get_peak_rss_bytes(),
+            'memory_peaks': 'traced' if self.trace_memory else 'rss',
+            'phases': phases,
+            'http': {
+                'count': len(http_calls),
+                'seconds': sum(call['seconds'] for call in http_calls),
+                'request_bytes': sum(call['request_bytes'] for call in http_calls),
+                'response_bytes': sum(call['response_bytes'] for call in http_calls),
+                'calls': http_calls
+            },
+            'counters': counters
+        }
+
+
+# metrics of the proof being generated in this context, None when not collected
+current_metrics: ContextVar[Optional[ProofMetrics]] = ContextVar('current_metrics', default=None)
+
+
+def get_current_metrics() -> Optional[ProofMetrics]:
+    return current_metrics.get()
+
+
+def get_peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def collect_metrics(config: Dict[str, Any]) -> Iterator[Optional[ProofMetrics]]:
+    """
+    Collects the metrics of everything run in this context when 'metrics' is
+    configured, yields None otherwise. With 'metrics_trace_memory' the peak
+    of each phase is measured with tracemalloc (slower); otherwise only the
+    growth of the process peak RSS during each phase is known.
+    """
+    if not config.get('metrics', False):
+        yield None
+        return
+    trace_memory = config.get('metrics_trace_memory', False)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    metrics = ProofMetrics(trace_memory)
+    token = current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current_metrics.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def measure_phase(name: str) -> Iterator[None]:
+    """Records the time spent in a phase, also usable as a function decorator."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    traced = metrics.trace_memory and tracemalloc.is_tracing()
+    if traced:
+        tracemalloc.reset_peak()
+    rss_peak_started = get_peak_rss_bytes()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        yield
+    finally:
+        peak_bytes = tracemalloc.get_traced_memory()[1] if traced else None
+        rss_peak_growth_bytes = None
+        if rss_peak_started is not None:
+            # ru_maxrss is the peak of the whole process lifetime, so only how
+            # far it moved during the phase says anything about the phase; with
+            # concurrent proofs the growth may come from another one
+            rss_peak_growth_bytes = get_peak_rss_bytes() - rss_peak_started
+        metrics.add_phase(
+            name,
+            time.perf_counter() - started,
+            time.process_time() - cpu_started,
+            peak_bytes,
+            rss_peak_growth_bytes
+        )
+
+
+def add_metric_counts(**counts: int) -> None:
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.add_counts(**counts)
@@ -0,0 +1,243 @@
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from psl_proof.models.cargo_data import DataSource, SourceChatData
+from psl_proof.utils.metrics import add_metric_counts
+
+
+class MessageRecord(NamedTuple):
+    """One chat message reduced to what the proof uses."""
+    sender_id: Union[int, str, None]
+    date: Union[int, float, None]  # epoch seconds, None: use the submission time
+    text: str
+
+
+EXPORT_DECODER_KEY = 'export'
+
+
+class MalformedMessageError(ValueError):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class SchemaDiagnostics:
+    """Counts of the messages of one input file, by outcome."""
+    messages: int = 0     # decoded into a record
+    skipped: int = 0      # not a chat message (service entries and the like)
+    malformed: Dict[str, int] = field(default_factory=dict)  # rejected, by reason
+
+    def add_malformed(self, reason: str) -> None:
+        self.malformed[reason] = self.malformed.get(reason, 0) + 1
+
+    def malformed_count(self) -> int:
+        return sum(self.malformed.values())
+
+    def entries(self) -> int:
+        return self.messages + self.skipped + self.malformed_count()
+
+    def report(self, input_source: DataSource) -> None:
+        add_metric_counts(
+            messages=self.messages,
+            skipped_entries=self.skipped,
+            malformed_messages=self.malformed_count()
+        )
+        logging.info(f"{input_source.name}: {self.messages} messages, {self.skipped} skipped entries")
+        if self.malformed:
+            logging.warning(f"{input_source.name}: rejected {self.malformed_count()} malformed messages: {self.malformed}")
+
+
+def is_epoch(value: Any) -> bool:
+    return value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+
+
+def is_sender_id(value: Any) -> bool:
+    return value is None or (isinstance(value, (int, str)) and not isinstance(value, bool))
+
+
+class SourceSchema(ABC):
+    """
+    Decodes the messages of one export format into MessageRecords.
+    decode returns None for entries that are not chat messages and raises
+    MalformedMessageError for chat messages that do not match the format.
+    """
+    source: DataSource
+    chat_type_name: str  # typed chat struct in psl_proof.models.source_messages
+
+    @abstractmethod
+    def decode(self, input_content: Any) -> Optional[MessageRecord]:
+        ...
+
+    @abstractmethod
+    def decode_typed(self, message: Any) -> Optional[MessageRecord]:
+        ...
+
+    def get_chat_type(self) -> Any:
+        from psl_proof.models import source_messages
+        return getattr(source_messages, self.chat_type_name)
+
+
+class TelegramSchema(SourceSchema):
+    source = DataSource.telegram
+    chat_type_name = 'TelegramChat'
+
+    def decode(self, input_content: Any) -> Optional[MessageRecord]:
+        if not isinstance(input_content, dict):
+            raise MalformedMessageError('entry')
+        if input_content.get('@type') != "message":
+            return None
+        sender = input_content.get("sender_id") or {}
+        if not isinstance(sender, dict) or not is_sender_id(sender.get("user_id")):
+            raise MalformedMessageError('sender_id')
+        date = input_content.get("date")
+        if not is_epoch(date):
+            raise MalformedMessageError('date')
+
+        text = ""
+        content = input_content.get('content')
+        if isinstance(content, dict) and content.get("@type") == "messageText":
+            formatted_text = content.get("text") or {}
+            text = formatted_text.get("text", "") if isinstance(formatted_text, dict) else None
+            if not isinstance(text, str):
+                raise MalformedMessageError('text')
+        return MessageRecord(sender.get("user_id"), date, text)
+
+    def decode_typed(self, message: Any) -> Optional[MessageRecord]:
+        if message.type != "message":
+            return None
+        content = message.content
+        text = ""
+        if content is not None and content.type == "messageText" and content.text is not None:
+            text = content.text.text
+        return MessageRecord(
+            message.sender_id.user_id if message.sender_id is not None else None,
+            message.date,
+            text
+        )
+
+
+class TelegramMinerSchema(SourceSchema):
+    source = DataSource.telegramMiner
+    chat_type_name = 'TelegramMinerChat'
+
+    def decode(self, input_content: Any) -> Optional[MessageRecord]:
+        if not isinstance(input_content, dict):
+            raise MalformedMessageError('entry')
+        if input_content.get('className') != "Message":
+            return None
+        peer = input_content.get("peerId") or {}
+        if not isinstance(peer, dict) or not is_sender_id(peer.get("userId")):
+            raise MalformedMessageError('peerId')
+        date = input_content.get("date")
+        if not is_epoch(date):
+            raise MalformedMessageError('date')
+        text = input_content.get('message') or ""
+        if not isinstance(text, str):
+            raise MalformedMessageError('message')
+        return MessageRecord(peer.get("userId"), date, text)
+
+    def decode_typed(self, message: Any) -> Optional[MessageRecord]:
+        if message.className != "Message":
+            return None
+        return MessageRecord(
+            message.peerId.userId if message.peerId is not None else None,
+            message.date,
+            message.message or ""
+        )
+
+
+SOURCE_SCHEMAS: Dict[DataSource, SourceSchema] = {
+    DataSource.telegram: TelegramSchema(),
+    DataSource.telegramMiner: TelegramMinerSchema()
+}
+
+
+def register_source_schema(schema: SourceSchema) -> None:
+    if not isinstance(schema, SourceSchema):
+        raise TypeError(f"{schema!r} is not a SourceSchema")
+    SOURCE_SCHEMAS[schema.source] = schema
+
+
+def get_source_schema(input_source: DataSource) -> SourceSchema:
+    schema = SOURCE_SCHEMAS.get(input_source)
+    if schema is None:
+        raise RuntimeError(f"Unhandled data source: {input_source}")
+    return schema
+
+
+def decode_messages(
+    schema: SourceSchema,
+    input_contents: Iterable[Any],
+    diagnostics: SchemaDiagnostics
+) -> Iterator[MessageRecord]:
+    """Records of the chat messages among input_contents, counting what is skipped or rejected."""
+    for input_content in input_contents:
+        try:
+            record = schema.decode(input_content)
+        except MalformedMessageError as e:
+            diagnostics.add_malformed(e.reason)
+            continue
+        if record is None:
+            diagnostics.skipped += 1
+            continue
+        diagnostics.messages += 1
+        yield record
+
+
+def decode_typed_messages(
+    schema: SourceSchema,
+    messages: Iterable[Any],
+    diagnostics: SchemaDiagnostics
+) -> Iterator[MessageRecord]:
+    for message in messages:
+        record = schema.decode_typed(message)
+        if record is None:
+            diagnostics.skipped += 1
+            continue
+        diagnostics.messages += 1
+        yield record
+
+
+def add_message_record(
+    source_chat: SourceChatData,
+    record: MessageRecord,
+    submission_epoch: float
+) -> None:
+    source_chat.add_participant(record.sender_id)
+    if record.text:
+        source_chat.add_content(
+            record.text,
+            record.date if record.date else submission_epoch,
+            submission_epoch
+        )
+
+
+# msgspec decoders, built on first use
+typed_decoders: Dict[Any, Any] = {}
+
+
+def get_typed_export_decoder() -> Optional[Any]:
+    """Decoder of whole SourceExport documents, None when msgspec is not installed."""
+    decoder = typed_decoders.get(EXPORT_DECODER_KEY)
+    if decoder is None:
+        try:
+            import msgspec
+            from psl_proof.models.source_messages import SourceExport
+        except ImportError:
+            return None
+        decoder = msgspec.json.Decoder(SourceExport)
+        typed_decoders[EXPORT_DECODER_KEY] = decoder
+    return decoder
+
+
+def get_typed_chats_decoder(schema: SourceSchema) -> Any:
+    """Decoder of the `chats` list of an export in the format of schema."""
+    decoder = typed_decoders.get(schema.source)
+    if decoder is None:
+        import msgspec
+        decoder = msgspec.json.Decoder(List[schema.get_chat_type()])
+        typed_decoders[schema.source] = decoder
+    return decoder
@@ -1,118 +1,182 @@
 from typing import Optional, List, Dict, Any
-import requests
 import json
 import logging
-import traceback
-import sys
+import time
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timezone
 
 from psl_proof.models.cargo_data import SourceData, DataSource
-from psl_proof.utils.validation_api import get_validation_api_url
-from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat, SubmissionHistory, SubmitDataResponse
+from psl_proof.utils.validation_api import get_validator_client, ValidatorCallError
+from psl_proof.utils.metrics import measure_phase
+from psl_proof.utils.history_cache import get_history_cache, merge_history_delta, CachedHistory
+from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat, SubmissionHistory, SubmitDataResponse, index_chat_histories
 
+def parse_submission_history(result_json: Dict[str, Any]) -> SubmissionHistory:
+    # Map JSON response to ChatHistory objects
+    chat_histories = []
+    chat_histories_json = result_json.get("chatHistories", [])
+    for chat_history_data in chat_histories_json:
+        #print(f"chat_history_data:{chat_history_data}")
+        chat_list = [
+            SubmissionChat(
+                participant_count=chat.get("participantCount", 0),
+                chat_count=chat.get("chatCount", 0),
+                chat_length=chat.get("chatLength", 0),
+                chat_start_on=datetime.fromisoformat(chat["chatStartOn"]),
+                chat_ended_on=datetime.fromisoformat(chat["chatEndedOn"])
+            )
+            for chat in chat_history_data.get("chats", [])
+        ]
+
+        chat_history = ChatHistory(
+            source_chat_id = chat_history_data.get("sourceChatId", 0),
+            chat_list=chat_list
+        )
+        chat_histories.append(chat_history)
+
+    #Convert last submission
+    last_submission_val = result_json.get("lastSubmission", None)
+    #print(f"last_submission_val: {last_submission_val}")
+    try:
+        last_submission = (
+            datetime.fromisoformat(last_submission_val)
+            if last_submission_val
+            else None
+        )
+    except ValueError:
+        print(f"Invalid date format for last_submission_val: {last_submission_val}")
+        last_submission = None
+
+    return SubmissionHistory(
+        is_valid=result_json.get("isValid", False),
+        error_text=result_json.get("errorText", ""),
+        last_submission= last_submission,
+        chat_histories = chat_histories,
+        chat_history_index = index_chat_histories(chat_histories)
+    )
+
+
+def get_revalidation_headers(cached: CachedHistory) -> Dict[str, str]:
+    """
+    Lets the validator answer 304 Not Modified, or only the chats changed since
+    the cached fetch. The validator still judges the submission: 304 stands for
+    a valid submission whose history is unchanged, an invalid one is answered
+    200 with isValid false.
+    """
+    headers = {
+        "X-History-Since": datetime.fromtimestamp(cached.fetched_at, timezone.utc).isoformat()
+    }
+    if cached.etag:
+        headers["If-None-Match"] = cached.etag
+    return headers
+
+
+@measure_phase('history_fetch')
 def get_submission_historical_data(
         config: Dict[str, Any],
         source_data: SourceData
     ) -> Optional[SubmissionHistory]:
+    history_cache = get_history_cache(config)
+    cache_key = source_data.submission_by()
+    cached = history_cache.get(cache_key) if history_cache else None
+    # only the histories are cached, the validator is asked about every submission;
+    # entries past the ttl are refetched in full
+    if cached and not cached.is_fresh:
+        cached = None
+
     try:
-        url = get_validation_api_url(
-            config,
-            "api/submissions/historical-data"
-        )
-        headers = {"Content-Type": "application/json"}
         payload = source_data.to_submission_json()
 
-        response = requests.post(url, json=payload, headers=headers)
+        client = get_validator_client(config)
+        started = time.perf_counter()
+        if cached:
+            # conditional / delta fetch of a fresh entry
+            response = client.post(
+                "api/submissions/historical-data",
+                payload,
+                extra_headers=get_revalidation_headers(cached)
+            )
+        else:
+            response = client.call(
+                "api/submissions/historical-data",
+                payload
+            )
+        if history_cache:
+            history_cache.record_fetch(bool(cached), time.perf_counter() - started)
+
+        if response.status_code == 304 and cached:
+            history_cache.refresh(cache_key)
+            history_cache.log_stats()
+            return parse_submission_history(dict(cached.result_json, isValid=True))
 
         if response.status_code == 200:
             try:
-                result_json = response.json()
+                result_json = client.decode(response)
                 #print(f"get submission historical data - result_json: {result_json}")
-
-                # Map JSON response to ChatHistory objects
-                chat_histories = []
-                chat_histories_json = result_json.get("chatHistories", [])
-                for chat_history_data in chat_histories_json:
-                    #print(f"chat_history_data:{chat_history_data}")
-                    chat_list = [
-                        SubmissionChat(
-                            participant_count=chat.get("participantCount", 0),
-                            chat_count=chat.get("chatCount", 0),
-                            chat_length=chat.get("chatLength", 0),
-                            chat_start_on=datetime.fromisoformat(chat["chatStartOn"]),
-                            chat_ended_on=datetime.fromisoformat(chat["chatEndedOn"])
-                        )
-                        for chat in chat_history_data.get("chats", [])
-                    ]
-
-                    chat_history = ChatHistory(
-                        source_chat_id = chat_history_data.get("sourceChatId", 0),
-                        chat_list=chat_list
-                    )
-                    chat_histories.append(chat_history)
-
-                #Convert last submission
-                last_submission_val = result_json.get("lastSubmission", None)
-                #print(f"last_submission_val: {last_submission_val}")
-                try:
-                    last_submission = (
-                        datetime.fromisoformat(last_submission_val)
-                        if last_submission_val
-                        else None
-                    )
-                except ValueError:
-                    print(f"Invalid date format for last_submission_val: {last_submission_val}")
-                    last_submission = None
-
-                return SubmissionHistory(
-                    is_valid=result_json.get("isValid", False),
-                    error_text=result_json.get("errorText", ""),
-                    last_submission= last_submission,
-                    chat_histories = chat_histories
-                )
+                is_delta = bool(cached) and result_json.get("isDelta", False)
+                if is_delta:
+                    result_json = merge_history_delta(cached.result_json, result_json)
+                submission_history = parse_submission_history(result_json)
+                if history_cache and submission_history.is_valid:
+                    history_cache.put(cache_key, result_json, response.headers.get("ETag"), is_delta)
+                if history_cache:
+                    history_cache.log_stats()
+                return submission_history
             except ValueError as e:
-                logging.error(f"Error during parsing Get_historical_chats status: {e}")
-                traceback.print_exc()
-                sys.exit(1)
+                error_text = f"Error during parsing Get_historical_chats status: {e}"
         else:
-            logging.error(f"GetSubmissionHistoricalData failed. Status code: {response.status_code}, Response: {response.text}")
-            traceback.print_exc()
-            sys.exit(1)
-    except requests.exceptions.RequestException as e:
-        logging.error("get_historical_chats:", e)
-        traceback.print_exc()
-        sys.exit(1)
+            error_text = f"GetSubmissionHistoricalData failed. Status code: {response.status_code}, Response: {response.text}"
+    except ValidatorCallError as e:
+        error_text = f"get_historical_chats: {e}"
+
+    logging.error(error_text)
+    return SubmissionHistory(
+        is_valid=False,
+        error_text=error_text,
+        last_submission=None,
+        service_error=True
+    )
 
 
 
+@measure_phase('submit_data')
 def submit_data(
     config: Dict[str, Any],
     source_data: SourceData
 ) -> SubmitDataResponse :
     try:
-        url = get_validation_api_url(
-            config,
-            "api/submissions/submit-data"
-        )
-        headers = {"Content-Type": "application/json"}
         payload = source_data.to_submission_json()
 
-        response = requests.post(url, json=payload, headers=headers)
+        client = get_validator_client(config)
+        response = client.call(
+            "api/submissions/submit-data",
+            payload,
+            idempotent=False
+        )
 
         if response.status_code == 200:
-            result_json = response.json()
-            #print(f"submit data - result_json: {result_json}")
-            return SubmitDataResponse(
-                is_valid=result_json.get("isValid", False),
-                error_text=result_json.get("errorText", "")
-            )
+            try:
+                result_json = client.decode(response)
+                #print(f"submit data - result_json: {result_json}")
+                submit_data_response = SubmitDataResponse(
+                    is_valid=result_json.get("isValid", False),
+                    error_text=result_json.get("errorText", "")
+                )
+                history_cache = get_history_cache(config)
+                if history_cache and submit_data_response.is_valid:
+                    history_cache.record_submission(source_data.submission_by(), source_data)
+                return submit_data_response
+            except ValueError as e:
+                error_text = f"Error during parsing submit data status: {e}"
         else :
-            logging.error(f"Submit data failed. Status code: {response.status_code}, Response: {response.text}")
-            traceback.print_exc()
-            sys.exit(1)
-
-    except requests.exceptions.RequestException as e:
-        logging.error("submit_data:", e)
-        traceback.print_exc()
-        sys.exit(1)
+            error_text = f"Submit data failed. Status code: {response.status_code}, Response: {response.text}"
+
+    except ValidatorCallError as e:
+        error_text = f"submit_data: {e}"
+
+    logging.error(error_text)
+    return SubmitDataResponse(
+        is_valid=False,
+        error_text=error_text,
+        service_error=True
+    )
@@ -1,13 +1,16 @@
+import logging
 import math
+import time
 from datetime import datetime
+from functools import lru_cache
 
 from psl_proof.models.cargo_data import CargoData, ChatData, SourceChatData, SourceData
 from psl_proof.models.proof_response import ProofResponse
+from psl_proof.utils.metrics import measure_phase
 
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 
 from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat, ChatHistory, SubmissionHistory
-#from psl_proof.utils.feature_extraction import get_keywords_keybert, get_sentiment_data
 
 def get_total_score(quality, uniqueness)-> float:
     #total_score = quality # Since uniqueness always 1
@@ -59,46 +62,76 @@ def get_quality_score(
 
 def get_uniqueness_score(
     source_chat: SourceChatData,
-    chat_histories: List[ChatHistory]
+    chat_history_index: Dict[str, float]
 ) -> float:
     # Requirement 1: If chat_histories is empty, return 1
-    if not chat_histories:
+    if not chat_history_index:
         return 1.0
 
-    chat_ended_on = (
-        source_chat.chat_ended_on if source_chat.chat_ended_on else datetime.now()
-    )
-    # Loop through chat_histories to find a match by source_chat_id
-    for history in chat_histories:
-        if history.source_chat_id == source_chat.chat_id_as_key():
-            # Loop through chat_list: should be only one the most recent record
-            for historical_chat in history.chat_list:
-
-                historical_chat_ended_on = historical_chat.chat_ended_on
-
-                if historical_chat_ended_on.tzinfo is not None:
-                    # Remove timezone info
-                    historical_chat_ended_on = historical_chat_ended_on.replace(tzinfo=None)
-
-                if chat_ended_on.tzinfo is not None:
-                    chat_ended_on = chat_ended_on.replace(tzinfo=None)
+    # Look up the most recent submitted record of this chat by source_chat_id
+    historical_chat_ended_epoch = chat_history_index.get(source_chat.chat_id_as_key())
+    if historical_chat_ended_epoch is None:
+        # If no matching source_chat_id is found, return 1
+        return 1.0
 
-                # based on datetime of last entry of conversation/chat
-                # determin time different between last submission and current submission
-                time_in_seconds = (chat_ended_on - historical_chat_ended_on).total_seconds()
-                time_in_hours = int(time_in_seconds // 3600)
-                if time_in_hours <= 1 : # within 1 hours
-                    return 0.0
-                return 1.0 # unique
+    chat_ended_epoch = (
+        source_chat.chat_ended_epoch if source_chat.chat_ended_epoch is not None else time.time()
+    )
 
-                #if time_in_hours <= 24: # within 24 Hours..
-                #    print(f"time_in_hours:{time_in_hours}")
-                #    time_decay = math.log(2) / 12   #half_life: 12hrs, more recent less scores...
-                #    return math.exp(-time_decay * (24 - time_in_hours))
+    # based on datetime of last entry of conversation/chat
+    # determin time different between last submission and current submission
+    time_in_seconds = chat_ended_epoch - historical_chat_ended_epoch
+    time_in_hours = int(time_in_seconds // 3600)
+    if time_in_hours <= 1 : # within 1 hours
+        return 0.0
+    return 1.0 # unique
 
-    # If no matching source_chat_id is found, return 1
-    return 1.0
+    #if time_in_hours <= 24: # within 24 Hours..
+    #    print(f"time_in_hours:{time_in_hours}")
+    #    time_decay = math.log(2) / 12   #half_life: 12hrs, more recent less scores...
+    #    return math.exp(-time_decay * (24 - time_in_hours))
 
+def add_chat_features(
+    config: Dict[str, Any],
+    cargo_data: CargoData,
+    source_chats: List[SourceChatData]
+) -> None:
+    """
+    Sentiment and keywords of the chats, all chats of the submission going
+    through the models together. Models are loaded once per process.
+    """
+    from psl_proof.utils.feature_extraction import get_chats_keywords, get_chats_sentiment
+
+    # aggregate-only chats have no message text, see retain_chat_contents
+    source_chats = [source_chat for source_chat in source_chats if source_chat.contents]
+    if not source_chats:
+        return
+    with measure_phase('feature_extraction'):
+        chat_texts = [str(source_chat.content_text()) for source_chat in source_chats]
+        chat_sentiments = get_chats_sentiment(
+            [source_chat.contents for source_chat in source_chats],
+            config
+        )
+        chat_keywords = get_chats_keywords(
+            chat_texts,
+            config
+        )
+
+    for source_chat, chat_text, sentiment, keywords in zip(source_chats, chat_texts, chat_sentiments, chat_keywords):
+        chat_data = ChatData(
+            chat_length=len(chat_text),
+            chat_start_on = source_chat.chat_start_on,
+            chat_ended_on = source_chat.chat_ended_on,
+            sentiment = sentiment,
+            keywords = keywords
+        )
+        #print(f"chat_data: {chat_data}")
+        cargo_data.chat_list.append(
+            chat_data
+        )
+
+
+@measure_phase('validate_data')
 def validate_data(
     config: Dict[str, Any],
     cargo_data : CargoData,
@@ -111,17 +144,23 @@ def validate_data(
     cargo_data.total_quality = 0.0
     cargo_data.total_uniqueness = 0.0
     chat_count = 0
+    chat_history_index = cargo_data.get_chat_history_index()
+    feature_extraction = config.get('feature_extraction', False)
+
+    batch_scoring_min_chats = config.get('batch_scoring_min_chats')
+    if batch_scoring_min_chats and len(source_chats) >= batch_scoring_min_chats and get_batch_scorer():
+        validate_data_batch(cargo_data)
+        if feature_extraction:
+            add_chat_features(config, cargo_data, source_chats)
+        return
 
     # Loop through chat_data_list
     for source_chat in source_chats:
         chat_count += 1
         #print(f"source_chat:{source_chat}")
-        source_contents = None
-        contents_length = 0
-        if source_chat.contents:  # Ensure chat_contents is not None
-            source_contents = source_chat.content_as_text()
-            #print(f"source_contents: {source_contents}")
-            contents_length = len(source_contents)
+        # lazy view, the joined text is only built if a consumer asks for str()
+        source_contents = source_chat.content_text()
+        contents_length = len(source_contents)
 
         if (contents_length > 0):
 
@@ -130,7 +169,7 @@ def validate_data(
             )
             uniqueness = get_uniqueness_score(
               source_chat,
-              cargo_data.chat_histories
+              chat_history_index
             )
             print(f"Chat {chat_count} >> Quality: {quality} | Uniqueness: {uniqueness}")
             # can not be duplicate data...
@@ -140,22 +179,35 @@ def validate_data(
 
             #print(f"source_contents: {source_contents}")
 
-            # disable on 27/03/2025
-            # chat_sentiment = get_sentiment_data(
-            #     source_contents
-            # )
-            # chat_keywords = get_keywords_keybert(
-            #     source_contents
-            # )
-
-            # chat_data = ChatData(
-            #     chat_length=contents_length,
-            #     chat_start_on = source_chat.chat_start_on,
-            #     chat_ended_on = source_chat.chat_ended_on,
-            #     sentiment = chat_sentiment,
-            #     keywords = chat_keywords
-            # )
-            # #print(f"chat_data: {chat_data}")
-            # cargo_data.chat_list.append(
-            #     chat_data
-            # )
+    # disabled on 27/03/2025 while models were loaded per chat, see feature_extraction
+    if feature_extraction:
+        add_chat_features(config, cargo_data, source_chats)
+
+
+@lru_cache(maxsize=None)
+def get_batch_scorer() -> Optional[Callable]:
+    """get_batch_scores when NumPy is installed, None (warned once) otherwise."""
+    try:
+        from psl_proof.utils.batch_scoring import get_batch_scores
+    except ImportError:
+        logging.warning("batch_scoring_min_chats is set but NumPy is not installed, scoring chat by chat")
+        return None
+    return get_batch_scores
+
+
+def validate_data_batch(
+    cargo_data : CargoData
+) :
+    """Same totals as validate_data, scored over all chats at once with NumPy."""
+    source_chats = cargo_data.source_data.source_chats
+    has_content, quality, uniqueness = get_batch_scorer()(
+        source_chats,
+        cargo_data.get_chat_history_index()
+    )
+    # can not be duplicate data...
+    scored = has_content & (uniqueness > 0)
+    # added one chat at a time in chat order like validate_data, not pairwise as ndarray.sum does
+    for chat_quality, chat_uniqueness in zip(quality[scored].tolist(), uniqueness[scored].tolist()):
+        cargo_data.total_quality += chat_quality
+        cargo_data.total_uniqueness += chat_uniqueness
+    print(f"Batch scored {int(has_content.sum())} chats >> Quality: {cargo_data.total_quality} | Uniqueness: {cargo_data.total_uniqueness}")
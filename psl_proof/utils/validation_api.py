@@ -1,4 +1,19 @@
-from typing import Optional, List, Dict, Any
+import logging
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from psl_proof.utils.json_codec import get_json_codec
+from psl_proof.utils.metrics import get_current_metrics
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 def get_validation_api_url(
     config: Dict[str, Any],
@@ -10,3 +25,350 @@ def get_validation_api_url(
     url = f"{base_url}/{api_path}"
     print(f"API call: {url}")
     return url
+
+
+# statuses worth retrying; only these two also mean the request was not processed
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+NOT_PROCESSED_STATUS_CODES = (429, 503)
+
+
+class ValidatorCallError(Exception):
+    """A validator api call that failed after its retries, or was refused by the circuit breaker."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls so the rest of a
+    batch fails fast. After `reset_timeout` seconds it is half open: a single
+    probe call is let through, whose success closes it and whose failure
+    re-opens it, while the other callers are still refused.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        self.opened_at = None
+        # monotonic start of the probe call in flight while half open
+        self.probe_started_at = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            # a probe that never reported back does not hold the breaker half open forever
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def is_open(self) -> bool:
+        """Open or half open, i.e. refusing callers other than the probe."""
+        with self.lock:
+            return self.opened_at is not None
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failure_count = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        """Records a failed call, once whatever the number of attempts it made."""
+        with self.lock:
+            if self.probe_started_at is not None:
+                # the probe failed: open again for another reset_timeout
+                self.probe_started_at = None
+                self.opened_at = time.monotonic()
+                return
+            self.failure_count += 1
+            if self.failure_threshold and self.failure_count >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def request_was_not_sent(e: requests.exceptions.RequestException) -> bool:
+    """True when the connection could not be opened, so the server never saw the request."""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], 'reason', None) if e.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class BulkItemResponse:
+    """One item of a bulk call, answering like the response of the single item endpoint."""
+
+    def __init__(self, status_code: int, body: Any):
+        self.status_code = status_code
+        self.body = body
+        self.text = get_json_codec().dumps(body).decode('utf-8')
+        self.headers = {}
+
+    def json(self) -> Any:
+        return self.body
+
+
+class BulkCallBatcher:
+    """
+    Collects the payloads posted to one api path from concurrent callers and sends
+    them as a single `<api_path>/bulk` request once `batch_size` items are queued
+    or `linger_seconds` after the first one.
+    The bulk endpoint takes {"items": [payload, ...]} and answers
+    {"results": [{"statusCode": int, "body": <single item response>}, ...]} in order.
+    The bulk request is recorded in the metrics of every caller in the batch
+    with its whole duration, which each of them waited, and the caller's share
+    of the request and response bytes.
+    """
+
+    def __init__(
+        self,
+        client: 'ValidatorClient',
+        api_path: str,
+        batch_size: int,
+        linger_seconds: float,
+        idempotent: bool
+    ):
+        self.client = client
+        self.api_path = api_path
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.idempotent = idempotent
+        # payload, future of its response and the metrics of its caller
+        self.pending: List[Tuple[Any, 'Future', Any]] = []
+        self.lock = threading.Lock()
+
+    def call(self, payload: Any) -> BulkItemResponse:
+        from concurrent.futures import Future  # only loaded when bulk calls are used
+        future = Future()
+        with self.lock:
+            self.pending.append((payload, future, get_current_metrics()))
+            if len(self.pending) >= self.batch_size:
+                batch, self.pending = self.pending, []
+            else:
+                batch = None
+                if len(self.pending) == 1:
+                    timer = threading.Timer(self.linger_seconds, self.flush)
+                    timer.daemon = True
+                    timer.start()
+        if batch:
+            self.send(batch)
+        return future.result()
+
+    def flush(self) -> None:
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self.send(batch)
+
+    def send(self, batch: List[Tuple[Any, 'Future', Any]]) -> None:
+        # items per caller metrics, one proof's metrics may hold several items
+        item_counts: Dict[int, List[Any]] = {}
+        for _, _, metrics in batch:
+            if metrics is not None:
+                item_counts.setdefault(id(metrics), [metrics, 0])[1] += 1
+        call_metrics = [(metrics, count / len(batch)) for metrics, count in item_counts.values()]
+        try:
+            response = self.client.post(
+                f"{self.api_path}/bulk",
+                {"items": [payload for payload, _, _ in batch]},
+                self.idempotent,
+                call_metrics=call_metrics
+            )
+            if response.status_code != 200:
+                raise ValidatorCallError(
+                    f"{self.api_path}/bulk: status code {response.status_code}, response: {response.text}",
+                    response.status_code
+                )
+            results = self.client.decode(response).get("results", [])
+            if len(results) != len(batch):
+                raise ValidatorCallError(f"{self.api_path}/bulk: {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(BulkItemResponse(result.get("statusCode", 0), result.get("body")))
+
+
+class ValidatorClient:
+    """
+    Client for the validator api, sharing one pooled keep-alive session
+    across all calls of a process.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        pool_size = config.get('validator_pool_size', 4)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # (connect, read) seconds, so an unresponsive validator can not hang the proof
+        self.timeout = (
+            config.get('validator_connect_timeout', 10),
+            config.get('validator_read_timeout', 60)
+        )
+        # request bodies of at least this many bytes are sent gzip encoded, 0 disables it
+        self.gzip_min_bytes = config.get('validator_gzip_min_bytes', 0)
+        self.max_retries = config.get('validator_max_retries', 3)
+        self.backoff_base = config.get('validator_backoff_base', 0.5)
+        self.backoff_max = config.get('validator_backoff_max', 8.0)
+        self.circuit_breaker = CircuitBreaker(
+            config.get('validator_breaker_threshold', 5),
+            config.get('validator_breaker_reset', 30.0)
+        )
+        self.bulk_batch_size = config.get('validator_bulk_batch_size', 0)
+        self.bulk_linger_seconds = config.get('validator_bulk_linger', 0.05)
+        self.bulk_supported = None
+        self.json_codec = get_json_codec(config)
+        self.bulk_batchers: Dict[Tuple[str, bool], BulkCallBatcher] = {}
+        self.lock = threading.Lock()
+
+    def get_backoff(self, attempt: int) -> float:
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(
+        self,
+        api_path: str,
+        payload: Any,
+        idempotent: bool = True,
+        extra_headers: Optional[Dict[str, str]] = None,
+        call_metrics: Optional[List[Tuple[Any, float]]] = None
+    ) -> requests.Response:
+        """
+        Posts payload and returns the response of the first attempt that is not retryable.
+        Non idempotent calls are only retried when the validator cannot have processed them.
+        Raises ValidatorCallError when attempts run out or the circuit breaker is open.
+        Attempts are recorded in call_metrics, (metrics, share of the bytes) pairs,
+        by default in the current context's metrics.
+        """
+        url = get_validation_api_url(self.config, api_path)
+        headers = {"Content-Type": "application/json", **(extra_headers or {})}
+        body = self.json_codec.dumps(payload)
+        if self.gzip_min_bytes and len(body) >= self.gzip_min_bytes:
+            import gzip  # only loaded when request bodies are compressed
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+        if not self.circuit_breaker.allow():
+            raise ValidatorCallError(f"{api_path}: validator unavailable, circuit breaker is open")
+        # the probe of a half open breaker makes a single attempt
+        max_retries = 0 if self.circuit_breaker.is_open() else self.max_retries
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                self.record_call(api_path, None, started, body, None, call_metrics)
+                retryable = idempotent or request_was_not_sent(e)
+                error = ValidatorCallError(f"{api_path}: {e}")
+            else:
+                self.record_call(api_path, response.status_code, started, body, response.content, call_metrics)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.circuit_breaker.record_success()
+                    return response
+                retryable = idempotent or response.status_code in NOT_PROCESSED_STATUS_CODES
+                error = ValidatorCallError(
+                    f"{api_path}: status code {response.status_code}, response: {response.text}",
+                    response.status_code
+                )
+
+            if not retryable or attempt >= max_retries:
+                self.circuit_breaker.record_failure()
+                raise error
+            if self.circuit_breaker.is_open():
+                # opened by other calls meanwhile, this one has not failed for good
+                raise ValidatorCallError(f"{api_path}: validator unavailable, circuit breaker is open")
+            backoff = self.get_backoff(attempt)
+            attempt += 1
+            logging.warning(f"{error}, retry {attempt}/{max_retries} in {backoff:.2f}s")
+            time.sleep(backoff)
+
+    def decode(self, response: Any) -> Any:
+        """The JSON body of a response, decoded with the configured JSON backend."""
+        if isinstance(response, BulkItemResponse):
+            return response.body
+        return self.json_codec.loads(response.content)
+
+    def record_call(
+        self,
+        api_path: str,
+        status_code: Optional[int],
+        started: float,
+        body: bytes,
+        response_content: Optional[bytes],
+        call_metrics: Optional[List[Tuple[Any, float]]] = None
+    ) -> None:
+        if call_metrics is None:
+            call_metrics = [(get_current_metrics(), 1.0)]
+        seconds = time.perf_counter() - started
+        for metrics, share in call_metrics:
+            if metrics is not None:
+                metrics.add_http_call(
+                    api_path,
+                    status_code,
+                    seconds,
+                    round(len(body) * share),
+                    round(len(response_content or b"") * share)
+                )
+
+    def supports_bulk(self) -> bool:
+        """Whether the validator advertises the bulk endpoints, asked once per client."""
+        # concurrent first callers wait for the answer instead of falling back to single calls
+        with self.lock:
+            if self.bulk_supported is None:
+                self.bulk_supported = False
+                try:
+                    url = get_validation_api_url(self.config, "api/capabilities")
+                    response = self.session.get(url, timeout=self.timeout)
+                    if response.status_code == 200:
+                        self.bulk_supported = bool(self.decode(response).get("bulk", False))
+                except (requests.exceptions.RequestException, ValueError, AttributeError) as e:
+                    logging.info(f"Validator capabilities not available, using single item calls: {e}")
+            return self.bulk_supported
+
+    def call(self, api_path: str, payload: Any, idempotent: bool = True) -> Any:
+        """
+        Posts one item, through the bulk endpoint of api_path when bulk calls are
+        configured ('validator_bulk_batch_size' > 1) and the validator supports them.
+        """
+        if self.bulk_batch_size > 1 and self.supports_bulk():
+            # idempotent and non idempotent items are retried differently, so they are not mixed
+            batcher_key = (api_path, idempotent)
+            with self.lock:
+                batcher = self.bulk_batchers.get(batcher_key)
+                if batcher is None:
+                    batcher = BulkCallBatcher(
+                        self,
+                        api_path,
+                        self.bulk_batch_size,
+                        self.bulk_linger_seconds,
+                        idempotent
+                    )
+                    self.bulk_batchers[batcher_key] = batcher
+            return batcher.call(payload)
+        return self.post(api_path, payload, idempotent)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+# one client per process and validator, sessions are not shared across forks
+validator_clients: Dict[Any, ValidatorClient] = {}
+
+def get_validator_client(config: Dict[str, Any]) -> ValidatorClient:
+    key = (os.getpid(), config['validator_base_api_url'])
+    client = validator_clients.get(key)
+    if client is None:
+        client = ValidatorClient(config)
+        validator_clients[key] = client
+    return client
@@ -1,25 +1,26 @@
 from typing import Optional, Dict, Any
-import requests
 import logging
-import traceback
-import sys
 from dataclasses import dataclass
 from psl_proof.models.cargo_data import SourceData
-from psl_proof.utils.validation_api import get_validation_api_url
+from psl_proof.utils.validation_api import get_validator_client, ValidatorCallError
 from psl_proof.models.verification_dtos import VerifyTokenResult
+from psl_proof.utils.metrics import measure_phase
 
 
+@measure_phase('verify_token')
 def verify_token(config: Dict[str, Any], source_data: SourceData) -> Optional[VerifyTokenResult]:
     try:
-        url = get_validation_api_url(config, "api/verifications/verify-token")
-        headers = {"Content-Type": "application/json"}
         payload = source_data.to_verification_json()
 
-        response = requests.post(url, json=payload, headers=headers)
+        client = get_validator_client(config)
+        response = client.call(
+            "api/verifications/verify-token",
+            payload
+        )
 
         if response.status_code == 200:
             try:
-                result_json = response.json()
+                result_json = client.decode(response)
                 #print(f"verify_token result_json: {result_json}")
                 result = VerifyTokenResult(
                     is_valid=result_json.get("isValid", False),
@@ -28,15 +29,17 @@ def verify_token(config: Dict[str, Any], source_data: SourceData) -> Optional[Ve
                 )
                 return result
             except ValueError as e:
-                logging.error(f"Error during parsing verification status: {e}")
-                traceback.print_exc()
-                sys.exit(1)
+                error_text = f"Error during parsing verification status: {e}"
         else:
-            logging.error(f"Error, unexpected verification response: Status code: {response.status_code}, Response: {response.text}")
-            traceback.print_exc()
-            sys.exit(1)
+            error_text = f"Error, unexpected verification response: Status code: {response.status_code}, Response: {response.text}"
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error during verification: {e}")
-        traceback.print_exc()
-        sys.exit(1)
+    except ValidatorCallError as e:
+        error_text = f"Error during verification: {e}"
+
+    logging.error(error_text)
+    return VerifyTokenResult(
+        is_valid=False,
+        error_text=error_text,
+        proof_token="",
+        service_error=True
+    )
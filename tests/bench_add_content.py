@@ -0,0 +1,104 @@
+"""
+Per message cost of aggregating a chat with epoch seconds (add_message_record
+and SourceChatData.add_content) against the datetime arithmetic they
+replaced, which built a datetime and a timedelta for every message.
+
+    python tests/bench_add_content.py --messages 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+# psl_proof from this checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psl_proof.models.cargo_data import SourceChatData
+from psl_proof.utils.epoch import to_epoch
+from psl_proof.utils.source_schema import MessageRecord, add_message_record
+
+
+class DatetimeChat:
+    """The aggregates of SourceChatData before epoch seconds."""
+
+    def __init__(self):
+        self.participants = []
+        self.participant_keys = set()
+        self.chat_count = 0
+        self.chat_start_on = None
+        self.chat_ended_on = None
+        self.total_content_length = 0
+        self.total_content_value = 0
+
+    def add_content(self, content: str, chat_timestamp: datetime, submission_timestamp: datetime) -> None:
+        if content:
+            self.chat_count += 1
+            content_len = len(content)
+            time_in_seconds = (submission_timestamp - chat_timestamp).total_seconds()
+            time_in_minutes = int(time_in_seconds // 60)
+            if self.chat_start_on is None or self.chat_start_on > chat_timestamp:
+                self.chat_start_on = chat_timestamp
+            if self.chat_ended_on is None or self.chat_ended_on < chat_timestamp:
+                self.chat_ended_on = chat_timestamp
+            self.total_content_length += content_len
+            self.total_content_value += time_in_minutes * content_len
+
+
+def add_message_record_datetime(chat: DatetimeChat, record: MessageRecord, submission_timestamp: datetime) -> None:
+    if record.sender_id and record.sender_id not in chat.participant_keys:
+        chat.participant_keys.add(record.sender_id)
+        chat.participants.append(record.sender_id)
+    if record.text:
+        message_date = (
+            datetime.fromtimestamp(record.date, timezone.utc)
+            if record.date
+            else submission_timestamp
+        )
+        chat.add_content(record.text, message_date, submission_timestamp)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks per message time aggregation.')
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per case, the fastest is kept')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    submission_timestamp = datetime.now(timezone.utc)
+    submission_epoch = to_epoch(submission_timestamp)
+    records = [
+        MessageRecord(rng.randrange(50), submission_epoch - rng.uniform(0, 3e7), 'x' * rng.randint(1, 200))
+        for _ in range(args.messages)
+    ]
+
+    def run_epoch():
+        source_chat = SourceChatData(chat_id=1, retain_contents=False)
+        for record in records:
+            add_message_record(source_chat, record, submission_epoch)
+        return source_chat
+
+    def run_datetime():
+        chat = DatetimeChat()
+        for record in records:
+            add_message_record_datetime(chat, record, submission_timestamp)
+        return chat
+
+    print(f"{args.messages} messages")
+    results = {}
+    for name, run in (('epoch seconds', run_epoch), ('datetime', run_datetime)):
+        best = None
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            results[name] = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"  {name}: {best / args.messages * 1e9:.0f} ns per message")
+    # same aggregates either way
+    assert results['epoch seconds'].total_content_value == results['datetime'].total_content_value
+    assert results['epoch seconds'].chat_ended_on == results['datetime'].chat_ended_on
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Batch throughput of synthetic exports against the stub validator, with 1
+to N worker processes (--workers). Parsing and scoring are CPU bound, so
+files per second should scale with the cores available, up to the number of
+files.
+
+    python tests/bench_batch_workers.py --files 16 --messages 50000 --workers 1,2,4,8
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+# psl_proof from this checkout, helpers and the stub from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import write_synthetic_export
+from psl_proof.batch import run_batch
+from validator_stub import ValidatorStub, get_stub_config
+
+
+@contextlib.contextmanager
+def quiet_output():
+    """The proof prints and logs its progress; silence it here and in the workers started meanwhile."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, saved_fd in enumerate(saved, start=1):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+
+
+def main() -> None:
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Benchmarks batch proving with 1 to N worker processes.')
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=20000, help='messages per file')
+    parser.add_argument('--workers', default=','.join(str(2 ** power) for power in range(cpu_count.bit_length())))
+    args = parser.parse_args()
+
+    stub = ValidatorStub().start()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, 'input')
+            os.makedirs(input_dir)
+            input_files = []
+            for index in range(args.files):
+                input_file = os.path.join(input_dir, f'input-{index}.json')
+                write_synthetic_export(input_file, 'telegram' if index % 2 else 'telegramMiner', args.messages)
+                input_files.append(input_file)
+            config = get_stub_config(stub, input_dir=input_dir)
+
+            print(f"{args.files} files of {args.messages} messages, {cpu_count} CPUs")
+            baseline = None
+            for workers in [int(count) for count in args.workers.split(',')]:
+                started = time.perf_counter()
+                with quiet_output():
+                    index = run_batch(config, input_files, os.path.join(temp_dir, f'output-{workers}'), workers)
+                seconds = time.perf_counter() - started
+                assert not any(entry['error'] for entry in index)
+                baseline = baseline or seconds
+                print(f"  {workers} workers: {seconds:.2f} s, {args.files / seconds:.2f} files/s, speed up {baseline / seconds:.2f}")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Offline benchmark of chat sentiment inference on a tiny BERT classifier built
+on the fly, so no model is downloaded. Compares classifying each message
+through the transformers pipeline with get_chats_sentiment's length bucketed
+batches, per feature_backend and feature_batch_size.
+
+    python tests/bench_feature_extraction.py --chats 50 --runs 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# psl_proof from this checkout, helpers from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import get_chat_messages, save_tiny_sentiment_model
+from psl_proof.utils import feature_extraction
+from psl_proof.utils.feature_extraction import get_chats_sentiment, get_feature_model
+
+
+def best_of(runs: int, function) -> float:
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks chat sentiment inference on a tiny offline model.')
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per case, the fastest is kept')
+    parser.add_argument('--backends', default='torch,int8', help='feature_backend values to time')
+    parser.add_argument('--batch-sizes', default='1,8,32,128')
+    args = parser.parse_args()
+
+    chat_messages = get_chat_messages(1, args.chats)
+    message_count = sum(len(messages) for messages in chat_messages)
+    with tempfile.TemporaryDirectory() as model_dir:
+        save_tiny_sentiment_model(model_dir)
+        print(f"{args.chats} chats, {message_count} messages")
+        for backend in args.backends.split(','):
+            config = {'feature_sentiment_model': model_dir, 'feature_backend': backend}
+            feature_extraction.feature_models.clear()
+            load_seconds = best_of(1, lambda: get_feature_model('sentiment', config))
+            cached_seconds = best_of(args.runs, lambda: get_feature_model('sentiment', config))
+            print(f"{backend}: model load {load_seconds * 1000:.1f} ms, cached {cached_seconds * 1e6:.1f} us")
+
+            analyzer = get_feature_model('sentiment', config)
+            per_message = best_of(args.runs, lambda: [
+                analyzer(message, truncation=True) for messages in chat_messages for message in messages
+            ])
+            print(f"  pipeline per message: {per_message * 1000:.1f} ms ({message_count / per_message:.0f} messages/s)")
+            for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+                batch_config = dict(config, feature_batch_size=batch_size)
+                seconds = best_of(args.runs, lambda: get_chats_sentiment(chat_messages, batch_config))
+                print(f"  batch size {batch_size}: {seconds * 1000:.1f} ms ({message_count / seconds:.0f} messages/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Parse throughput (MB/s) of synthetic Telegram and TelegramMiner exports,
+from the file's bytes to SourceData: each installed JSON backend followed
+by get_source_data, the typed msgspec decoding and the streaming reader.
+
+    python tests/bench_json_codecs.py --messages 100000 --runs 3
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# psl_proof from this checkout, helpers from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import write_synthetic_export
+from psl_proof.proof import get_source_data, get_source_data_stream, get_source_data_typed
+from psl_proof.utils.json_codec import JSON_BACKENDS, JSON_CODEC_FACTORIES
+
+
+def get_parsers():
+    """(name, parser of the document's bytes) of every path available in this environment."""
+    parsers = []
+    for backend in JSON_BACKENDS:
+        try:
+            codec = JSON_CODEC_FACTORIES[backend]()
+        except ImportError:
+            print(f"  {backend} is not installed, skipped")
+            continue
+        parsers.append((f"{backend} + get_source_data", lambda document, codec=codec: get_source_data(
+            codec.loads(document), datetime.now(timezone.utc), retain_contents=False
+        )))
+    try:
+        import msgspec  # noqa: F401
+        parsers.append(('msgspec typed', lambda document: get_source_data_typed(
+            document, datetime.now(timezone.utc), retain_contents=False
+        )))
+    except ImportError:
+        print("  msgspec is not installed, typed decoding skipped")
+    parsers.append(('streaming', lambda document: get_source_data_stream(
+        io.TextIOWrapper(io.BytesIO(document), encoding='utf-8'), datetime.now(timezone.utc), retain_contents=False
+    )))
+    return parsers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks parse throughput per JSON backend and source format.')
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per case, the fastest is kept')
+    args = parser.parse_args()
+
+    # the parsers log the service messages they skip
+    logging.disable(logging.WARNING)
+    parsers = get_parsers()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for source in ('telegram', 'telegramMiner'):
+            path = os.path.join(temp_dir, 'input.json')
+            # well formed, or the typed decoding falls back to the dict path
+            write_synthetic_export(path, source, args.messages, malformed=False)
+            with open(path, 'rb') as f:
+                document = f.read()
+            print(f"{source}: {args.messages} messages, {len(document) / 1e6:.1f} MB")
+            for name, parse in parsers:
+                best = None
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        source_data = parse(document)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                assert source_data is not None and source_data.source_chats
+                print(f"  {name}: {len(document) / 1e6 / best:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Peak RSS and wall time of reading a synthetic export with json.load and
+get_source_data against the streaming reader, each in a fresh interpreter
+so the peaks do not mix. RSS is reported above that of an interpreter that
+only imported the proof.
+
+    python tests/bench_json_stream.py --messages 10000,100000,1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# psl_proof from this checkout, helpers from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import write_synthetic_export
+
+READ_CODE = """
+import json, resource, sys, time
+from datetime import datetime, timezone
+from psl_proof.proof import get_source_data, get_source_data_stream
+
+mode, path = sys.argv[1], sys.argv[2]
+started = time.perf_counter()
+with open(path, 'r', encoding='utf-8') as f:
+    if mode == 'json.load':
+        source_data = get_source_data(json.load(f), datetime.now(timezone.utc), retain_contents=False)
+    elif mode == 'streaming':
+        source_data = get_source_data_stream(f, datetime.now(timezone.utc), retain_contents=False)
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def run_reader(mode: str, path: str) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-c', READ_CODE, mode, path],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=root
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compares json.load with the streaming reader on synthetic exports.')
+    parser.add_argument('--messages', default='10000,100000', help='message counts of the exports')
+    parser.add_argument('--source', default='telegram', choices=['telegram', 'telegramMiner'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for message_count in [int(count) for count in args.messages.split(',')]:
+            path = os.path.join(temp_dir, 'input.json')
+            size = write_synthetic_export(path, args.source, message_count)
+            baseline_kb = run_reader('imports', path)['max_rss_kb']
+            print(f"{message_count} messages, {size / 1e6:.1f} MB")
+            for mode in ('json.load', 'streaming'):
+                result = run_reader(mode, path)
+                print(
+                    f"  {mode}: {result['seconds']:.2f} s, "
+                    f"peak RSS +{(result['max_rss_kb'] - baseline_kb) / 1024:.1f} MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
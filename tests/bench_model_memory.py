@@ -0,0 +1,83 @@
+"""
+Memory per chat and per history record (tracemalloc) of the slotted
+SourceChatData, SubmissionChat and ChatHistory dataclasses against the same
+dataclasses with a per instance __dict__, as they were before.
+
+    python tests/bench_model_memory.py --records 100000
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# psl_proof from this checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psl_proof.models.cargo_data import SourceChatData
+from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat
+
+
+def without_slots(cls):
+    """The dataclass cls with the same fields and defaults, instances keeping a __dict__."""
+    fields = []
+    for field in dataclasses.fields(cls):
+        options = {'init': field.init}
+        if field.default is not dataclasses.MISSING:
+            options['default'] = field.default
+        if field.default_factory is not dataclasses.MISSING:
+            options['default_factory'] = field.default_factory
+        fields.append((field.name, field.type, dataclasses.field(**options)))
+    return dataclasses.make_dataclass(cls.__name__, fields)
+
+
+def measure_bytes(build, count: int) -> float:
+    """Bytes allocated per object by count calls of build, kept alive while measured."""
+    tracemalloc.start()
+    started = tracemalloc.get_traced_memory()[0]
+    objects = [build(index) for index in range(count)]
+    allocated = tracemalloc.get_traced_memory()[0] - started
+    tracemalloc.stop()
+    del objects
+    return allocated / count
+
+
+def get_builders(source_chat_type, submission_chat_type, chat_history_type):
+    now = datetime.now(timezone.utc)
+
+    def build_source_chat(index: int):
+        source_chat = source_chat_type(chat_id=index, retain_contents=False)
+        source_chat.participants.extend(str(sender) for sender in range(index % 5 + 1))
+        source_chat.chat_count = index % 100
+        source_chat.chat_start_epoch = now.timestamp() - index
+        source_chat.chat_ended_epoch = now.timestamp()
+        return source_chat
+
+    def build_submission_chat(index: int):
+        chat_ended_on = now - timedelta(seconds=index)
+        return submission_chat_type(2, index % 100, index % 1000, chat_ended_on - timedelta(hours=1), chat_ended_on)
+
+    def build_chat_history(index: int):
+        return chat_history_type(str(index), [build_submission_chat(index)])
+
+    return [('source chat', build_source_chat), ('history record', build_submission_chat),
+            ('chat history of one record', build_chat_history)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks the memory of the slotted models.')
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    slotted = get_builders(SourceChatData, SubmissionChat, ChatHistory)
+    unslotted = get_builders(without_slots(SourceChatData), without_slots(SubmissionChat), without_slots(ChatHistory))
+    print(f"{args.records} objects each")
+    for (name, build_slotted), (_, build_unslotted) in zip(slotted, unslotted):
+        slotted_bytes = measure_bytes(build_slotted, args.records)
+        unslotted_bytes = measure_bytes(build_unslotted, args.records)
+        print(f"  {name}: {slotted_bytes:.0f} bytes with __slots__, {unslotted_bytes:.0f} bytes with __dict__")
+
+
+if __name__ == "__main__":
+    main()
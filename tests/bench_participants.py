@@ -0,0 +1,57 @@
+"""
+Cost of SourceChatData.add_participant, which checks a set, against the
+list membership check it replaced, on one chat with many distinct senders.
+
+    python tests/bench_participants.py --senders 10000 --messages 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# psl_proof from this checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psl_proof.models.cargo_data import SourceChatData
+
+
+def add_participant_list(participants: list, participant: str) -> None:
+    """add_participant before the set: a scan of the participants list per message."""
+    if participant and participant not in participants:
+        participants.append(participant)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks participant de-duplication.')
+    parser.add_argument('--senders', type=int, default=10000)
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--list-messages', type=int, default=20000,
+                        help='messages timed with the list scan, which is quadratic')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    senders = [str(rng.randrange(args.senders)) for _ in range(args.messages)]
+    source_chat = SourceChatData(chat_id=1, retain_contents=False)
+    started = time.perf_counter()
+    for sender in senders:
+        source_chat.add_participant(sender)
+    set_seconds = time.perf_counter() - started
+
+    participants = []
+    list_senders = senders[:args.list_messages]
+    started = time.perf_counter()
+    for sender in list_senders:
+        add_participant_list(participants, sender)
+    list_seconds = time.perf_counter() - started
+
+    print(f"{args.messages} messages from {len(source_chat.participants)} senders")
+    print(f"  set: {set_seconds:.3f} s, {set_seconds / args.messages * 1e9:.0f} ns per message")
+    print(
+        f"  list: {list_seconds:.3f} s for the first {len(list_senders)} messages, "
+        f"{list_seconds / len(list_senders) * 1e9:.0f} ns per message"
+    )
+
+
+if __name__ == "__main__":
+    main()
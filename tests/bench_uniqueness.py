@@ -0,0 +1,69 @@
+"""
+Uniqueness scoring of many chats against many chat histories: the
+source_chat_id index against the linear scan of the histories per chat it
+replaced. The scan is timed on a sample of the chats, as it is quadratic.
+
+    python tests/bench_uniqueness.py --chats 50000 --histories 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# psl_proof from this checkout, helpers from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import get_uniqueness_score_linear
+from psl_proof.models.cargo_data import CargoData, DataSource, SourceChatData, SourceData
+from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat
+from psl_proof.utils.validate_data import get_uniqueness_score
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks indexed uniqueness scoring against the linear scan.')
+    parser.add_argument('--chats', type=int, default=50000)
+    parser.add_argument('--histories', type=int, default=50000)
+    parser.add_argument('--linear-sample', type=int, default=200, help='chats scored with the linear scan')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    source_chats = []
+    for chat_id in range(args.chats):
+        source_chat = SourceChatData(chat_id=chat_id, retain_contents=False)
+        source_chat.add_content('hello', (now - timedelta(hours=rng.uniform(0, 48))).timestamp(), now.timestamp())
+        source_chats.append(source_chat)
+    # histories of every other chat id, in random order, most ids beyond the chats
+    history_ids = rng.sample(range(args.histories * 2), args.histories)
+    chat_histories = []
+    for history_id in history_ids:
+        chat_ended_on = now - timedelta(hours=rng.uniform(0, 72))
+        chat_histories.append(ChatHistory(str(history_id), [
+            SubmissionChat(1, 1, 10, chat_ended_on - timedelta(hours=1), chat_ended_on)
+        ]))
+
+    source_data = SourceData(DataSource.telegram, 'token', now, 'user', source_chats)
+    cargo_data = CargoData(source_data=source_data, source_id='source', chat_histories=chat_histories)
+    started = time.perf_counter()
+    chat_history_index = cargo_data.get_chat_history_index()
+    scores = [get_uniqueness_score(source_chat, chat_history_index) for source_chat in source_chats]
+    indexed_seconds = time.perf_counter() - started
+
+    sample = source_chats[:args.linear_sample]
+    started = time.perf_counter()
+    linear_scores = [get_uniqueness_score_linear(source_chat, chat_histories) for source_chat in sample]
+    linear_seconds = time.perf_counter() - started
+    assert linear_scores == scores[:len(sample)]
+
+    print(f"{args.chats} chats, {args.histories} histories")
+    print(f"  indexed: {indexed_seconds:.3f} s, index built once, {indexed_seconds / args.chats * 1e6:.1f} us per chat")
+    print(
+        f"  linear scan: {linear_seconds / len(sample) * 1e6:.0f} us per chat over {len(sample)} chats, "
+        f"about {linear_seconds / len(sample) * args.chats:.0f} s for all of them"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import pytest
+
+from validator_stub import ValidatorStub
+
+
+@pytest.fixture
+def validator_stub():
+    stub = ValidatorStub().start()
+    yield stub
+    stub.stop()
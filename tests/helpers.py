@@ -0,0 +1,180 @@
+"""Builders shared by the test modules and the benchmark scripts next to them."""
+import os
+from datetime import datetime, timezone
+
+from psl_proof.models.cargo_data import DataSource, SourceChatData, SourceData
+
+SUBMISSION_TIMESTAMP = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+# escapes, multi byte UTF-8 (up to 4 bytes, a surrogate pair when escaped) and JSON syntax inside strings
+TEXTS = ["plain", "café üß", "日本語", "emoji \U0001F600\U0001F44D", 'quote " and \\ backslash',
+         "line\nbreak\ttab \u0001", "{not: [json]}", "", "é" * 40]
+NESTED_VALUE = {"a": [1, -2.5e-3, True, None, {"b": ["\U0001F600", {}, []]}], "c": "\\u00e9"}
+
+
+def get_telegram_message(index: int):
+    if index % 7 == 6:
+        return {"@type": "messageChatAddMembers", "member_user_ids": [1, 2]}  # not a chat message
+    if index % 11 == 10:
+        return {"@type": "message", "sender_id": {"user_id": [1]}, "date": 1}  # malformed
+    return {
+        "@type": "message",
+        "id": index,
+        "sender_id": {"@type": "messageSenderUser", "user_id": index % 4},
+        "date": 1700000000 + index * 3607.5,
+        "reactions": NESTED_VALUE,
+        "content": {"@type": "messageText", "text": {"@type": "formattedText", "text": TEXTS[index % len(TEXTS)]}}
+    }
+
+
+def get_telegram_miner_message(index: int):
+    if index % 7 == 6:
+        return {"className": "MessageService", "action": NESTED_VALUE}
+    if index % 11 == 10:
+        return {"className": "Message", "peerId": {"userId": 1}, "date": "yesterday"}
+    return {
+        "className": "Message",
+        "peerId": {"className": "PeerUser", "userId": str(index % 4)},
+        "date": 1700000000 + index * 3607,
+        "entities": NESTED_VALUE,
+        "message": TEXTS[index % len(TEXTS)]
+    }
+
+
+def get_export(source: str, chat_first: bool = False, source_last: bool = False):
+    get_message = get_telegram_message if source == "telegram" else get_telegram_miner_message
+    chats = []
+    for chat_id in range(1, 6):
+        contents = [get_message(chat_id * 13 + index) for index in range(chat_id * 4)]
+        if chat_first:
+            chat = {"contents": contents, "title": "chat \U0001F600", "chat_id": chat_id}
+        else:
+            chat = {"chat_id": chat_id, "unknown": NESTED_VALUE, "contents": contents}
+        chats.append(chat)
+    chats += [{"chat_id": 0, "contents": [get_message(1)]}, {"chat_id": 9, "contents": []}, {"chat_id": 8}]
+
+    header = {"revision": "01.01", "source": source}
+    rest = {"user": "user-é", "extra": NESTED_VALUE, "submission_token": "token", "chats": chats}
+    if source_last:
+        return {**rest, **header}
+    return {**header, **rest}
+
+
+def write_synthetic_export(
+    path: str,
+    source: str,
+    message_count: int,
+    chat_size: int = 1000,
+    malformed: bool = True
+) -> int:
+    """
+    Writes an export of message_count messages, chat_size per chat, one
+    message at a time so its size is not bounded by memory; returns its bytes.
+    Without malformed, the messages get_source_data would reject are replaced.
+    """
+    import json
+    get_message = get_telegram_message if source == "telegram" else get_telegram_miner_message
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"revision": "01.01", "source": source, "user": "user", "submission_token": "token"})[:-1])
+        f.write(', "chats": [')
+        for chat_start in range(0, message_count, chat_size):
+            f.write(', ' if chat_start else '')
+            f.write(f'{{"chat_id": {chat_start // chat_size + 1}, "contents": [')
+            for index in range(chat_start, min(chat_start + chat_size, message_count)):
+                f.write(', ' if index > chat_start else '')
+                # every 11th message is malformed, see get_telegram_message
+                f.write(json.dumps(get_message(index if malformed or index % 11 != 10 else index + 1)))
+            f.write(']}')
+        f.write(']}')
+    return os.path.getsize(path)
+
+
+EXPORTS = [
+    get_export(source, chat_first, source_last)
+    for source in ("telegram", "telegramMiner")
+    for chat_first in (False, True)
+    for source_last in (False, True)
+]
+
+
+def get_one_chat_source_data() -> SourceData:
+    """Source data of one chat with one message, sent now."""
+    source_chat = SourceChatData(chat_id=1, retain_contents=False)
+    source_chat.add_participant(7)
+    source_chat.add_content('hello', datetime.now(timezone.utc).timestamp(), datetime.now(timezone.utc).timestamp())
+    return SourceData(DataSource.telegram, 'token', datetime.now(timezone.utc), 'user', [source_chat])
+
+
+def get_uniqueness_score_linear(source_chat, chat_histories):
+    """get_uniqueness_score before chat_history_index, scanning the histories of every chat."""
+    if not chat_histories:
+        return 1.0
+
+    chat_ended_on = (
+        source_chat.chat_ended_on if source_chat.chat_ended_on else datetime.now()
+    )
+    for history in chat_histories:
+        if history.source_chat_id == source_chat.chat_id_as_key():
+            for historical_chat in history.chat_list:
+                historical_chat_ended_on = historical_chat.chat_ended_on
+                if historical_chat_ended_on.tzinfo is not None:
+                    historical_chat_ended_on = historical_chat_ended_on.replace(tzinfo=None)
+                if chat_ended_on.tzinfo is not None:
+                    chat_ended_on = chat_ended_on.replace(tzinfo=None)
+                time_in_seconds = (chat_ended_on - historical_chat_ended_on).total_seconds()
+                time_in_hours = int(time_in_seconds // 3600)
+                if time_in_hours <= 1:
+                    return 0.0
+                return 1.0
+    return 1.0
+
+
+TINY_MODEL_WORDS = [
+    "good", "bad", "great", "awful", "ok", "fine", "love", "hate", "the", "a", "chat", "day",
+    "very", "not", "really", "is", "was", "we", "you", "i", "it", "this", "that", "so"
+]
+TINY_MODEL_LABELS = {0: "negative", 1: "neutral", 2: "positive"}
+TINY_MODEL_MAX_TOKENS = 32
+
+
+def save_tiny_sentiment_model(model_dir: str, seed: int = 0) -> str:
+    """
+    Saves a randomly initialised one layer BERT sentiment classifier and its
+    word piece tokenizer to model_dir, built offline, and returns model_dir.
+    """
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    os.makedirs(model_dir, exist_ok=True)
+    vocab_file = os.path.join(model_dir, 'vocab.txt')
+    with open(vocab_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + TINY_MODEL_WORDS) + "\n")
+    tokenizer = BertTokenizerFast(vocab_file, model_max_length=TINY_MODEL_MAX_TOKENS)
+    tokenizer.save_pretrained(model_dir)
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        max_position_embeddings=TINY_MODEL_MAX_TOKENS,
+        num_labels=len(TINY_MODEL_LABELS),
+        id2label=TINY_MODEL_LABELS,
+        label2id={label: label_id for label_id, label in TINY_MODEL_LABELS.items()}
+    )
+    BertForSequenceClassification(config).eval().save_pretrained(model_dir)
+    return model_dir
+
+
+def get_chat_messages(seed: int, chat_count: int, max_words: int = 80):
+    """Messages of chat_count chats, from a word up to max_words words long."""
+    import random
+    rng = random.Random(seed)
+    return [
+        [
+            " ".join(rng.choice(TINY_MODEL_WORDS) for _ in range(rng.randint(1, max_words)))
+            for _ in range(rng.randint(1, 12))
+        ]
+        for _ in range(chat_count)
+    ]
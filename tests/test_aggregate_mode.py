@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from psl_proof import proof
+from psl_proof.proof import Proof
+from helpers import get_export
+from validator_stub import HISTORICAL_DATA_PATH, get_stub_config
+
+SUBMITTED_ON = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+# chat 1 was submitted within the hour of its last message, chat 2 long before
+CHAT_HISTORIES = [
+    {"sourceChatId": "1", "chats": [{
+        "participantCount": 2,
+        "chatCount": 4,
+        "chatLength": 80,
+        "chatStartOn": "2023-11-15T10:00:00+00:00",
+        "chatEndedOn": "2023-11-15T14:00:00+00:00"
+    }]},
+    {"sourceChatId": "2", "chats": [{
+        "participantCount": 2,
+        "chatCount": 4,
+        "chatLength": 80,
+        "chatStartOn": "2023-01-01T00:00:00+00:00",
+        "chatEndedOn": "2023-01-01T01:00:00+00:00"
+    }]}
+]
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return SUBMITTED_ON.astimezone(tz) if tz else SUBMITTED_ON.replace(tzinfo=None)
+
+
+def get_proof_dump(config, input_file, retain_chat_contents):
+    return Proof(dict(config, retain_chat_contents=retain_chat_contents)).generate_for_file(input_file).model_dump()
+
+
+@pytest.mark.parametrize('source', ["telegram", "telegramMiner"])
+@pytest.mark.parametrize('streaming_input', [True, False])
+def test_aggregate_mode_proves_the_same(validator_stub, tmp_path, monkeypatch, source, streaming_input):
+    # proofs are scored against the submission time
+    monkeypatch.setattr(proof, 'datetime', FrozenDatetime)
+    input_file = tmp_path / 'input.json'
+    input_file.write_text(json.dumps(get_export(source)), encoding='utf-8')
+    config = get_stub_config(validator_stub, input_dir=str(tmp_path), streaming_input=streaming_input)
+
+    without_histories = get_proof_dump(config, str(input_file), True)
+    assert get_proof_dump(config, str(input_file), False) == without_histories
+
+    validator_stub.responses[HISTORICAL_DATA_PATH] = dict(
+        validator_stub.responses[HISTORICAL_DATA_PATH],
+        chatHistories=CHAT_HISTORIES
+    )
+    with_histories = get_proof_dump(config, str(input_file), True)
+    assert get_proof_dump(config, str(input_file), False) == with_histories
+
+    assert with_histories['valid']
+    assert with_histories['uniqueness'] < without_histories['uniqueness']
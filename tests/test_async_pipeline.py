@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import pytest
+
+from psl_proof.proof import Proof
+from helpers import get_export
+from validator_stub import SUBMIT_DATA_PATH, VERIFY_TOKEN_PATH, get_stub_config
+
+
+def get_proof(validator_stub, tmp_path, document: str) -> Proof:
+    input_file = tmp_path / 'input.json'
+    input_file.write_text(document, encoding='utf-8')
+    return Proof(get_stub_config(validator_stub, input_dir=str(tmp_path), streaming_input=True))
+
+
+def test_async_pipeline_proves_like_the_sync_one(validator_stub, tmp_path):
+    proof = get_proof(validator_stub, tmp_path, json.dumps(get_export("telegramMiner")))
+    input_file = str(tmp_path / 'input.json')
+    expected = proof.generate_for_file(input_file)
+    proof_response = asyncio.run(proof.generate_for_file_async(input_file))
+    assert proof_response.valid == expected.valid
+    # the submission time is the only difference
+    assert dict(proof_response.attributes, submitted_on=None) == dict(expected.attributes, submitted_on=None)
+    assert (proof_response.quality, proof_response.uniqueness) == (expected.quality, expected.uniqueness)
+    # one verification per proof, the async one started from the header
+    assert len(validator_stub.get_requests(VERIFY_TOKEN_PATH)) == 2
+    assert len(validator_stub.get_requests(SUBMIT_DATA_PATH)) == 2
+
+
+def test_refused_input_cancels_the_early_verification(validator_stub, tmp_path):
+    # the header is complete, the chats are cut short
+    document = json.dumps(get_export("telegram"))[:400]
+    proof = get_proof(validator_stub, tmp_path, document)
+    # verify-token is still in flight when parsing fails
+    verify_token_held = validator_stub.hold(VERIFY_TOKEN_PATH)
+
+    async def prove():
+        with pytest.raises(ValueError):
+            await proof.generate_for_file_async(str(tmp_path / 'input.json'))
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        verify_token_held.set()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return pending
+
+    try:
+        pending = asyncio.run(prove())
+        assert len(pending) == 1 and pending[0].cancelled()
+        assert validator_stub.get_requests(SUBMIT_DATA_PATH) == []
+    finally:
+        verify_token_held.set()
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from psl_proof.models.cargo_data import CargoData, DataSource, SourceChatData, SourceData
+from psl_proof.models.proof_response import ProofResponse
+from psl_proof.utils.validate_data import get_batch_scorer, validate_data
+
+
+def get_random_chats(seed: int, count: int, now: float):
+    rng = random.Random(seed)
+    source_chats = []
+    for chat_id in range(count):
+        source_chat = SourceChatData(chat_id=chat_id, retain_contents=False)
+        for _ in range(rng.randint(0, 20)):
+            source_chat.add_participant(rng.randint(1, 8))
+            source_chat.add_content('x' * rng.randint(1, 300), now - rng.uniform(0, 3e6), now)
+        source_chats.append(source_chat)
+    history_index = {str(chat_id): now - rng.uniform(0, 7200) for chat_id in range(0, count, 3)}
+    return source_chats, history_index
+
+
+def get_totals(source_chats, history_index, batch_scoring_min_chats):
+    source_data = SourceData(DataSource.telegram, 'token', datetime.now(timezone.utc), 'user', source_chats)
+    cargo_data = CargoData(source_data=source_data, source_id='source')
+    cargo_data.chat_history_index = history_index
+    with contextlib.redirect_stdout(io.StringIO()):
+        validate_data({'batch_scoring_min_chats': batch_scoring_min_chats}, cargo_data, ProofResponse(dlp_id=1))
+    return cargo_data.total_quality, cargo_data.total_uniqueness
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_batch_scores_match_per_chat_scores(seed):
+    pytest.importorskip('numpy')
+    source_chats, history_index = get_random_chats(seed, 2000, time.time())
+    # np.exp and math.exp may differ in the last bit
+    assert get_totals(source_chats, history_index, 1) == pytest.approx(get_totals(source_chats, history_index, 0), rel=1e-12)
+
+
+def test_batch_scoring_without_numpy_scores_chat_by_chat(monkeypatch):
+    source_chats, history_index = get_random_chats(4, 200, time.time())
+    expected = get_totals(source_chats, history_index, 0)
+    # batch_scoring cannot be imported, as when numpy is not installed
+    monkeypatch.setitem(sys.modules, 'psl_proof.utils.batch_scoring', None)
+    get_batch_scorer.cache_clear()
+    try:
+        assert get_totals(source_chats, history_index, 1) == expected
+    finally:
+        get_batch_scorer.cache_clear()
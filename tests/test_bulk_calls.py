@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from psl_proof.utils.metrics import ProofMetrics, collect_metrics, current_metrics
+from psl_proof.utils.validation_api import ValidatorCallError, ValidatorClient
+from validator_stub import HISTORICAL_DATA_PATH, get_stub_config
+
+BULK_PATH = f"{HISTORICAL_DATA_PATH}/bulk"
+
+
+def call_concurrently(client: ValidatorClient, count: int):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [
+            executor.submit(client.call, HISTORICAL_DATA_PATH, {"SubmittedBy": f"telegram:{index}"})
+            for index in range(count)
+        ]
+    return [future.result() if future.exception() is None else future.exception() for future in futures]
+
+
+def test_concurrent_calls_are_sent_in_bulk(validator_stub):
+    validator_stub.bulk = True
+    client = ValidatorClient(get_stub_config(
+        validator_stub,
+        validator_bulk_batch_size=4,
+        validator_bulk_linger=5.0
+    ))
+    responses = call_concurrently(client, 8)
+
+    assert [response.status_code for response in responses] == [200] * 8
+    assert all(client.decode(response)["isValid"] for response in responses)
+    bulk_requests = validator_stub.get_requests(BULK_PATH)
+    # full batches go out without waiting for the linger
+    assert [len(request.payload["items"]) for request in bulk_requests] == [4, 4]
+    sent = sorted(item["SubmittedBy"] for request in bulk_requests for item in request.payload["items"])
+    assert sent == sorted(f"telegram:{index}" for index in range(8))
+    assert not validator_stub.get_requests(HISTORICAL_DATA_PATH)
+
+
+def test_partial_batch_is_sent_after_the_linger(validator_stub):
+    validator_stub.bulk = True
+    client = ValidatorClient(get_stub_config(
+        validator_stub,
+        validator_bulk_batch_size=8,
+        validator_bulk_linger=0.05
+    ))
+    responses = call_concurrently(client, 3)
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert [len(request.payload["items"]) for request in validator_stub.get_requests(BULK_PATH)] == [3]
+
+
+def test_single_calls_without_bulk_support(validator_stub):
+    client = ValidatorClient(get_stub_config(validator_stub, validator_bulk_batch_size=4))
+    responses = call_concurrently(client, 4)
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert not client.supports_bulk()
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 4
+    assert not validator_stub.get_requests(BULK_PATH)
+
+
+def test_failed_bulk_request_fails_every_item(validator_stub):
+    validator_stub.bulk = True
+    validator_stub.add_faults(BULK_PATH, 400)
+    client = ValidatorClient(get_stub_config(
+        validator_stub,
+        validator_bulk_batch_size=4,
+        validator_bulk_linger=5.0
+    ))
+    results = call_concurrently(client, 4)
+
+    assert all(isinstance(result, ValidatorCallError) for result in results)
+    assert [result.status_code for result in results] == [400] * 4
+
+
+def test_bulk_call_is_recorded_in_each_callers_metrics(validator_stub):
+    validator_stub.bulk = True
+    config = get_stub_config(validator_stub, validator_bulk_batch_size=4, validator_bulk_linger=5.0, metrics=True)
+    client = ValidatorClient(config)
+    shared_metrics = ProofMetrics()
+
+    def call(index: int) -> ProofMetrics:
+        # the last two callers share the metrics of one proof
+        with collect_metrics(config) as metrics:
+            if index >= 2:
+                current_metrics.set(shared_metrics)
+                metrics = shared_metrics
+            client.call(HISTORICAL_DATA_PATH, {"SubmittedBy": f"telegram:{index}"})
+        return metrics
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        metrics_list = list(executor.map(call, range(4)))
+
+    bulk_request, = validator_stub.get_requests(BULK_PATH)
+    http_calls = [metrics.to_dict()['http']['calls'] for metrics in metrics_list[:2] + [shared_metrics]]
+    assert [len(calls) for calls in http_calls] == [1, 1, 1]
+    assert [calls[0]['api_path'] for calls in http_calls] == [BULK_PATH] * 3
+    # one share of the request each, two for the shared metrics
+    assert [calls[0]['request_bytes'] for calls in http_calls] == [
+        round(len(bulk_request.body) * share) for share in (0.25, 0.25, 0.5)
+    ]
+    assert len({calls[0]['seconds'] for calls in http_calls}) == 1
+
+
+def test_idempotent_and_non_idempotent_calls_are_batched_apart(validator_stub):
+    validator_stub.bulk = True
+    client = ValidatorClient(get_stub_config(
+        validator_stub,
+        validator_bulk_batch_size=2,
+        validator_bulk_linger=5.0
+    ))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(client.call, HISTORICAL_DATA_PATH, {"SubmittedBy": f"telegram:{index}"}, index % 2 == 0)
+            for index in range(4)
+        ]
+    assert [future.result().status_code for future in futures] == [200] * 4
+    batches = sorted(
+        sorted(item["SubmittedBy"] for item in request.payload["items"])
+        for request in validator_stub.get_requests(BULK_PATH)
+    )
+    assert batches == [["telegram:0", "telegram:2"], ["telegram:1", "telegram:3"]]
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import random
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from psl_proof.models.cargo_data import CargoData, DataSource, SourceChatData, SourceData
+from psl_proof.models.proof_response import ProofResponse
+from psl_proof.utils.validate_data import get_quality_score, get_uniqueness_score, validate_data
+
+TEXTS = ["plain", "café üß", "日本語", "emoji \U0001F600\U0001F44D", "line\r\nbreak", "", "x" * 500]
+
+
+def get_chats(seed: int, count: int, retain_contents: bool):
+    rng = random.Random(seed)
+    now = time.time()
+    source_chats = []
+    for chat_id in range(count):
+        source_chat = SourceChatData(chat_id=chat_id, retain_contents=retain_contents)
+        for _ in range(rng.randint(0, 12)):
+            source_chat.add_participant(rng.randint(1, 6))
+            source_chat.add_content(rng.choice(TEXTS), now - rng.uniform(0, 1e6), now)
+        source_chats.append(source_chat)
+    return source_chats
+
+
+def get_old_totals(source_chats, history_index):
+    """validate_data totals as computed before ChatContentText, joining each chat's text."""
+    total_quality = total_uniqueness = 0.0
+    for source_chat in source_chats:
+        contents_length = 0
+        if source_chat.contents:
+            contents_length = len(source_chat.content_as_text())
+        elif not source_chat.retain_contents:
+            contents_length = source_chat.total_content_length
+        if contents_length > 0:
+            quality = get_quality_score(source_chat)
+            uniqueness = get_uniqueness_score(source_chat, history_index)
+            if uniqueness > 0:
+                total_quality += quality
+                total_uniqueness += uniqueness
+    return total_quality, total_uniqueness
+
+
+def get_totals(source_chats, history_index):
+    source_data = SourceData(DataSource.telegram, 'token', datetime.now(timezone.utc), 'user', source_chats)
+    cargo_data = CargoData(source_data=source_data, source_id='source')
+    cargo_data.chat_history_index = history_index
+    with contextlib.redirect_stdout(io.StringIO()):
+        validate_data({}, cargo_data, ProofResponse(dlp_id=1))
+    return cargo_data.total_quality, cargo_data.total_uniqueness
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_content_text_length_matches_joined_text(seed):
+    for source_chat in get_chats(seed, 200, True):
+        joined = source_chat.content_as_text()
+        assert source_chat.content_text_length() == len(joined)
+        view = source_chat.content_text()
+        assert len(view) == len(joined)
+        assert str(view) == joined
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_aggregate_chats_have_the_same_length(seed):
+    retained = get_chats(seed, 200, True)
+    aggregated = get_chats(seed, 200, False)
+    for retained_chat, aggregated_chat in zip(retained, aggregated):
+        assert not aggregated_chat.contents
+        assert len(aggregated_chat.content_text()) == len(retained_chat.content_as_text())
+
+
+@pytest.mark.parametrize('retain_contents', [True, False])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_scores_are_unchanged(seed, retain_contents):
+    source_chats = get_chats(seed, 300, retain_contents)
+    history_index = {str(chat_id): time.time() - 3600 * (chat_id % 4) for chat_id in range(0, 300, 5)}
+    assert get_totals(source_chats, history_index) == get_old_totals(source_chats, history_index)
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+import pytest
+
+from psl_proof.daemon import DaemonRequestError, ProofDaemon
+from psl_proof.utils.deadline import ProofDeadline
+from helpers import get_export
+from validator_stub import HISTORICAL_DATA_PATH, SUBMIT_DATA_PATH, VERIFY_TOKEN_PATH, get_stub_config
+
+
+def get_daemon(validator_stub, tmp_path, **overrides) -> ProofDaemon:
+    (tmp_path / 'input.json').write_text(json.dumps(get_export("telegram")), encoding='utf-8')
+    return ProofDaemon(get_stub_config(validator_stub, input_dir=str(tmp_path), **overrides))
+
+
+def wait_for_idle(daemon: ProofDaemon, timeout: float = 5.0) -> None:
+    waited_until = time.monotonic() + timeout
+    while daemon.get_health()['active_jobs'] and time.monotonic() < waited_until:
+        time.sleep(0.01)
+
+
+def test_job_is_proved(validator_stub, tmp_path):
+    daemon = get_daemon(validator_stub, tmp_path)
+    try:
+        assert daemon.prove(daemon.resolve_input('input.json')).valid
+        wait_for_idle(daemon)
+        assert daemon.get_health()['completed_jobs'] == 1
+    finally:
+        daemon.close()
+
+
+def test_timed_out_job_does_not_submit(validator_stub, tmp_path):
+    # historical-data is held until the job has timed out, so it never reaches submit-data in time
+    historical_data_held = validator_stub.hold(HISTORICAL_DATA_PATH)
+    daemon = get_daemon(validator_stub, tmp_path, daemon_job_timeout=0.2)
+    try:
+        with pytest.raises(DaemonRequestError) as timed_out:
+            daemon.prove(daemon.resolve_input('input.json'))
+        assert timed_out.value.status == 504
+        historical_data_held.set()
+        wait_for_idle(daemon)
+        health = daemon.get_health()
+        assert (health['active_jobs'], health['failed_jobs']) == (0, 1)
+        assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 1
+        assert validator_stub.get_requests(SUBMIT_DATA_PATH) == []
+    finally:
+        historical_data_held.set()
+        daemon.close()
+
+
+def test_submitting_job_is_waited_for(validator_stub, tmp_path, monkeypatch):
+    # the daemon's timeout only expires the job once it has committed to submit, and
+    # submit-data is held until then, so the daemon has to wait for the result
+    submit_data_held = validator_stub.hold(SUBMIT_DATA_PATH)
+    committed = threading.Event()
+    expired = []
+    commit, expire = ProofDeadline.commit, ProofDeadline.expire
+
+    def commit_and_signal(deadline, step):
+        commit(deadline, step)
+        committed.set()
+
+    def expire_once_committed(deadline):
+        committed.wait(5)
+        expired.append(expire(deadline))
+        submit_data_held.set()
+        return expired[-1]
+
+    monkeypatch.setattr(ProofDeadline, 'commit', commit_and_signal)
+    monkeypatch.setattr(ProofDeadline, 'expire', expire_once_committed)
+    daemon = get_daemon(validator_stub, tmp_path, daemon_job_timeout=0.2)
+    try:
+        assert daemon.prove(daemon.resolve_input('input.json')).valid
+        assert expired == [False]
+        assert len(validator_stub.get_requests(VERIFY_TOKEN_PATH)) == 1
+        assert len(validator_stub.get_requests(SUBMIT_DATA_PATH)) == 1
+    finally:
+        submit_data_held.set()
+        daemon.close()
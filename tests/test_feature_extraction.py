@@ -0,0 +1,164 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from psl_proof.utils import feature_extraction
+from psl_proof.utils.feature_extraction import get_chats_sentiment, get_feature_model
+from helpers import TINY_MODEL_LABELS, get_chat_messages, save_tiny_sentiment_model
+
+
+@pytest.fixture(autouse=True)
+def fresh_models(monkeypatch):
+    monkeypatch.setattr(feature_extraction, 'feature_models', {})
+
+
+@pytest.fixture(scope='module')
+def tiny_model_dir(tmp_path_factory):
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    return save_tiny_sentiment_model(str(tmp_path_factory.mktemp('tiny-sentiment')))
+
+
+def get_config(model_dir: str, **overrides):
+    return dict({'feature_sentiment_model': model_dir, 'feature_backend': 'torch'}, **overrides)
+
+
+def get_expected_sentiment(model_dir: str, chat_messages):
+    """Sentiment of each chat, classifying its messages one at a time with the model itself."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    sentiments = []
+    for messages in chat_messages:
+        scores = {label: 0.0 for label in TINY_MODEL_LABELS.values()}
+        for message in messages:
+            with torch.inference_mode():
+                probabilities = torch.softmax(model(**tokenizer(message, return_tensors='pt')).logits[0], dim=-1)
+            label_id = int(probabilities.argmax())
+            scores[TINY_MODEL_LABELS[label_id]] += float(probabilities[label_id])
+        sentiments.append({label: score / len(messages) for label, score in scores.items()})
+    return sentiments
+
+
+def assert_same_sentiments(actual, expected):
+    assert len(actual) == len(expected)
+    for actual_chat, expected_chat in zip(actual, expected):
+        assert actual_chat == pytest.approx(expected_chat, abs=1e-5)
+
+
+def test_sentiment_matches_the_model_message_by_message(tiny_model_dir):
+    # short enough to fit the model's window in one chunk
+    chat_messages = get_chat_messages(1, 6, max_words=20)
+    sentiments = get_chats_sentiment(chat_messages, get_config(tiny_model_dir, feature_batch_size=4))
+    assert_same_sentiments(sentiments, get_expected_sentiment(tiny_model_dir, chat_messages))
+
+
+def test_long_messages_are_split_into_windows(tiny_model_dir):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    message = " ".join(["good", "bad", "very", "love"] * 20)
+    sentiment, = get_chats_sentiment([[message]], get_config(tiny_model_dir))
+
+    tokenizer = AutoTokenizer.from_pretrained(tiny_model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(tiny_model_dir).eval()
+    ids = tokenizer(message, add_special_tokens=False)['input_ids']
+    window = tokenizer.model_max_length - tokenizer.num_special_tokens_to_add(pair=False)
+    assert len(ids) > 2 * window
+    summed = torch.zeros(len(TINY_MODEL_LABELS))
+    for offset in range(0, len(ids), window):
+        chunk = ids[offset:offset + window]
+        with torch.inference_mode():
+            logits = model(input_ids=torch.tensor([tokenizer.build_inputs_with_special_tokens(chunk)])).logits[0]
+        summed += torch.softmax(logits, dim=-1) * len(chunk)
+    probabilities = summed / summed.sum()
+    label_id = int(probabilities.argmax())
+    expected = {label: 0.0 for label in TINY_MODEL_LABELS.values()}
+    expected[TINY_MODEL_LABELS[label_id]] = float(probabilities[label_id])
+    assert sentiment == pytest.approx(expected, abs=1e-5)
+
+
+def test_missing_pad_token_falls_back(tiny_model_dir):
+    chat_messages = get_chat_messages(2, 6)
+    config = get_config(tiny_model_dir, feature_batch_size=8)
+    expected = get_chats_sentiment(chat_messages, config)
+
+    get_feature_model('sentiment', config).tokenizer.pad_token = None
+    assert get_feature_model('sentiment', config).tokenizer.pad_token_id is None
+    assert_same_sentiments(get_chats_sentiment(chat_messages, config), expected)
+
+
+class StubKeywordModel:
+    def extract_keywords(self, documents):
+        keywords = [[(document.split()[0], 1.0)] for document in documents]
+        return keywords[0] if len(documents) == 1 else keywords
+
+
+def test_features_are_emitted_in_the_proof(tiny_model_dir, validator_stub, tmp_path):
+    import json
+    from psl_proof.proof import Proof
+    from validator_stub import get_stub_config
+
+    chat_messages = get_chat_messages(3, 3, max_words=10)
+    export = {
+        "revision": "01.01",
+        "source": "telegramMiner",
+        "user": "user",
+        "submission_token": "token",
+        "chats": [
+            {"chat_id": chat_id + 1, "contents": [
+                {"className": "Message", "peerId": {"userId": 1 + index % 2}, "date": 1700000000 + index, "message": message}
+                for index, message in enumerate(messages)
+            ]}
+            for chat_id, messages in enumerate(chat_messages)
+        ]
+    }
+    input_file = tmp_path / 'input.json'
+    input_file.write_text(json.dumps(export), encoding='utf-8')
+    config = get_stub_config(validator_stub, input_dir=str(tmp_path), feature_extraction=True, **get_config(tiny_model_dir))
+    feature_extraction.feature_models[('keywords', config['feature_keyword_model'], 'torch')] = StubKeywordModel()
+
+    proof_response = Proof(config).generate_for_file(str(input_file))
+    chat_data = proof_response.attributes['chat_data']
+    expected = get_expected_sentiment(tiny_model_dir, chat_messages)
+    assert [chat['chat_length'] for chat in chat_data] == [len("\r".join(messages)) for messages in chat_messages]
+    assert [chat['keywords'] for chat in chat_data] == [[(messages[0].split()[0], 1.0)] for messages in chat_messages]
+    assert_same_sentiments([chat['sentiment'] for chat in chat_data], expected)
+    json.dumps(proof_response.model_dump())
+
+
+def test_models_load_once_per_process(monkeypatch):
+    loads = []
+    started = threading.Event()
+
+    def load_stub(name, backend, threads):
+        loads.append((name, backend))
+        # hold the first load so the other threads arrive while it runs
+        started.wait(5)
+        return object()
+
+    monkeypatch.setitem(feature_extraction.FEATURE_MODEL_LOADERS, 'sentiment', ('feature_sentiment_model', 'stub', load_stub))
+    config = {'feature_backend': 'int8'}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(get_feature_model, 'sentiment', config) for _ in range(8)]
+        started.set()
+        models = [future.result() for future in futures]
+
+    assert loads == [('stub', 'int8')]
+    assert all(model is models[0] for model in models)
+    assert get_feature_model('sentiment', dict(config, feature_threads=2)) is models[0]
+    # another backend is another model
+    get_feature_model('sentiment', {'feature_backend': 'torch'})
+    assert loads == [('stub', 'int8'), ('stub', 'torch')]
+
+
+def test_bucketed_batches_match_unbucketed(tiny_model_dir):
+    # mixed lengths, some past the window, so buckets and chunks both come into play
+    chat_messages = get_chat_messages(2, 8)
+    unbucketed = get_chats_sentiment(chat_messages, get_config(tiny_model_dir, feature_batch_size=1))
+    for batch_size in (3, 16, 10000):
+        bucketed = get_chats_sentiment(chat_messages, get_config(tiny_model_dir, feature_batch_size=batch_size))
+        assert_same_sentiments(bucketed, unbucketed)
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+from psl_proof.utils.history_cache import get_history_cache
+from psl_proof.utils.metrics import collect_metrics
+from psl_proof.utils.submission import get_submission_historical_data, submit_data
+from helpers import get_one_chat_source_data
+from validator_stub import HISTORICAL_DATA_PATH, get_stub_config
+
+CHAT_HISTORY = {
+    "sourceChatId": "1",
+    "chats": [{
+        "participantCount": 2,
+        "chatCount": 3,
+        "chatLength": 40,
+        "chatStartOn": "2024-01-01T00:00:00+00:00",
+        "chatEndedOn": "2024-01-01T01:00:00+00:00"
+    }]
+}
+
+
+def test_cached_history_does_not_reuse_the_verdict(validator_stub, tmp_path):
+    config = get_stub_config(validator_stub, history_cache_path=str(tmp_path / 'history.db'))
+    validator_stub.etags[HISTORICAL_DATA_PATH] = '"v1"'
+    validator_stub.responses[HISTORICAL_DATA_PATH] = {
+        "isValid": True,
+        "errorText": "",
+        "lastSubmission": None,
+        "chatHistories": [CHAT_HISTORY]
+    }
+    first = get_submission_historical_data(config, get_one_chat_source_data())
+    assert first.is_valid and first.chat_history_index
+
+    # the history is unchanged, the validator answers 304 and the cached chats are used
+    second = get_submission_historical_data(config, get_one_chat_source_data())
+    assert second.is_valid
+    assert second.chat_history_index == first.chat_history_index
+
+    # the user is now refused, e.g. within the cool down: the fresh cache entry must not hide it
+    validator_stub.responses[HISTORICAL_DATA_PATH] = {"isValid": False, "errorText": "Cool down"}
+    third = get_submission_historical_data(config, get_one_chat_source_data())
+    assert not third.is_valid
+    assert third.error_text == "Cool down"
+
+    requests = validator_stub.get_requests(HISTORICAL_DATA_PATH)
+    assert len(requests) == 3
+    assert 'If-None-Match' not in requests[0].headers
+    assert requests[1].headers['If-None-Match'] == '"v1"'
+    assert requests[2].headers['If-None-Match'] == '"v1"'
+
+
+def test_cache_counts_fetches_avoided(validator_stub, tmp_path):
+    config = get_stub_config(validator_stub, history_cache_path=str(tmp_path / 'history.db'), metrics=True)
+    validator_stub.etags[HISTORICAL_DATA_PATH] = '"v1"'
+    validator_stub.responses[HISTORICAL_DATA_PATH] = {
+        "isValid": True,
+        "errorText": "",
+        "lastSubmission": None,
+        "chatHistories": [CHAT_HISTORY]
+    }
+    counters = []
+    for _ in range(3):
+        with collect_metrics(config) as metrics:
+            get_submission_historical_data(config, get_one_chat_source_data())
+        counters.append(metrics.to_dict()['counters'])
+
+    assert counters[0] == {'history_full_fetches': 1}
+    assert counters[1] == counters[2] == {'history_revalidations': 1, 'history_not_modified': 1}
+    stats = get_history_cache(config).get_stats()
+    assert (stats['full_fetches'], stats['revalidations'], stats['not_modified']) == (1, 2, 2)
+    assert stats['hit_rate'] == 2 / 3
+
+
+def test_local_submission_drops_the_etag(validator_stub, tmp_path):
+    config = get_stub_config(validator_stub, history_cache_path=str(tmp_path / 'history.db'))
+    validator_stub.etags[HISTORICAL_DATA_PATH] = '"v1"'
+    validator_stub.responses[HISTORICAL_DATA_PATH] = {
+        "isValid": True,
+        "errorText": "",
+        "lastSubmission": None,
+        "chatHistories": [CHAT_HISTORY]
+    }
+    source_data = get_one_chat_source_data()
+    get_submission_historical_data(config, source_data)
+    history_cache = get_history_cache(config)
+    fetched = history_cache.peek(source_data.submission_by())
+
+    assert submit_data(config, source_data).is_valid
+    folded = history_cache.peek(source_data.submission_by())
+    assert folded.etag is None
+    assert folded.fetched_at == fetched.fetched_at
+    assert len(folded.result_json["chatHistories"][0]["chats"]) == 2
+
+    # the next fetch cannot be answered 304 against the synthesized history
+    get_submission_historical_data(config, source_data)
+    last_request = validator_stub.get_requests(HISTORICAL_DATA_PATH)[-1]
+    assert 'If-None-Match' not in last_request.headers
+    assert last_request.headers['X-History-Since'] == datetime.fromtimestamp(fetched.fetched_at, timezone.utc).isoformat()
@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import sys
+import zipfile
+
+import pytest
+
+from psl_proof.utils.input_reader import InputLimitError, extract_inputs, extract_zip, get_input_codec, open_input
+from helpers import get_export
+
+LIMITS = {'input_max_uncompressed_bytes': 100_000, 'input_max_compression_ratio': 50}
+
+
+def write_zip(path, members, compression=zipfile.ZIP_DEFLATED) -> str:
+    with zipfile.ZipFile(path, 'w', compression) as zip_ref:
+        for name, data in members:
+            zip_ref.writestr(name, data)
+    return str(path)
+
+
+def get_noise(size: int) -> bytes:
+    # incompressible, so only the size limit applies
+    return os.urandom(size)
+
+
+def test_member_over_the_size_limit_is_refused(tmp_path):
+    archive = write_zip(tmp_path / 'input.zip', [('input.json', get_noise(150_000))])
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    with pytest.raises(InputLimitError, match='more than 100000 bytes'):
+        extract_zip(archive, str(output_dir), LIMITS)
+    assert os.listdir(output_dir) == []
+
+
+def test_members_together_over_the_size_limit_are_refused(tmp_path):
+    members = [(f'part-{index}.json', get_noise(40_000)) for index in range(3)]
+    archive = write_zip(tmp_path / 'input.zip', members)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    with pytest.raises(InputLimitError, match='input.zip decompresses to more than'):
+        extract_zip(archive, str(output_dir), LIMITS)
+    # the members written before the limit tripped are removed
+    assert os.listdir(output_dir) == []
+
+
+def test_member_over_the_ratio_limit_is_refused(tmp_path):
+    archive = write_zip(tmp_path / 'input.zip', [('input.json', b' ' * 90_000)])
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    with pytest.raises(InputLimitError, match='compression ratio'):
+        extract_zip(archive, str(output_dir), LIMITS)
+    assert os.listdir(output_dir) == []
+
+
+def test_partial_member_is_removed(tmp_path):
+    data = json.dumps(get_export("telegram")).encode('utf-8')
+    archive = write_zip(tmp_path / 'input.zip', [('input.json', data)], zipfile.ZIP_STORED)
+    # corrupt the stored data, the CRC check fails once the member has been written
+    content = bytearray((tmp_path / 'input.zip').read_bytes())
+    offset = content.index(data[:64]) + len(data) // 2
+    content[offset] ^= 0xff
+    (tmp_path / 'input.zip').write_bytes(bytes(content))
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    with pytest.raises(zipfile.BadZipFile):
+        extract_zip(archive, str(output_dir), LIMITS)
+    assert os.listdir(output_dir) == []
+
+
+def test_gzip_bomb_inside_a_zip_is_refused(tmp_path):
+    # the zip member is small and compressed barely at all, its gzip content is the bomb
+    bomb = gzip.compress(b' ' * 1_000_000)
+    archive = write_zip(tmp_path / 'input.zip', [('input.json.gz', bomb)], zipfile.ZIP_STORED)
+    with pytest.raises(InputLimitError):
+        with open_input(archive, LIMITS) as f:
+            f.read()
+
+
+def test_bad_archive_does_not_stop_the_others(tmp_path):
+    data = json.dumps(get_export("telegram")).encode('utf-8')
+    write_zip(tmp_path / 'a-bomb.zip', [('bomb.json', b' ' * 90_000)])
+    write_zip(tmp_path / 'b-good.zip', [('good.json', data)])
+    extracted = extract_inputs(str(tmp_path), LIMITS)
+    assert extracted == [str(tmp_path / 'good.json')]
+    assert sorted(os.listdir(tmp_path)) == ['a-bomb.zip', 'b-good.zip', 'good.json']
+    assert (tmp_path / 'good.json').read_bytes() == data
+
+
+def read_input(path, data: bytes) -> str:
+    path.write_bytes(data)
+    with open_input(str(path), LIMITS) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('codec_name, magic', [('gzip', b'\x1f\x8b'), ('zstd', b'\x28\xb5\x2f\xfd'), ('lz4', b'\x04\x22\x4d\x18')])
+def test_codecs_are_detected_by_magic_bytes(codec_name, magic):
+    assert get_input_codec(magic + b'rest')[0] == codec_name
+    assert get_input_codec(b'{"revision"') is None
+
+
+def test_gzip_input_is_decoded(tmp_path):
+    document = json.dumps(get_export("telegram"), ensure_ascii=False)
+    assert read_input(tmp_path / 'input.json', gzip.compress(document.encode('utf-8'))) == document
+
+
+def test_zstd_input_is_decoded(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    document = json.dumps(get_export("telegram"), ensure_ascii=False)
+    # two frames, as a concatenated stream would have
+    data = b''.join(zstandard.ZstdCompressor().compress(part.encode('utf-8')) for part in (document[:500], document[500:]))
+    assert read_input(tmp_path / 'input.json', data) == document
+
+
+def test_lz4_input_is_decoded(tmp_path):
+    lz4_frame = pytest.importorskip('lz4.frame')
+    document = json.dumps(get_export("telegram"), ensure_ascii=False)
+    assert read_input(tmp_path / 'input.json', lz4_frame.compress(document.encode('utf-8'))) == document
+
+
+@pytest.mark.parametrize('magic, modules, package', [
+    (b'\x28\xb5\x2f\xfd', ['zstandard'], 'zstandard'),
+    (b'\x04\x22\x4d\x18', ['lz4', 'lz4.frame'], 'lz4')
+])
+def test_missing_codec_package_is_reported(tmp_path, monkeypatch, magic, modules, package):
+    # as when the optional package is not installed
+    for module in modules:
+        monkeypatch.setitem(sys.modules, module, None)
+    with pytest.raises(ValueError, match=f'requires the {package} package'):
+        read_input(tmp_path / 'input.json', magic + b'\x00' * 16)
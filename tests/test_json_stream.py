@@ -0,0 +1,105 @@
+import io
+import json
+
+import pytest
+
+from psl_proof.proof import get_source_data, get_source_data_stream
+from psl_proof.utils.json_stream import JsonStreamReader
+from helpers import EXPORTS, NESTED_VALUE, SUBMISSION_TIMESTAMP, TEXTS, get_export
+
+CHUNK_SIZES = [1, 2, 3, 17]
+
+
+class ShortReads(io.RawIOBase):
+    """Raw bytes stream answering each read with at most `size` bytes."""
+
+    def __init__(self, data: bytes, size: int):
+        self.data = data
+        self.size = size
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self.data[self.pos:self.pos + min(self.size, len(buffer))]
+        buffer[:len(chunk)] = chunk
+        self.pos += len(chunk)
+        return len(chunk)
+
+
+class ShortTextReads:
+    """Text stream answering each read with at most `size` characters."""
+
+    def __init__(self, stream, size: int):
+        self.stream = stream
+        self.size = size
+
+    def read(self, size: int = -1) -> str:
+        return self.stream.read(self.size if size < 0 else min(size, self.size))
+
+
+def open_chunked(document: str, chunk_size: int):
+    """The document as UTF-8 bytes read chunk_size bytes, and decoded chunk_size characters, at a time."""
+    raw = ShortReads(document.encode('utf-8'), chunk_size)
+    text = io.TextIOWrapper(io.BufferedReader(raw, buffer_size=chunk_size), encoding='utf-8')
+    return ShortTextReads(text, chunk_size)
+
+
+def assert_same_source_data(document: str, chunk_size: int, retain_contents: bool = True) -> None:
+    expected = get_source_data(json.loads(document), SUBMISSION_TIMESTAMP, retain_contents)
+    streamed = get_source_data_stream(open_chunked(document, chunk_size), SUBMISSION_TIMESTAMP, retain_contents)
+    assert streamed == expected
+    assert streamed.source_chats
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('export', EXPORTS)
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+def test_stream_matches_json_load(export, chunk_size, ensure_ascii):
+    assert_same_source_data(json.dumps(export, ensure_ascii=ensure_ascii), chunk_size)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_stream_matches_json_load_without_contents(chunk_size):
+    assert_same_source_data(json.dumps(EXPORTS[0], indent=2), chunk_size, retain_contents=False)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+def test_reader_values_match_json_load(chunk_size, ensure_ascii):
+    values = [NESTED_VALUE, *TEXTS, 0, -0.0, 12345678901234567890, 1.5e300, -7e-7, True, False, None, [], {}]
+    document = json.dumps(values, ensure_ascii=ensure_ascii, indent=1)
+    reader = JsonStreamReader(open_chunked(document, chunk_size), chunk_size=chunk_size)
+    assert list(reader.iter_array_values()) == json.loads(document)
+    assert reader.peek() == ""
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_truncated_input_is_refused(chunk_size):
+    document = json.dumps(get_export("telegramMiner"), ensure_ascii=False)[:600]
+    for length in range(len(document)):
+        with pytest.raises(ValueError):
+            json.loads(document[:length])
+        with pytest.raises(ValueError):
+            get_source_data_stream(open_chunked(document[:length], chunk_size), SUBMISSION_TIMESTAMP)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('document', [
+    '{"source": "telegram",, "chats": []}',
+    '{"source" "telegram", "chats": []}',
+    '{"source": "telegram", "chats": [] "user": "u"}',
+    '{"source": "telegram", 1: 2}',
+    '{"source": "telegram", "chats": [{"chat_id": 1, "contents": [{"@type": "message"} {}]}]}',
+    '{"source": "telegram", "extra": [1, 2,]}',
+    '{"source": "telegram", "extra": "unterminated}',
+    '{"source": "telegram", "extra": "bad \\x escape"}',
+    '{"source": "telegram", "extra": tru}',
+    '{"source": "telegram", "chats": []} {}',
+])
+def test_malformed_input_is_refused(document, chunk_size):
+    with pytest.raises(ValueError):
+        json.loads(document)
+    with pytest.raises(ValueError):
+        get_source_data_stream(open_chunked(document, chunk_size), SUBMISSION_TIMESTAMP)
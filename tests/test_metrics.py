@@ -0,0 +1,24 @@
+from psl_proof.utils.metrics import collect_metrics, measure_phase
+
+
+def test_rss_mode_records_only_the_growth_of_the_process_peak():
+    with collect_metrics({'metrics': True}) as metrics:
+        with measure_phase('parse'):
+            pass
+    phase = metrics.to_dict()['phases']['parse']
+    assert phase['peak_bytes'] is None
+    assert phase['rss_peak_growth_bytes'] >= 0
+    # an empty phase cannot get anywhere near the peak the process reached so far
+    assert phase['rss_peak_growth_bytes'] < metrics.to_dict()['peak_rss_bytes']
+
+
+def test_traced_mode_records_the_peak_of_each_phase():
+    with collect_metrics({'metrics': True, 'metrics_trace_memory': True}) as metrics:
+        with measure_phase('parse'):
+            data = bytearray(8 * 1024 * 1024)
+            del data
+        with measure_phase('validate_data'):
+            pass
+    phases = metrics.to_dict()['phases']
+    assert phases['parse']['peak_bytes'] >= 8 * 1024 * 1024
+    assert phases['validate_data']['peak_bytes'] < 8 * 1024 * 1024
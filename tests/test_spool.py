@@ -0,0 +1,97 @@
+import json
+import os
+
+from psl_proof.spool import Spool
+from helpers import get_export
+from validator_stub import SUBMIT_DATA_PATH, VERIFY_TOKEN_PATH, get_stub_config
+
+
+def get_spool(validator_stub, tmp_path, **overrides) -> Spool:
+    config = get_stub_config(validator_stub, spool_settle_seconds=0.0, **overrides)
+    spool = Spool(config, str(tmp_path))
+    spool.load_result_names()
+    return spool
+
+
+def drop(spool: Spool, filename: str, user: str) -> None:
+    with open(os.path.join(spool.inbox_dir, filename), 'w', encoding='utf-8') as f:
+        json.dump(dict(get_export("telegram"), user=user), f)
+
+
+def prove_inbox(spool: Spool) -> list:
+    """Claims and proves the ready inbox files one by one, like the spool loop."""
+    entries = []
+    for filename in spool.list_ready_files():
+        entries.append(spool.prove_file(filename, spool.claim(filename)))
+    return entries
+
+
+def read_index(spool: Spool) -> list:
+    with open(os.path.join(spool.results_dir, 'spool-index.jsonl'), 'rb') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_files_sharing_a_name_are_all_proved(validator_stub, tmp_path):
+    spool = get_spool(validator_stub, tmp_path)
+    drop(spool, 'export.json', 'user-1')
+    first, = prove_inbox(spool)
+    drop(spool, 'export.json', 'user-2')
+    second, = prove_inbox(spool)
+
+    assert first['valid'] and second['valid']
+    assert (first['output'], second['output']) == ('results/export.json', 'results/export-2.json')
+    assert sorted(os.listdir(spool.done_dir)) == ['export-2.json', 'export.json']
+    assert len(validator_stub.get_requests(SUBMIT_DATA_PATH)) == 2
+
+    # a restart keeps telling both contents apart
+    restarted = get_spool(validator_stub, tmp_path)
+    assert restarted.has_result(first['sha256']) and restarted.has_result(second['sha256'])
+
+
+def test_duplicate_content_is_reported(validator_stub, tmp_path):
+    spool = get_spool(validator_stub, tmp_path)
+    drop(spool, 'export.json', 'user-1')
+    first, = prove_inbox(spool)
+    drop(spool, 'again.json', 'user-1')
+    duplicate, = prove_inbox(spool)
+
+    assert duplicate['duplicate_of'] == first['output']
+    assert duplicate['output'] is None
+    assert sorted(os.listdir(spool.done_dir)) == ['again.json', 'export.json']
+    assert len(validator_stub.get_requests(SUBMIT_DATA_PATH)) == 1
+    assert [entry['input'] for entry in read_index(spool)] == [first['input'], duplicate['input']]
+
+
+def test_validator_outage_leaves_the_file_in_the_inbox(validator_stub, tmp_path):
+    spool = get_spool(validator_stub, tmp_path, validator_max_retries=0, spool_retry_delay=60.0)
+    drop(spool, 'export.json', 'user-1')
+    validator_stub.add_faults(VERIFY_TOKEN_PATH, 503)
+
+    assert prove_inbox(spool) == [None]
+    assert os.listdir(spool.inbox_dir) == ['export.json']
+    assert os.listdir(spool.failed_dir) == []
+    assert not os.path.exists(os.path.join(spool.results_dir, 'spool-index.jsonl'))
+    # no new claims until the retry delay is over
+    spool.fill_window()
+    assert not spool.in_flight and os.listdir(spool.inbox_dir) == ['export.json']
+
+    spool.claims_paused_until = 0.0
+    entry, = prove_inbox(spool)
+    assert entry['valid'] and os.listdir(spool.done_dir) == ['export.json']
+
+
+def test_recover_uses_content_and_does_not_replace_files(validator_stub, tmp_path):
+    spool = get_spool(validator_stub, tmp_path)
+    drop(spool, 'export.json', 'user-1')
+    prove_inbox(spool)
+    drop(spool, 'export.json', 'user-1')
+    proved_claim = spool.claim('export.json')
+    drop(spool, 'export.json', 'user-2')
+    unproved_claim = spool.claim('export.json')
+    drop(spool, 'export.json', 'user-3')
+
+    restarted = get_spool(validator_stub, tmp_path)
+    restarted.recover()
+    assert not os.path.exists(proved_claim) and not os.path.exists(unproved_claim)
+    assert sorted(os.listdir(restarted.done_dir)) == ['export-2.json', 'export.json']
+    assert sorted(os.listdir(restarted.inbox_dir)) == ['export-2.json', 'export.json']
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from psl_proof.proof import Proof, get_source_data, get_source_data_typed
+from helpers import EXPORTS, SUBMISSION_TIMESTAMP
+
+pytest.importorskip('msgspec')
+
+
+def without_malformed(export):
+    """The export with only the messages both decoders accept."""
+    def is_wellformed(message):
+        sender = message.get("sender_id") or message.get("peerId") or {}
+        return not isinstance(sender.get("user_id", sender.get("userId")), list) and not isinstance(message.get("date"), str)
+
+    chats = [
+        dict(chat, contents=[message for message in chat["contents"] if is_wellformed(message)])
+        if "contents" in chat else chat
+        for chat in export["chats"]
+    ]
+    return dict(export, chats=chats)
+
+
+def load_source_data(tmp_path, document: str, typed_input_decoding: bool):
+    input_file = tmp_path / 'input.json'
+    input_file.write_text(document, encoding='utf-8')
+    config = {
+        'dlp_id': 1234,
+        'streaming_input': False,
+        'typed_input_decoding': typed_input_decoding
+    }
+    return Proof(config).load_source_data(str(input_file), SUBMISSION_TIMESTAMP)
+
+
+@pytest.mark.parametrize('export', EXPORTS)
+def test_typed_decoding_matches_dict_decoding(export):
+    document = json.dumps(without_malformed(export))
+    typed = get_source_data_typed(document.encode('utf-8'), SUBMISSION_TIMESTAMP)
+    assert typed is not None
+    assert typed == get_source_data(json.loads(document), SUBMISSION_TIMESTAMP)
+    assert typed.source_chats
+
+
+@pytest.mark.parametrize('export', EXPORTS)
+def test_malformed_messages_fall_back_to_dict_decoding(tmp_path, export):
+    document = json.dumps(export)
+    assert get_source_data_typed(document.encode('utf-8'), SUBMISSION_TIMESTAMP) is None
+
+    typed = load_source_data(tmp_path, document, True)
+    assert typed == load_source_data(tmp_path, document, False)
+    assert typed.source_chats
@@ -0,0 +1,110 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from psl_proof.models.cargo_data import CargoData, DataSource, SourceChatData, SourceData
+from psl_proof.models.submission_dtos import ChatHistory, SubmissionChat
+from psl_proof.utils.validate_data import get_uniqueness_score
+from helpers import get_uniqueness_score_linear
+
+# seconds between a chat's end and its submitted record, around the scoring boundaries
+BOUNDARY_OFFSETS = [-3600, -1, 0, 1, 3599, 3599.999, 3600, 3600.001, 3601, 7199, 7199.999, 7200, 7201, 86400]
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def get_submission_chat(chat_ended_on: datetime) -> SubmissionChat:
+    return SubmissionChat(
+        participant_count=1,
+        chat_count=1,
+        chat_length=10,
+        chat_start_on=chat_ended_on - timedelta(hours=1),
+        chat_ended_on=chat_ended_on
+    )
+
+
+def get_source_chat(chat_id: int, chat_ended_on: datetime = None) -> SourceChatData:
+    source_chat = SourceChatData(chat_id=chat_id, retain_contents=False)
+    if chat_ended_on is not None:
+        source_chat.add_content('hello', chat_ended_on.timestamp(), NOW.timestamp())
+    return source_chat
+
+
+def get_indexed_scores(source_chats, chat_histories):
+    source_data = SourceData(DataSource.telegram, 'token', NOW, 'user', source_chats)
+    cargo_data = CargoData(source_data=source_data, source_id='source', chat_histories=chat_histories)
+    chat_history_index = cargo_data.get_chat_history_index()
+    return [get_uniqueness_score(source_chat, chat_history_index) for source_chat in source_chats]
+
+
+@pytest.fixture
+def utc_local_time(monkeypatch):
+    # the linear scan took a chat without an end as datetime.now(), naive local time,
+    # and compared it with the UTC histories as if it were UTC
+    monkeypatch.setenv('TZ', 'UTC')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_boundaries_match_linear_scan():
+    source_chats, chat_histories = [], []
+    for chat_id, offset in enumerate(BOUNDARY_OFFSETS):
+        chat_ended_on = NOW - timedelta(seconds=offset)
+        source_chats.append(get_source_chat(chat_id, NOW))
+        chat_histories.append(ChatHistory(str(chat_id), [get_submission_chat(chat_ended_on)]))
+    source_chats.append(get_source_chat(len(BOUNDARY_OFFSETS), NOW))  # never submitted
+
+    expected = [get_uniqueness_score_linear(source_chat, chat_histories) for source_chat in source_chats]
+    assert get_indexed_scores(source_chats, chat_histories) == expected
+    assert 0.0 in expected and 1.0 in expected
+
+
+def test_duplicate_source_chat_ids_match_linear_scan():
+    chat_histories = [
+        ChatHistory("1", []),  # no records, the next history of the id is used
+        ChatHistory("1", [get_submission_chat(NOW - timedelta(minutes=30)), get_submission_chat(NOW - timedelta(days=2))]),
+        ChatHistory("1", [get_submission_chat(NOW - timedelta(days=3))]),
+        ChatHistory("2", [get_submission_chat(NOW - timedelta(days=3))]),
+        ChatHistory("2", [get_submission_chat(NOW - timedelta(minutes=30))]),
+        # naive and offset aware records of the same instant
+        ChatHistory("3", [get_submission_chat((NOW - timedelta(minutes=90)).replace(tzinfo=None))]),
+        ChatHistory("3", [get_submission_chat(NOW - timedelta(days=1))])
+    ]
+    source_chats = [get_source_chat(chat_id, NOW) for chat_id in (1, 2, 3)]
+
+    expected = [get_uniqueness_score_linear(source_chat, chat_histories) for source_chat in source_chats]
+    assert get_indexed_scores(source_chats, chat_histories) == expected
+    assert expected == [0.0, 1.0, 0.0]
+
+
+def test_chats_without_end_match_linear_scan(utc_local_time):
+    now = datetime.now(timezone.utc)
+    chat_histories = [
+        ChatHistory("1", [get_submission_chat(now - timedelta(minutes=30))]),
+        ChatHistory("2", [get_submission_chat(now - timedelta(hours=3))]),
+        ChatHistory("3", [get_submission_chat(now + timedelta(hours=5))])
+    ]
+    source_chats = [get_source_chat(chat_id) for chat_id in (1, 2, 3, 4)]
+
+    expected = [get_uniqueness_score_linear(source_chat, chat_histories) for source_chat in source_chats]
+    assert get_indexed_scores(source_chats, chat_histories) == expected
+    assert expected == [0.0, 1.0, 0.0, 1.0]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_random_histories_match_linear_scan(seed):
+    rng = random.Random(seed)
+    chat_histories = []
+    for _ in range(300):
+        records = [
+            get_submission_chat(NOW - timedelta(seconds=rng.choice(BOUNDARY_OFFSETS) + rng.uniform(-2, 2)))
+            for _ in range(rng.randint(0, 3))
+        ]
+        chat_histories.append(ChatHistory(str(rng.randint(0, 150)), records))
+    source_chats = [get_source_chat(chat_id, NOW) for chat_id in range(200)]
+
+    expected = [get_uniqueness_score_linear(source_chat, chat_histories) for source_chat in source_chats]
+    assert get_indexed_scores(source_chats, chat_histories) == expected
@@ -0,0 +1,176 @@
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from psl_proof.utils.submission import get_submission_historical_data, submit_data
+from psl_proof.utils.validation_api import ValidatorCallError, ValidatorClient, request_was_not_sent
+from psl_proof.utils.verification import verify_token
+from helpers import get_one_chat_source_data
+from validator_stub import HISTORICAL_DATA_PATH, SUBMIT_DATA_PATH, VERIFY_TOKEN_PATH, get_stub_config
+
+READ_TIMEOUT = 0.2
+
+
+def get_client(stub, **overrides) -> ValidatorClient:
+    stub.timeout_delay = READ_TIMEOUT * 2
+    return ValidatorClient(get_stub_config(stub, validator_read_timeout=READ_TIMEOUT, **overrides))
+
+
+def get_closed_port() -> int:
+    with socket.socket() as listener:
+        listener.bind(('127.0.0.1', 0))
+        return listener.getsockname()[1]
+
+
+@pytest.mark.parametrize('fault', [502, 503, 'timeout'])
+def test_idempotent_call_is_retried(validator_stub, fault):
+    client = get_client(validator_stub, validator_max_retries=3)
+    validator_stub.add_faults(HISTORICAL_DATA_PATH, fault, fault, fault)
+
+    assert client.call(HISTORICAL_DATA_PATH, {}).status_code == 200
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 4
+
+
+@pytest.mark.parametrize('fault', [502, 503, 'timeout'])
+def test_retries_are_limited(validator_stub, fault):
+    client = get_client(validator_stub, validator_max_retries=2)
+    validator_stub.add_faults(HISTORICAL_DATA_PATH, fault, fault, fault)
+
+    with pytest.raises(ValidatorCallError):
+        client.call(HISTORICAL_DATA_PATH, {})
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 3
+
+
+def test_submit_data_is_retried_when_not_processed(validator_stub):
+    client = get_client(validator_stub, validator_max_retries=3)
+    validator_stub.add_faults(SUBMIT_DATA_PATH, 503, 503)
+
+    assert client.call(SUBMIT_DATA_PATH, {}, idempotent=False).status_code == 200
+    assert len(validator_stub.get_requests(SUBMIT_DATA_PATH)) == 3
+
+
+@pytest.mark.parametrize('fault', [502, 'timeout'])
+def test_submit_data_is_not_retried_once_received(validator_stub, fault):
+    client = get_client(validator_stub, validator_max_retries=3)
+    validator_stub.add_faults(SUBMIT_DATA_PATH, fault)
+
+    with pytest.raises(ValidatorCallError):
+        client.call(SUBMIT_DATA_PATH, {}, idempotent=False)
+    assert len(validator_stub.get_requests(SUBMIT_DATA_PATH)) == 1
+
+
+def test_submit_data_is_retried_when_connection_refused(validator_stub, caplog):
+    config = get_stub_config(
+        validator_stub,
+        validator_base_api_url=f"http://127.0.0.1:{get_closed_port()}",
+        validator_max_retries=2
+    )
+    client = ValidatorClient(config)
+
+    with caplog.at_level(logging.WARNING), pytest.raises(ValidatorCallError):
+        client.call(SUBMIT_DATA_PATH, {}, idempotent=False)
+    # the server never saw the request, so it is retried like an idempotent one
+    assert len([record for record in caplog.records if 'retry' in record.getMessage()]) == 2
+    with pytest.raises(requests.exceptions.ConnectionError) as refused:
+        requests.post(config['validator_base_api_url'], timeout=1)
+    assert request_was_not_sent(refused.value)
+
+
+def test_circuit_breaker_opens_and_half_opens(validator_stub):
+    client = get_client(
+        validator_stub,
+        validator_max_retries=0,
+        validator_breaker_threshold=2,
+        validator_breaker_reset=0.3
+    )
+    validator_stub.add_faults(HISTORICAL_DATA_PATH, 502, 502)
+    for _ in range(2):
+        with pytest.raises(ValidatorCallError):
+            client.call(HISTORICAL_DATA_PATH, {})
+
+    # open: refused without reaching the validator
+    with pytest.raises(ValidatorCallError, match='circuit breaker is open'):
+        client.call(HISTORICAL_DATA_PATH, {})
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 2
+
+    # half open: one trial call, whose failure re-opens it straight away
+    time.sleep(0.35)
+    validator_stub.add_faults(HISTORICAL_DATA_PATH, 502)
+    with pytest.raises(ValidatorCallError, match='status code 502'):
+        client.call(HISTORICAL_DATA_PATH, {})
+    with pytest.raises(ValidatorCallError, match='circuit breaker is open'):
+        client.call(HISTORICAL_DATA_PATH, {})
+
+    # a successful trial call closes it
+    time.sleep(0.35)
+    assert client.call(HISTORICAL_DATA_PATH, {}).status_code == 200
+    assert client.call(HISTORICAL_DATA_PATH, {}).status_code == 200
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 5
+
+
+@pytest.mark.parametrize('api_path, call', [
+    (VERIFY_TOKEN_PATH, verify_token),
+    (HISTORICAL_DATA_PATH, get_submission_historical_data),
+    (SUBMIT_DATA_PATH, submit_data)
+])
+def test_validator_outage_is_a_service_error(validator_stub, api_path, call):
+    # a fresh stub port per test, so the process wide client is not shared
+    config = get_stub_config(validator_stub, validator_max_retries=1)
+    validator_stub.add_faults(api_path, 503, 503)
+
+    result = call(config, get_one_chat_source_data())
+
+    assert result.service_error
+    assert not result.is_valid
+    assert '503' in result.error_text
+    assert len(validator_stub.get_requests(api_path)) == 2
+
+
+def test_half_open_breaker_admits_one_probe(validator_stub):
+    # the probe is held by the stub, well within the read timeout
+    client = ValidatorClient(get_stub_config(
+        validator_stub,
+        validator_max_retries=2,
+        validator_breaker_threshold=1,
+        validator_breaker_reset=0.2
+    ))
+    validator_stub.add_faults(HISTORICAL_DATA_PATH, 502, 502, 502)
+    with pytest.raises(ValidatorCallError, match='status code 502'):
+        client.call(HISTORICAL_DATA_PATH, {})
+    time.sleep(0.25)
+
+    # the probe is held by the validator while other callers arrive
+    probe_held = validator_stub.hold(HISTORICAL_DATA_PATH)
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            probe = executor.submit(client.call, HISTORICAL_DATA_PATH, {})
+            while len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) < 4:
+                time.sleep(0.01)
+            for _ in range(3):
+                with pytest.raises(ValidatorCallError, match='circuit breaker is open'):
+                    client.call(HISTORICAL_DATA_PATH, {})
+            probe_held.set()
+            assert probe.result().status_code == 200
+    finally:
+        probe_held.set()
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 4
+    assert client.call(HISTORICAL_DATA_PATH, {}).status_code == 200
+
+
+def test_retries_of_one_call_count_as_one_failure(validator_stub):
+    client = get_client(
+        validator_stub,
+        validator_max_retries=3,
+        validator_breaker_threshold=2,
+        validator_breaker_reset=30.0
+    )
+    # all four attempts of the first call fail, the breaker stays closed
+    validator_stub.add_faults(HISTORICAL_DATA_PATH, 502, 502, 502, 502)
+    with pytest.raises(ValidatorCallError, match='status code 502'):
+        client.call(HISTORICAL_DATA_PATH, {})
+    assert len(validator_stub.get_requests(HISTORICAL_DATA_PATH)) == 4
+    assert client.call(HISTORICAL_DATA_PATH, {}).status_code == 200
@@ -0,0 +1,30 @@
+import gzip
+
+from psl_proof.utils.validation_api import get_validator_client
+from validator_stub import HISTORICAL_DATA_PATH, SUBMIT_DATA_PATH, get_stub_config
+
+
+def test_connections_are_reused_across_calls(validator_stub):
+    config = get_stub_config(validator_stub)
+    for path in (HISTORICAL_DATA_PATH, SUBMIT_DATA_PATH) * 3:
+        assert get_validator_client(config).call(path, {}).status_code == 200
+
+    assert get_validator_client(config) is get_validator_client(dict(config))
+    assert len(validator_stub.requests) == 6
+    assert validator_stub.connection_count == 1
+
+
+def test_large_bodies_are_sent_gzip_encoded(validator_stub):
+    client = get_validator_client(get_stub_config(validator_stub, validator_gzip_min_bytes=1024))
+    large_payload = {"Chats": [{"SourceChatId": str(index), "ChatLength": index} for index in range(200)]}
+    small_payload = {"Chats": []}
+    client.call(HISTORICAL_DATA_PATH, large_payload)
+    client.call(HISTORICAL_DATA_PATH, small_payload)
+
+    large_request, small_request = validator_stub.get_requests(HISTORICAL_DATA_PATH)
+    assert large_request.headers['Content-Encoding'] == 'gzip'
+    assert large_request.body[:2] == b'\x1f\x8b'
+    assert len(gzip.decompress(large_request.body)) >= 1024
+    assert large_request.payload == large_payload
+    assert 'Content-Encoding' not in small_request.headers
+    assert small_request.payload == small_payload
@@ -0,0 +1,214 @@
+"""
+Local stand in for the validator api, for tests and offline benchmarks.
+
+It answers verify-token, historical-data and submit-data, the bulk variant of
+each (`<path>/bulk`, advertised by `/api/capabilities`) when started with
+bulk=True, honours If-None-Match on historical-data, reads gzip encoded
+bodies and records every request and connection it sees. Faults queued with
+`add_faults` answer a path's next requests with an error status ('timeout'
+drops the request once the client's read timeout is over instead).
+
+Run it on its own to benchmark against it:
+
+    python tests/validator_stub.py --port 8080 --bulk --delay 0.02
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+
+VERIFY_TOKEN_PATH = 'api/verifications/verify-token'
+HISTORICAL_DATA_PATH = 'api/submissions/historical-data'
+SUBMIT_DATA_PATH = 'api/submissions/submit-data'
+CAPABILITIES_PATH = 'api/capabilities'
+BULK_SUFFIX = '/bulk'
+# longest a held request waits, so a failing test does not hang the stub
+HOLD_TIMEOUT = 10.0
+
+
+def get_default_responses() -> Dict[str, Dict[str, Any]]:
+    return {
+        VERIFY_TOKEN_PATH: {"isValid": True, "errorText": "", "proofToken": "proof-token"},
+        HISTORICAL_DATA_PATH: {"isValid": True, "errorText": "", "lastSubmission": None, "chatHistories": []},
+        SUBMIT_DATA_PATH: {"isValid": True, "errorText": ""}
+    }
+
+
+@dataclass
+class StubRequest:
+    path: str
+    headers: Dict[str, str]
+    body: bytes               # as received, gzip encoded bodies included
+    payload: Any              # the decoded JSON body
+    connection_id: int
+
+
+class ValidatorStub:
+    def __init__(self, port: int = 0, bulk: bool = False, delay: float = 0.0, timeout_delay: float = 1.0):
+        self.bulk = bulk
+        self.delay = delay
+        self.timeout_delay = timeout_delay
+        self.responses = get_default_responses()
+        self.etags: Dict[str, str] = {}
+        self.faults: Dict[str, List[Union[int, str]]] = {}
+        self.holds: Dict[str, threading.Event] = {}
+        self.requests: List[StubRequest] = []
+        self.connection_count = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), StubRequestHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> 'ValidatorStub':
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_faults(self, api_path: str, *faults: Union[int, str]) -> None:
+        """Answers the next requests of api_path with these statuses, or 'timeout'."""
+        with self.lock:
+            self.faults.setdefault(api_path, []).extend(faults)
+
+    def next_fault(self, api_path: str) -> Optional[Union[int, str]]:
+        with self.lock:
+            faults = self.faults.get(api_path)
+            return faults.pop(0) if faults else None
+
+    def hold(self, api_path: str) -> threading.Event:
+        """Holds the answers to api_path until the returned event is set."""
+        with self.lock:
+            return self.holds.setdefault(api_path, threading.Event())
+
+    def new_connection(self) -> int:
+        with self.lock:
+            self.connection_count += 1
+            return self.connection_count
+
+    def record(self, request: StubRequest) -> None:
+        with self.lock:
+            self.requests.append(request)
+
+    def get_requests(self, api_path: str) -> List[StubRequest]:
+        with self.lock:
+            return [request for request in self.requests if request.path == api_path]
+
+    def answer(self, api_path: str, headers: Dict[str, str]) -> Any:
+        """(status, body, extra headers) of a single item request."""
+        response = self.responses.get(api_path)
+        if response is None:
+            return 404, {"error": f"Unknown path {api_path}"}, {}
+        etag = self.etags.get(api_path)
+        if etag and response.get("isValid") and headers.get('If-None-Match') == etag:
+            return 304, None, {'ETag': etag}
+        return 200, response, {'ETag': etag} if etag else {}
+
+
+def get_stub_config(stub: ValidatorStub, **overrides: Any) -> Dict[str, Any]:
+    """The proof's default config, calling the stub without waiting between retries."""
+    from psl_proof.__main__ import load_config
+    config = load_config()
+    config.update({
+        'validator_base_api_url': stub.base_url,
+        'validator_backoff_base': 0.0,
+        'validator_backoff_max': 0.0
+    })
+    config.update(overrides)
+    return config
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    @property
+    def stub(self) -> ValidatorStub:
+        return self.server.stub
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection_id = self.stub.new_connection()
+
+    def do_GET(self) -> None:
+        if self.path.strip('/') == CAPABILITIES_PATH and self.stub.bulk:
+            self.send_json(200, {"bulk": True})
+        else:
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        data = gzip.decompress(body) if self.headers.get('Content-Encoding') == 'gzip' else body
+        api_path = self.path.strip('/')
+        headers = dict(self.headers.items())
+        self.stub.record(StubRequest(api_path, headers, body, json.loads(data) if data else None, self.connection_id))
+        if self.stub.delay:
+            time.sleep(self.stub.delay)
+        held = self.stub.holds.get(api_path)
+        if held:
+            held.wait(HOLD_TIMEOUT)
+
+        fault = self.stub.next_fault(api_path)
+        if fault == 'timeout':
+            # the client has given up by now
+            time.sleep(self.stub.timeout_delay)
+            self.close_connection = True
+            return
+        if fault is not None:
+            self.send_json(fault, {"error": f"injected {fault}"})
+            return
+
+        if api_path.endswith(BULK_SUFFIX) and self.stub.bulk:
+            item_path = api_path[:-len(BULK_SUFFIX)]
+            results = []
+            for _ in json.loads(data)["items"]:
+                status, item_body, _ = self.stub.answer(item_path, {})
+                results.append({"statusCode": status, "body": item_body})
+            self.send_json(200, {"results": results})
+            return
+        status, response_body, extra_headers = self.stub.answer(api_path, headers)
+        self.send_json(status, response_body, extra_headers)
+
+    def send_json(self, status: int, value: Any, extra_headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(value).encode('utf-8') if value is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, header_value in (extra_headers or {}).items():
+            self.send_header(name, header_value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Local validator api stub.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--bulk', action='store_true', help='advertise and serve the bulk endpoints')
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds each request takes')
+    args = parser.parse_args()
+    stub = ValidatorStub(args.port, bulk=args.bulk, delay=args.delay)
+    print(f"Validator stub listening on {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()